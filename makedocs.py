@@ -21,7 +21,14 @@ fix_dict ={
     '[qrotor.rotation](https://pablogila.github.io/qrotor/qrotor/rotation.html)'          : '`qrotor.rotation`',
     '[qrotor.potential](https://pablogila.github.io/qrotor/qrotor/potential.html)'        : '`qrotor.potential`',
     '[qrotor.solve](https://pablogila.github.io/qrotor/qrotor/solve.html)'                : '`qrotor.solve`',
+    '[qrotor.observables](https://pablogila.github.io/qrotor/qrotor/observables.html)'    : '`qrotor.observables`',
+    '[qrotor.spectrum](https://pablogila.github.io/qrotor/qrotor/spectrum.html)'          : '`qrotor.spectrum`',
+    '[qrotor.thermal](https://pablogila.github.io/qrotor/qrotor/thermal.html)'            : '`qrotor.thermal`',
+    '[qrotor.fit](https://pablogila.github.io/qrotor/qrotor/fit.html)'                    : '`qrotor.fit`',
+    '[qrotor.reduced](https://pablogila.github.io/qrotor/qrotor/reduced.html)'            : '`qrotor.reduced`',
     '[qrotor.plot](https://pablogila.github.io/qrotor/qrotor/plot.html)'                  : '`qrotor.plot`',
+    '[qrotor.cache](https://pablogila.github.io/qrotor/qrotor/cache.html)'                : '`qrotor.cache`',
+    '[qrotor.shared](https://pablogila.github.io/qrotor/qrotor/shared.html)'              : '`qrotor.shared`',
     'Check the [full documentation online](https://pablogila.github.io/qrotor/).'         : '',
     '[system](https://pablogila.github.io/qrotor/qrotor/system.html)'                     : '`qrotor.system`',
     '[cosine potential](https://pablogila.github.io/qrotor/qrotor/potential.html#cosine)' : 'cosine potential (`qrotor.potential.cosine`)',
@@ -4,11 +4,17 @@
 
 
 from ._version import __version__ as version
-from .system import System
+from .system import System, SystemResult, UniformGrid
 from .constants import *
 from . import systems
 from . import rotation
 from . import potential
 from . import solve
 from . import plot
-
+from . import cache
+from . import shared
+from . import observables
+from . import spectrum
+from . import thermal
+from . import fit
+from . import reduced
@@ -0,0 +1,205 @@
+"""
+# Description
+
+This module contains a persistent cache of solved `qrotor.system.System` objects,
+stored on the local disk.
+
+Systems are identified by a hash of their inputs, see `key()`:
+`System.B`, `System.gridsize`, `System.searched_E`, `System.potential_name`,
+`System.potential_constants`, `System.correct_potential_offset`,
+`System.save_eigenvectors`, `System.solver`, `System.interpolation`, the module settings that change the results,
+such as `qrotor.solve.lobpcg_tol`, and the bytes of `System.grid` and `System.potential_values`.
+Solving an identical system again, even from a different notebook or pipeline run,
+loads the previous results instead of solving the eigenvalues again.
+Only the solved `outputs` are loaded, so that other attributes
+such as `System.comment` or `System.tags` are kept.
+
+The cache is used by `qrotor.solve.energies()` when `qrotor.cache.enabled = True`,
+or when called with `use_cache = True`:
+```python
+import qrotor as qr
+qr.cache.enabled = True
+system = qr.System(potential_name='cos', potential_constants=[0, 30, 3, 0])
+system.solve()  # Solved and stored in the cache
+system = qr.System(potential_name='cos', potential_constants=[0, 30, 3, 0])
+system.solve()  # Loaded from the cache
+qr.cache.stats()  # {'hits': 1, 'misses': 1, 'entries': 1, 'size': ...}
+```
+
+Cached files are stored in `qrotor.cache.folder`.
+When the total size exceeds `qrotor.cache.max_size` bytes,
+the least recently used systems are removed.
+
+
+# Index
+
+| | |
+| --- | --- |
+| `key()`   | Hash of the inputs of a system |
+| `load()`  | Load a solved system from the cache |
+| `save()`  | Save a solved system to the cache |
+| `stats()` | Hit and miss counters, number of entries and size of the cache |
+| `clear()` | Remove all cached systems and reset the counters |
+
+---
+"""
+
+
+from .system import System
+from .potential import fingerprint
+import os
+import pickle
+import hashlib
+import numpy as np
+
+
+enabled: bool = False
+"""Use the cache by default in `qrotor.solve.energies()`."""
+folder: str = os.path.join(os.path.expanduser('~'), '.cache', 'qrotor')
+"""Folder where the cached systems are stored."""
+max_size: int = 2 * 1024**3
+"""Maximum size of the cache in bytes. Least recently used systems are removed above this size."""
+outputs: tuple = (
+    'version', 'grid', 'potential_values', 'potential_offset', 'potential_min', 'potential_max',
+    'eigenvalues', 'eigenvectors', 'E_levels', 'deg', 'E_activation', 'excitations', 'splittings',
+    'runtime', 'solved_potential_key',
+    )
+"""Attributes of the cached systems that are loaded into the solved system."""
+
+_counters = {'hits': 0, 'misses': 0}
+
+
+def key(system:System) -> str:
+    """Returns a hexadecimal hash of the inputs of a `system`.
+
+    Two systems with the same key yield the same results upon solving.
+    """
+    from . import solve
+    h = hashlib.blake2b(digest_size=20)
+    constants = system.potential_constants
+    if constants is not None:
+        constants = np.asarray(constants, dtype=float).tolist()
+    inputs = (
+        float(system.B),
+        int(system.gridsize) if system.gridsize else None,
+        int(system.searched_E),
+        str(system.potential_name).lower() if system.potential_name else '',
+        constants,
+        bool(system.correct_potential_offset),
+        bool(system.save_eigenvectors),
+        str(system.solver).lower(),
+        str(getattr(system, 'interpolation', 'spline')).lower(),
+        float(solve.lobpcg_tol) if str(system.solver).lower() == 'lobpcg' else None,
+    )
+    h.update(repr(inputs).encode())
+    h.update(fingerprint(system).encode())
+    return h.hexdigest()
+
+
+def _path(system_key:str) -> str:
+    return os.path.join(folder, f'{system_key}.pkl')
+
+
+def load(
+        system:System,
+        inputs_key:str=None,
+        ) -> System:
+    """Loads the solved `system` from the cache.
+
+    Returns None if the system was not found.
+    The cached `outputs` are copied into `system` itself, which is then returned.
+    The `inputs_key` of the system is calculated with `key()` if not provided.
+    """
+    inputs_key = key(system) if inputs_key is None else inputs_key
+    filepath = _path(inputs_key)
+    try:
+        with open(filepath, 'rb') as f:
+            cached = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        _counters['misses'] += 1
+        return None
+    try:
+        os.utime(filepath)  # Mark as recently used
+    except OSError:  # Removed by another process in the meantime
+        pass
+    _counters['hits'] += 1
+    for name in outputs:
+        if name in cached.__dict__:
+            setattr(system, name, cached.__dict__[name])
+    return system
+
+
+def save(
+        system:System,
+        inputs_key:str=None,
+        ) -> str:
+    """Saves a solved `system` to the cache, returning its path.
+
+    The `inputs_key` must be calculated with `key()` before solving,
+    since solving modifies the grid and potential values of the system.
+    If not provided, it is calculated from the current `system`.
+    Least recently used systems are removed if the cache grows above `max_size`.
+    """
+    inputs_key = key(system) if inputs_key is None else inputs_key
+    os.makedirs(folder, exist_ok=True)
+    filepath = _path(inputs_key)
+    temp_filepath = f'{filepath}.{os.getpid()}.tmp'
+    with open(temp_filepath, 'wb') as f:
+        pickle.dump(system, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_filepath, filepath)  # Atomic, safe across processes
+    _evict()
+    return filepath
+
+
+def _entries() -> list:
+    """Returns a list of `(last_used, size, path)` tuples for all cached systems."""
+    if not os.path.isdir(folder):
+        return []
+    entries = []
+    with os.scandir(folder) as it:
+        for entry in it:
+            if not entry.name.endswith('.pkl'):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:  # Removed by another process
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    return entries
+
+
+def _evict() -> None:
+    """Removes the least recently used systems until the cache fits in `max_size`."""
+    entries = _entries()
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_size:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def stats() -> dict:
+    """Returns a dict with the `hits` and `misses` of the current session,
+    and the number of `entries` and total `size` in bytes of the cache."""
+    entries = _entries()
+    return {
+        'hits': _counters['hits'],
+        'misses': _counters['misses'],
+        'entries': len(entries),
+        'size': sum(size for _, size, _ in entries),
+    }
+
+
+def clear() -> None:
+    """Removes all cached systems and resets the hit and miss counters."""
+    for _, _, path in _entries():
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    _counters['hits'] = 0
+    _counters['misses'] = 0
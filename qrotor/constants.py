@@ -33,6 +33,8 @@ amu_to_kg = const.physical_constants['atomic mass constant'][0]
 """Quick conversion factor from amu to kg."""
 kg_to_amu = 1 / amu_to_kg
 """Quick conversion factor from kg to amu."""
+k_B = const.Boltzmann / const.e * 1000
+"""Boltzmann constant, in meV/K."""
 
 # Distance between Carbon and Hydrogen atoms (measured from MAPbI3)
 distance_CH = 1.09285   # Angstroms
@@ -0,0 +1,250 @@
+"""
+# Description
+
+This module fits the `qrotor.system.System.potential_constants`,
+and optionally the kinetic energy `qrotor.system.System.B`,
+to measured tunnel splittings and excitation energies.
+
+Solving the full system with `System.solve()` in every iteration is too slow for an optimiser.
+Instead, the hamiltonian is diagonalised in a small basis of free-rotor functions $e^{im\\varphi}$
+with $|m| \\leq$ `modes`, see `surrogate()`, which takes about a millisecond.
+The derivatives of the eigenvalues with respect to B and the constants
+are obtained from the same eigenvectors with the Hellmann–Feynman theorem,
+$\\partial E_n / \\partial \\lambda = \\langle n | \\partial H / \\partial \\lambda | n \\rangle$,
+so each iteration of the least-squares optimiser needs a single diagonalisation.
+Several starting points can be optimised in parallel to avoid local minima.
+```python
+import qrotor as qr
+system = qr.System(B=qr.B_CH3, potential_name='cos', potential_constants=[0, 20, 3, 0])
+fitted = qr.fit.potential(system, splittings=[0.0096], excitations=[17.6], vary=[1])
+fitted.potential_constants  # [0, 30.0..., 3, 0]
+fitted.solve()  # Check the fit with the full solver
+```
+Energy levels and splittings are defined as in `qrotor.solve.E_levels_many()`.
+
+
+# Index
+
+| | |
+| --- | --- |
+| `potential()` | Fit the potential constants and B to measured splittings and excitations |
+| `surrogate()` | Eigenvalues and their derivatives from a small free-rotor basis |
+
+---
+"""
+
+
+from .system import System
+from .potential import solve as solve_potential
+from .potential import derivatives, constants_of, symmetry
+from .solve import _level_weights
+import aton.alias as alias
+import numpy as np
+from copy import deepcopy
+from concurrent.futures import ProcessPoolExecutor
+from scipy.linalg import eigh
+from scipy.optimize import least_squares
+
+
+def potential(
+        system:System,
+        splittings:list=None,
+        excitations:list=None,
+        vary:list=None,
+        fit_B:bool=False,
+        bounds:tuple=(-np.inf, np.inf),
+        starts:int=1,
+        spread:float=0.5,
+        workers:int=1,
+        modes:int=40,
+        seed:int=None,
+        ) -> System:
+    """Fits the potential constants of a `system` to the measured `splittings` and `excitations`.
+
+    The `splittings` and `excitations` are lists of energies in meV,
+    starting from the ground and first excited levels respectively.
+    Missing values can be set to None.
+    The current `System.potential_constants` are used as the starting point,
+    see `qrotor.potential.constants_of()`; only the constants with the indexes in `vary` are fitted.
+    By default, only the amplitudes are fitted, i.e. $C_1$ of `'sin'` and `'cos'` potentials
+    and $C_1, ..., C_n$ of `'titov2023'`, since offsets and phases
+    do not change the splittings and excitations. All constants of other potentials are fitted.
+    The frequency $C_2$ of `'sin'` and `'cos'` potentials can not be fitted,
+    since non-integer values are not periodic. Set `fit_B = True` to also fit `System.B`.
+    The `bounds` of the fitted parameters, B first if fitted,
+    can be given as in `scipy.optimize.least_squares()`.
+
+    Residuals are relative to the measured values,
+    so that small splittings and large excitations have the same weight.
+    With `starts > 1`, additional starting points are randomly displaced by a relative `spread`,
+    and optimised in parallel with `workers` processes; the best fit is kept.
+    The basis size is set with `modes`, see `surrogate()`.
+
+    Returns a new System with the settings of `system` and the fitted constants and B, which is not solved.
+    """
+    targets = _targets(splittings, excitations)
+    if not targets:
+        raise ValueError('At least one splitting or excitation must be provided.')
+    C = constants_of(system)
+    vary = _default_vary(system, C) if vary is None else list(vary)
+    if _is_cosine(system) and 2 in vary:
+        raise ValueError('The frequency C2 of sin and cos potentials can not be fitted.')
+    x0 = np.array(([system.B] if fit_B else []) + [C[i] for i in vary], dtype=float)
+    rng = np.random.default_rng(seed)
+    guesses = [x0] + [x0 * (1 + spread * rng.uniform(-1, 1, len(x0))) for _ in range(starts - 1)]
+    lower, upper = np.broadcast_to(bounds[0], x0.shape), np.broadcast_to(bounds[1], x0.shape)
+    guesses = [np.clip(x, lower, upper) for x in guesses]
+    probe = _probe(system)
+    jobs = [(probe, x, targets, vary, fit_B, bounds, modes) for x in guesses]
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_least_squares, jobs))
+    else:
+        results = [_least_squares(job) for job in jobs]
+    best = min(results, key=lambda result: result.cost)
+    print(f'Fit finished after {sum(r.nfev for r in results)} evaluations, with cost {best.cost:.3g}')
+    fitted = System(
+        comment=system.comment,
+        B=system.B,
+        gridsize=system.gridsize,
+        searched_E=system.searched_E,
+        correct_potential_offset=system.correct_potential_offset,
+        save_eigenvectors=system.save_eigenvectors,
+        potential_name=system.potential_name,
+        potential_constants=C,
+        tags=system.tags,
+        solver=system.solver,
+        interpolation=system.interpolation,
+        )
+    return _apply(fitted, best.x, vary, fit_B)
+
+
+def surrogate(
+        system:System,
+        modes:int=40,
+        gradients:bool=False,
+        ) -> tuple:
+    """Solves the lowest `System.searched_E` eigenvalues of a `system` in a free-rotor basis.
+
+    The hamiltonian $B m^2 \\delta_{mn} + \\hat{V}_{m-n}$ is diagonalised in the basis
+    $e^{im\\varphi}$ with $|m| \\leq$ `modes`, using the Fourier components $\\hat{V}_k$
+    of the potential from its `System.potential_name` and `System.potential_constants`.
+    The basis must be larger for deeper potentials, with about 40 modes being
+    enough for barriers of a few hundred meV in methyl groups.
+
+    Returns the eigenvalues, or with `gradients = True`, a tuple with the eigenvalues
+    and their derivatives with respect to `[B, C0, C1, ...]`, with shape `(searched_E, 1 + constants)`.
+    """
+    probe = _probe(system)
+    return _surrogate(probe, modes, gradients)
+
+
+def _probe(system:System) -> System:
+    """Returns a light copy of the `system` with only the inputs of the potential."""
+    probe = System(
+        B=system.B,
+        searched_E=system.searched_E,
+        potential_name=system.potential_name,
+        potential_constants=constants_of(system),
+        correct_potential_offset=system.correct_potential_offset,
+        save_eigenvectors=False,
+        )
+    if not probe.potential_name:
+        raise ValueError('Only potentials defined by a System.potential_name can be fitted.')
+    return probe
+
+
+def _surrogate(probe:System, modes:int, with_derivatives:bool=False) -> tuple:
+    """Eigenvalues, and optionally their Hellmann–Feynman derivatives, of a `probe` system."""
+    K = 8 * modes  # Enough points for the Fourier components of the potential up to 2*modes
+    probe.grid = 2 * np.pi * np.arange(K) / K
+    V = np.asarray(solve_potential(probe), dtype=float)
+    if probe.correct_potential_offset is True:
+        V = V - V.min()
+    m = np.arange(-modes, modes + 1)
+    differences = (m[:, None] - m[None, :]) % K
+    H = np.fft.fft(V)[differences] / K + np.diag(probe.B * m**2)
+    eigenvalues, vectors = eigh(H, subset_by_index=[0, probe.searched_E - 1])
+    probe.potential_max = V.max()
+    if not with_derivatives:
+        return eigenvalues
+    dV = derivatives(probe, probe.grid)
+    dH = np.fft.fft(dV, axis=-1)[:, differences] / K
+    dE_dC = np.einsum('mi,pmn,ni->ip', vectors.conj(), dH, vectors).real
+    dE_dB = np.einsum('mi,m,mi->i', vectors.conj(), m**2, vectors).real
+    return eigenvalues, np.column_stack([dE_dB, dE_dC])
+
+
+def _is_cosine(system:System) -> bool:
+    name = system.potential_name.lower() if system.potential_name else ''
+    return name in alias.math['sin'] or name in alias.math['cos']
+
+
+def _default_vary(system:System, C:list) -> list:
+    """Indexes of the amplitude constants of the potential of a `system`."""
+    if _is_cosine(system):
+        return [1]
+    if system.potential_name and system.potential_name.lower() == 'titov2023':
+        return list(range(1, len(C)))
+    return list(range(len(C)))
+
+
+def _targets(splittings:list, excitations:list) -> list:
+    """List of `(kind, level, value)` measured targets."""
+    targets = []
+    for kind, values in (('splittings', splittings), ('excitations', excitations)):
+        for level, value in enumerate(values or []):
+            if value is not None:
+                targets.append((kind, level, float(value)))
+    return targets
+
+
+def _apply(system:System, x:np.ndarray, vary:list, fit_B:bool) -> System:
+    """Sets the fitted parameters `x` in the `system`."""
+    x = list(x)
+    if fit_B:
+        system.B = float(x.pop(0))
+    C = constants_of(system)
+    for i, value in zip(vary, x):
+        C[i] = float(value)
+    system.potential_constants = C
+    return system
+
+
+def _least_squares(job:tuple):
+    """Runs a single least-squares fit from a starting point."""
+    probe, x0, targets, vary, fit_B, bounds, modes = job
+    probe = deepcopy(probe)
+    cache = {}
+    def evaluate(x):
+        key = x.tobytes()
+        if key not in cache:
+            cache.clear()
+            _apply(probe, x, vary, fit_B)
+            eigenvalues, jacobian = _surrogate(probe, modes, True)
+            columns = ([0] if fit_B else []) + [1 + i for i in vary]
+            cache[key] = _residuals(eigenvalues, jacobian[:, columns], targets, probe.potential_max, symmetry(probe))
+        return cache[key]
+    return least_squares(lambda x: evaluate(x)[0], x0, jac=lambda x: evaluate(x)[1], bounds=bounds, x_scale='jac')
+
+
+def _residuals(
+        eigenvalues:np.ndarray,
+        jacobian:np.ndarray,
+        targets:list,
+        vmax:float=None,
+        symmetry:int=None,
+        ) -> tuple:
+    """Relative residuals of the `targets` and their jacobian,
+    from the `eigenvalues` and their derivatives."""
+    weights = _level_weights(eigenvalues, vmax, extend=True, symmetry=symmetry)
+    residuals = np.zeros(len(targets))
+    rows = np.zeros((len(targets), jacobian.shape[1]))
+    for t, (kind, level, value) in enumerate(targets):
+        w = weights[kind].get(level)
+        if w is None:  # Level not found, penalise without a gradient
+            residuals[t] = 10.0
+            continue
+        residuals[t] = (w @ eigenvalues - value) / abs(value)
+        rows[t] = (w @ jacobian) / abs(value)
+    return residuals, rows
@@ -0,0 +1,276 @@
+"""
+# Description
+
+This module calculates observables from the eigenvectors of a solved `qrotor.system.System`,
+such as expectation values, probability densities and transition matrix elements.
+
+All stored eigenvectors are processed at once with a single `np.einsum()`,
+without creating squared copies of the eigenvectors,
+integrating with the weights of the grid, see `qrotor.solve.grid_weights()`.
+The observables are functions of the angle, or their values on the grid:
+```python
+import qrotor as qr
+import numpy as np
+system = qr.System(potential_name='cos', potential_constants=[0, 30, 3, 0])
+system.solve()
+qr.observables.expectation(system, lambda x: np.cos(3*x))  # <cos 3φ> of each state
+qr.observables.matrix_elements(system, np.cos(3*system.grid), levels=[0, 1, 2])
+```
+
+Eigenvectors are normalised on the fly, so they can be stored with less precision,
+e.g. `system.eigenvectors.astype(np.float32)`, or downsampled to fewer points
+of a uniform grid, e.g. `system.eigenvectors[:, ::10]`.
+They can also be stored as a few Fourier coefficients with `compress()`,
+which are expanded on a small grid when needed.
+Instead of a System, all functions also accept an array of eigenvectors,
+with an optional `grid`.
+
+
+# Index
+
+| | |
+| --- | --- |
+| `expectation()`     | Expectation values of observables for all states |
+| `matrix_elements()` | Transition matrix elements of an observable between states |
+| `overlap()`         | Overlap matrix between the states of two systems |
+| `density()`         | Normalised probability densities of the states |
+| `localisation()`    | Angular localisation of the states in wells of a given symmetry |
+| `sensitivities()`   | Derivatives of the eigenvalues, splittings and excitations with respect to B and the potential constants |
+| `compress()`        | Compress eigenvectors to a few Fourier coefficients |
+| `decompress()`      | Expand Fourier-compressed eigenvectors on a uniform grid |
+
+---
+"""
+
+
+from .system import System
+from .solve import grid_weights, _spacings, _level_weights
+from .potential import derivatives, symmetry
+import numpy as np
+
+
+def expectation(
+        data,
+        observable,
+        levels:list=None,
+        grid=None,
+        ) -> np.ndarray:
+    """Returns the expectation values of an `observable` for the states of `data`.
+
+    The `data` can be a solved System, or an array of eigenvectors with an optional `grid`.
+    The `observable` can be a function of the angle, its values on the grid,
+    or a list of them, returning a 2D array with one row per observable.
+    All states are calculated unless specific `levels` are requested.
+    """
+    psi, x, weights = _states(data, levels, grid)
+    if callable(observable) or isinstance(observable, np.ndarray):
+        single = callable(observable) or observable.ndim == 1
+    else:  # List of values or of observables, from its first element
+        single = not (callable(observable[0]) or np.ndim(observable[0]) > 0)
+    observables = [observable] if single else list(observable)
+    values = np.array([_values(o, x) for o in observables])
+    # Norm and observables at once, without squaring the eigenvectors
+    operands = np.vstack([weights, values * weights])
+    integrals = np.einsum('in,in,kn->ki', psi, psi, operands, dtype=float)
+    result = integrals[1:] / integrals[0]
+    return result[0] if single else result
+
+
+def matrix_elements(
+        data,
+        observable,
+        levels:list=None,
+        grid=None,
+        ) -> np.ndarray:
+    """Returns the matrix elements $\\langle i | O | j \\rangle$ of an `observable`
+    between the normalised states of `data`.
+
+    The `data` can be a solved System, or an array of eigenvectors with an optional `grid`.
+    The `observable` can be a function of the angle or its values on the grid.
+    Returns a square matrix between all states, or only between the specified `levels`.
+    Its diagonal contains the expectation values.
+    """
+    psi, x, weights = _states(data, levels, grid)
+    values = _values(observable, x)
+    matrix = np.einsum('in,n,jn->ij', psi, values * weights, psi, dtype=float)
+    norms = np.sqrt(np.einsum('in,in,n->i', psi, psi, weights, dtype=float))
+    return matrix / np.outer(norms, norms)
+
+
+def overlap(
+        data,
+        other,
+        levels:list=None,
+        ) -> np.ndarray:
+    """Returns the overlap matrix $\\langle i | j \\rangle$ between the states of `data` and `other`.
+
+    Both can be solved systems, or arrays of eigenvectors, on the same grid.
+    Eigenvectors are only defined up to a sign, so absolute values are usually relevant,
+    e.g. to follow the states along a parameter scan.
+    """
+    psi, x, weights = _states(data, levels)
+    phi, _, _ = _states(other, levels, x if not isinstance(other, System) else None)
+    if psi.shape[-1] != phi.shape[-1]:
+        raise ValueError('Both systems must have the same number of points.')
+    matrix = np.einsum('in,n,jn->ij', psi, weights, phi, dtype=float)
+    norms_psi = np.sqrt(np.einsum('in,in,n->i', psi, psi, weights, dtype=float))
+    norms_phi = np.sqrt(np.einsum('in,in,n->i', phi, phi, weights, dtype=float))
+    return matrix / np.outer(norms_psi, norms_phi)
+
+
+def density(
+        data,
+        levels:list=None,
+        grid=None,
+        ) -> tuple:
+    """Returns the probability densities of the states of `data`, normalised to integrate to one.
+
+    The `data` can be a solved System, or an array of eigenvectors with an optional `grid`.
+    Returns a tuple with the `(grid, densities)` arrays,
+    with one row per state, or only for the specified `levels`.
+    Fourier-compressed eigenvectors are expanded in a small grid, see `compress()`.
+    """
+    psi, x, weights = _states(data, levels, grid)
+    densities = np.square(psi, dtype=float)
+    densities /= np.einsum('in,n->i', densities, weights)[:, None]
+    return x, densities
+
+
+def localisation(
+        data,
+        n:int=3,
+        levels:list=None,
+        grid=None,
+        ) -> np.ndarray:
+    """Returns the angular localisation of the states of `data` in `n` equivalent wells.
+
+    Calculated as the modulus $|\\langle e^{in\\varphi} \\rangle|$,
+    which is zero for a free rotor and tends to one
+    when the states are localised at the bottom of the `n` potential wells.
+    """
+    cos, sin = expectation(data, [lambda x: np.cos(n*x), lambda x: np.sin(n*x)], levels, grid)
+    return np.hypot(cos, sin)
+
+
+def sensitivities(system:System) -> dict:
+    """Returns the derivatives of the eigenvalues, splittings and excitations of a solved `system`
+    with respect to `System.B`, a scale factor of the potential, and each potential constant.
+
+    Following the Hellmann–Feynman theorem, the derivative of each eigenvalue is
+    the expectation value of the derivative of the hamiltonian,
+    so they are calculated from the stored eigenvectors, without solving the system again:
+    $\\partial E_n / \\partial B = (E_n - \\langle V \\rangle_n) / B$,
+    the derivative with respect to a scale factor of the potential, as in `qrotor.potential.scale()`,
+    is $\\langle V \\rangle_n$, and that with respect to each constant is
+    $\\langle \\partial V / \\partial C_k \\rangle_n$, see `qrotor.potential.derivatives()`.
+    The derivatives of the splittings and excitations follow from their definition
+    as combinations of eigenvalues, see `qrotor.solve.E_levels_many()`.
+
+    Returns a dict with the `parameters` names, `['B', 'scale', 'C0', 'C1', ...]`,
+    and the `eigenvalues`, `splittings` and `excitations` derivatives,
+    with one row per value and one column per parameter.
+    Degenerate eigenvalues only have well-defined derivatives for perturbations that keep them degenerate,
+    although the excitations, from the mean energy of each level, are always well defined.
+    """
+    psi, x, _ = _states(system)
+    if system.eigenvalues is None or len(system.eigenvalues) < len(psi):
+        raise ValueError('The system must be solved with save_eigenvectors = True')
+    eigenvalues = np.asarray(system.eigenvalues[:len(psi)], dtype=float)
+    V = np.asarray(system.potential_values, dtype=float)
+    if len(V) != len(x):  # Downsampled or compressed eigenvectors
+        V = np.interp(x, np.asarray(system.grid, dtype=float), V, period=2*np.pi)
+    dV = derivatives(system, x) if system.potential_name else np.zeros((0, len(x)))
+    values = expectation(system, np.vstack([V, dV]))
+    dE_dB = (eigenvalues - values[0]) / system.B
+    jacobian = np.column_stack([dE_dB, values.T])
+    weights = _level_weights(eigenvalues, system.potential_max, symmetry=symmetry(system))
+    rows = {}
+    for kind in ('splittings', 'excitations'):
+        n = len(getattr(system, kind))
+        w = np.array([weights[kind].get(level, np.zeros(len(eigenvalues))) for level in range(n)])
+        rows[kind] = w.reshape(n, len(eigenvalues)) @ jacobian
+    return {
+        'parameters': ['B', 'scale'] + [f'C{i}' for i in range(len(dV))],
+        'eigenvalues': jacobian,
+        'splittings': rows['splittings'],
+        'excitations': rows['excitations'],
+    }
+
+
+def compress(
+        eigenvectors,
+        modes:int=64,
+        dtype=np.complex64,
+        ) -> np.ndarray:
+    """Compresses real `eigenvectors` on a uniform grid to their first Fourier `modes`.
+
+    Returns a complex array of `dtype` with one row per eigenvector,
+    which can be stored instead of the full eigenvectors,
+    e.g. `system.eigenvectors = qr.observables.compress(system.eigenvectors)`.
+    Low-lying states of smooth potentials only need a few modes per potential well.
+    """
+    if isinstance(eigenvectors, System):
+        if _spacings(eigenvectors.grid) is not None:
+            raise ValueError('Only eigenvectors on uniform grids can be compressed.')
+        eigenvectors = eigenvectors.eigenvectors
+    eigenvectors = np.atleast_2d(np.asarray(eigenvectors, dtype=float))
+    coefficients = np.fft.rfft(eigenvectors, axis=-1)[:, :modes] / eigenvectors.shape[-1]
+    return coefficients.astype(dtype)
+
+
+def decompress(
+        coefficients,
+        gridsize:int,
+        ) -> np.ndarray:
+    """Expands the Fourier `coefficients` from `compress()` on a periodic uniform grid of `gridsize` points.
+
+    The new grid covers a full period, without repeating the first point.
+    """
+    coefficients = np.atleast_2d(coefficients)
+    modes = min(coefficients.shape[-1], gridsize // 2 + 1)
+    return np.fft.irfft(coefficients[:, :modes] * gridsize, gridsize, axis=-1)
+
+
+def _states(
+        data,
+        levels:list=None,
+        grid=None,
+        ) -> tuple:
+    """Returns the eigenvectors of `data` as a 2D array, with their grid and integration weights.
+
+    Eigenvectors with fewer points than the grid are considered downsampled from a uniform grid,
+    and complex eigenvectors are considered Fourier coefficients from `compress()`.
+    """
+    if isinstance(data, System):
+        eigenvectors = data.eigenvectors
+        grid = data.grid if grid is None else grid
+    else:
+        eigenvectors = data
+    psi = np.asarray(eigenvectors)
+    if psi.size == 0:
+        raise ValueError('No eigenvectors found, solve the system with save_eigenvectors = True')
+    psi = np.atleast_2d(psi)
+    if levels is not None:
+        psi = psi[np.atleast_1d(levels)]
+    grid = [] if grid is None else grid
+    if np.iscomplexobj(psi):  # Fourier coefficients
+        psi = decompress(psi, 4 * psi.shape[-1])
+    elif len(grid) == psi.shape[-1]:
+        return psi, np.asarray(grid, dtype=float), grid_weights(grid)
+    # Uniform grid over the same period as the original grid
+    if len(grid) < 2:
+        start, period = 0.0, 2 * np.pi
+    elif _spacings(grid) is None:
+        start, period = float(grid[0]), len(grid) * float(grid[1] - grid[0])
+    else:
+        raise ValueError('Eigenvectors can only be downsampled or compressed from uniform grids.')
+    points = psi.shape[-1]
+    x = start + period * np.arange(points) / points
+    return psi, x, np.full(points, period / points)
+
+
+def _values(observable, x:np.ndarray) -> np.ndarray:
+    """Returns the values of an `observable` on the grid `x`."""
+    values = observable(x) if callable(observable) else np.asarray(observable, dtype=float)
+    values = np.broadcast_to(np.asarray(values, dtype=float), x.shape)
+    return values
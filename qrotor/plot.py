@@ -3,6 +3,17 @@
 
 This module provides straightforward functions to plot QRotor data.
 
+Lines with many points, such as the potential values and wavefunctions of large grids,
+are downsampled to the resolution of the figure when `decimate = True`,
+keeping the minimum and maximum values of each pixel column, see `decimated()`.
+
+All functions return the Matplotlib `Figure`.
+They can save it to a file with the `save` path, and skip `plt.show()` with `show = False`.
+To save the figures of many systems without a display, use `render_many()`:
+```python
+paths = qr.plot.render_many(systems, kind='wavefunction', outdir='figures', workers=8)
+```
+
 
 # Index
 
@@ -14,20 +25,30 @@ This module provides straightforward functions to plot QRotor data.
 | `wavefunction()`     | Selected wavefunctions or squared wavefunctions of a system |
 | `splittings()`       | Tunnel splitting energies of a list of systems |
 | `convergence()`      | Energy convergence of a list of systems calculated with different parameters |
+| `render_many()`      | Save the figures of many systems, in parallel and without a display |
+| `decimated()`        | Downsample a line to a given number of bins, keeping their min and max values |
 
 ---
 """
 
 
 from .system import System
+from .solve import cpu_count
 from . import systems
 from . import constants
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 import numpy as np
-from copy import deepcopy
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 import aton.alias as alias
 
 
+decimate: bool = True
+"""Downsample long lines to the pixel resolution of the figure, see `decimated()`."""
+
+
 def potential(
         data:System|list,
         title:str=None,
@@ -39,7 +60,9 @@ def potential(
         normalize:bool=False,
         ylim:tuple=None,
         rc:dict={},
-        ) -> None:
+        save:str=None,
+        show:bool=True,
+        ) -> Figure:
     """Plot the potential values of `data` (System object, or list of systems).
 
     Title can be customized with `title`.
@@ -57,9 +80,10 @@ def potential(
     Additional matplotlib runtime configuration
     [rcParams](https://matplotlib.org/stable/api/matplotlib_configuration_api.html#matplotlib.RcParams)
     can be set with the `rc` dict.
+    The figure is returned, saved to the `save` path if provided,
+    and shown if `show = True`, see `render_many()` for headless rendering.
     """
-    data_copy = deepcopy(data)
-    system = systems.as_list(data_copy)
+    system = systems.as_list(data)
     title_str = title if title else (system[0].comment if (system[0].comment and (len(system) == 1 or not system[-1].comment)) else 'Rotational potential energy')
     # Marker as a list
     if isinstance(marker, list):
@@ -87,38 +111,38 @@ def potential(
             colors = [colors] * len(system)
 
     with plt.rc_context(rc):
-        plt.figure(layout='constrained')
+        fig = plt.figure(layout='constrained')
         plt.title(title_str)
         plt.xlabel('Angle / rad')
         plt.ylabel('Potential energy / meV')
         if normalize:
             plt.ylabel('Energy / V$_{3}$')
-            for s in system:
-                s.potential_values = s.potential_values / s.potential_max
         if ylim:
             plt.ylim(ylim)
 
         plt.xticks([-2*np.pi, -3*np.pi/2, -np.pi, -np.pi/2, 0, np.pi/2, np.pi, 3*np.pi/2, 2*np.pi], [r'$-2\pi$', r'$-\frac{3\pi}{2}$', r'$-\pi$', r'$-\frac{\pi}{2}$', '0', r'$\frac{\pi}{2}$', r'$\pi$', r'$\frac{3\pi}{2}$', r'$2\pi$'])
 
-        if colors is not None:
-            for i, s in enumerate(system):
-                plt.plot(s.grid, s.potential_values, marker=marker[i], linestyle=linestyle[i], label=s.comment, color=colors[i])
-        else:  # Regular plot
-            for i, s in enumerate(system):
-                plt.plot(s.grid, s.potential_values, marker=marker[i], linestyle=linestyle[i], label=s.comment)
+        bins = _bins(plt.gcf())
+        for i, s in enumerate(system):
+            values = s.potential_values / s.potential_max if normalize else s.potential_values
+            x, y = decimated(s.grid, values, bins)
+            color_i = colors[i] if colors is not None else None
+            plt.plot(x, y, marker=marker[i], linestyle=linestyle[i], label=s.comment, color=color_i)
 
         if all(s.comment for s in system) and len(system) != 1:
             leg = plt.legend()
             leg.set_draggable(True)
 
-        plt.show()
+        return _output(fig, save, show)
 
 
 def energies(
         data,
         title:str=None,
         rc:dict={},
-        ) -> None:
+        save:str=None,
+        show:bool=True,
+        ) -> Figure:
     """Plot the eigenvalues of `data` (System or a list of System objects).
 
     You can use up to 1 tag per system to differentiate between molecular groups.
@@ -126,6 +150,8 @@ def energies(
     Additional matplotlib runtime configuration
     [rcParams](https://matplotlib.org/stable/api/matplotlib_configuration_api.html#matplotlib.RcParams)
     can be set with the `rc` dict.
+    The figure is returned, saved to the `save` path if provided,
+    and shown if `show = True`, see `render_many()` for headless rendering.
     """
     if isinstance(data, System):
         var = [data]
@@ -144,7 +170,7 @@ def energies(
     xlabel_text = 'Angle / radians'
 
     with plt.rc_context(rc):
-        plt.figure(layout='constrained')
+        fig = plt.figure(layout='constrained')
         plt.xlabel(xlabel_text)
         plt.ylabel(ylabel_text)
         plt.title(title)
@@ -161,7 +187,8 @@ def energies(
             # Plot potential energy if it is unique
             if not any(np.array_equal(system.potential_values, value) for value in unique_potentials):
                 unique_potentials.append(system.potential_values)
-                plt.plot(system.grid, system.potential_values, color=V_color, linestyle=V_linestyle)
+                x, y = decimated(system.grid, system.potential_values, _bins(plt.gcf()))
+                plt.plot(x, y, color=V_color, linestyle=V_linestyle)
 
             # Plot eigenvalues
             if any(system.eigenvalues):
@@ -180,7 +207,7 @@ def energies(
             leg = plt.legend() #(bbox_to_anchor=(1.1, 0.5), loc='center', fontsize='small')
             leg.set_draggable(True)
 
-        plt.show()
+        return _output(fig, save, show)
 
 
 def reduced_energies(
@@ -189,7 +216,9 @@ def reduced_energies(
         values:list=[],
         legend:list=[],
         rc:dict={},
-        ) -> None:
+        save:str=None,
+        show:bool=True,
+        ) -> Figure:
     """Plots the reduced energy of the system E/B vs the reduced potential energy V/B.
 
     Takes a `data` list of System objects as input.
@@ -204,6 +233,8 @@ def reduced_energies(
     Additional matplotlib runtime configuration
     [rcParams](https://matplotlib.org/stable/api/matplotlib_configuration_api.html#matplotlib.RcParams)
     can be set with the `rc` dict.
+    The figure is returned, saved to the `save` path if provided,
+    and shown if `show = True`, see `render_many()` for headless rendering.
     """
     if values and (isinstance(values, float) or isinstance(values, int) or isinstance(values, np.float64)):
         values = [values]
@@ -222,7 +253,7 @@ def reduced_energies(
     colors = plt.cm.viridis(np.linspace(0, 1, number_of_levels+1))  # +1 to avoid the lighter tones
 
     with plt.rc_context(rc):
-        plt.figure(layout='constrained')
+        fig = plt.figure(layout='constrained')
 
         for i in range(number_of_levels):
             y = []
@@ -245,7 +276,7 @@ def reduced_energies(
         if plot_legend:
             leg = plt.legend()
             leg.set_draggable(True)
-        plt.show()
+        return _output(fig, save, show)
 
 
 def wavefunction(
@@ -256,7 +287,9 @@ def wavefunction(
         overlap:bool|int=False,
         yticks:bool=False,
         rc:dict={},
-        ) -> None:
+        save:str=None,
+        show:bool=True,
+        ) -> Figure:
     """Plot the wavefunction of a `system` for the specified `levels`.
 
     Wavefunctions are squared by default, showing the probabilities;
@@ -276,8 +309,10 @@ def wavefunction(
     Additional matplotlib runtime configuration
     [rcParams](https://matplotlib.org/stable/api/matplotlib_configuration_api.html#matplotlib.RcParams)
     can be set with the `rc` dict.
+    The figure is returned, saved to the `save` path if provided,
+    and shown if `show = True`, see `render_many()` for headless rendering.
     """
-    data = deepcopy(system)
+    data = system
     eigenvectors = data.eigenvectors
     title = title if title else (data.comment if data.comment else 'System wavefunction')
     with plt.rc_context(rc):
@@ -286,7 +321,9 @@ def wavefunction(
         ax1.set_xlabel('Angle / radians')
         ax1.set_ylabel('Potential / meV')
         ax1.set_xticks([-2*np.pi, -3*np.pi/2, -np.pi, -np.pi/2, 0, np.pi/2, np.pi, 3*np.pi/2, 2*np.pi], [r'$-2\pi$', r'$-\frac{3\pi}{2}$', r'$-\pi$', r'$-\frac{\pi}{2}$', '0', r'$\frac{\pi}{2}$', r'$\pi$', r'$\frac{3\pi}{2}$', r'$2\pi$'])
-        ax1.plot(data.grid, data.potential_values, color='blue', linestyle='-')
+        bins = _bins(fig)
+        grid = np.asarray(data.grid)
+        ax1.plot(*decimated(grid, data.potential_values, bins), color='blue', linestyle='-')
         ax2 = ax1.twinx()
         if not yticks:
             ax2.set_yticks([])
@@ -314,16 +351,14 @@ def wavefunction(
             show_legend = True
         else:
             show_legend = False
-        # Square values if so
-        if square:
-            eigenvectors = [vec**2 for vec in eigenvectors]
-        # Plot the wavefunction
+        # Plot the wavefunction, squaring only the plotted levels
         for i in levels:
-            ax2.plot(data.grid, eigenvectors[i], linestyle='--', label=f'{i}')
+            values = np.square(eigenvectors[i]) if square else eigenvectors[i]
+            ax2.plot(*decimated(grid, values, bins), linestyle='--', label=f'{i}')
         if show_legend:
             leg = fig.legend()#(loc='upper right', bbox_to_anchor=(0.9, 0.88), fontsize='small', title='Index')
             leg.set_draggable(True)
-        plt.show()
+        return _output(fig, save, show)
 
 
 def splittings(
@@ -331,7 +366,9 @@ def splittings(
         title:str=None,
         units:str='ueV',
         rc:dict={},
-        ) -> None:
+        save:str=None,
+        show:bool=True,
+        ) -> Figure:
     """Plot the tunnel splitting energies of a `data` list of systems.
 
     The different `System.comment` are shown in the horizontal axis.
@@ -342,10 +379,11 @@ def splittings(
     Additional matplotlib runtime configuration
     [rcParams](https://matplotlib.org/stable/api/matplotlib_configuration_api.html#matplotlib.RcParams)
     can be set with the `rc` dict.
+    The figure is returned, saved to the `save` path if provided,
+    and shown if `show = True`, see `render_many()` for headless rendering.
     """
     title = title if title != None else 'Tunnel splitting energies'
-    calcs = deepcopy(data)
-    calcs = systems.as_list(calcs)
+    calcs = systems.as_list(data)
 
     with plt.rc_context(rc):
         fig, ax = plt.subplots(layout='constrained')
@@ -372,15 +410,22 @@ def splittings(
         ax.set_title(title)
         ax.set_xticks([])
         fig.tight_layout()
-        plt.show()
+        return _output(fig, save, show)
 
 
-def convergence(data:list, rc:dict={}) -> None:
+def convergence(
+        data:list,
+        rc:dict={},
+        save:str=None,
+        show:bool=True,
+        ) -> Figure:
     """Plot the energy convergence of a `data` list of Systems as a function of the gridsize.
 
     Additional matplotlib runtime configuration
     [rcParams](https://matplotlib.org/stable/api/matplotlib_configuration_api.html#matplotlib.RcParams)
     can be set with the `rc` dict.
+    The figure is returned, saved to the `save` path if provided,
+    and shown if `show = True`, see `render_many()` for headless rendering.
     """
     systems.as_list(data)
     gridsizes = [system.gridsize for system in data]
@@ -414,5 +459,117 @@ def convergence(data:list, rc:dict={}) -> None:
         leg = fig.legend()#(loc='upper right', bbox_to_anchor=(0.9, 0.88), fontsize='small')
         leg.set_draggable(True)
         plt.title(data[0].comment if data[0].comment else 'Energy convergence vs grid size')
-        plt.show()
+        return _output(fig, save, show)
+
+
 
+def render_many(
+        data,
+        kind:str='potential',
+        outdir:str='.',
+        workers:int=1,
+        fmt:str='png',
+        **kwargs,
+        ) -> list:
+    """Saves a figure of each system in `data` to `outdir`, returning the paths.
+
+    The `kind` of figure can be `'potential'`, `'energies'` or `'wavefunction'`,
+    and additional `kwargs` are passed to the corresponding plotting function.
+    Figures are saved as `{kind}_{index}.{fmt}` and closed immediately, without showing them.
+    They are always rendered with the non-interactive Agg backend.
+
+    With `workers > 1`, figures are rendered in parallel by a pool of processes,
+    or with one process per available core if `workers = None`, see `qrotor.solve.cpu_count()`.
+    Parallel rendering must be run under `if __name__ == '__main__':` in scripts.
+    """
+    if kind not in _kinds:
+        raise ValueError(f"kind must be one of {list(_kinds)}, found instead: '{kind}'")
+    os.makedirs(outdir, exist_ok=True)
+    workers = cpu_count() if workers is None else workers
+    jobs = ((kind, system, os.path.join(outdir, f'{kind}_{index}.{fmt}'), kwargs) for index, system in enumerate(data))
+    if workers <= 1:
+        backend = plt.get_backend()
+        plt.switch_backend('Agg')
+        try:
+            return [_render(*job) for job in jobs]
+        finally:
+            plt.switch_backend(backend)
+    paths = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        queue = deque()
+        for job in jobs:
+            queue.append(pool.submit(_render, *job))
+            if len(queue) >= 2 * workers:
+                paths.append(queue.popleft().result())
+        while queue:
+            paths.append(queue.popleft().result())
+    return paths
+
+
+_kinds = {
+    'potential': potential,
+    'energies': energies,
+    'wavefunction': wavefunction,
+}
+
+
+def _render(kind:str, system:System, path:str, kwargs:dict) -> str:
+    """Saves the `kind` of figure of a `system` to `path`."""
+    _kinds[kind](system, save=path, show=False, **kwargs)
+    return path
+
+
+def _init_worker() -> None:
+    """Uses the non-interactive Agg backend in the worker processes."""
+    plt.switch_backend('Agg')
+
+
+def _output(fig:Figure, save:str=None, show:bool=True) -> Figure:
+    """Saves the `fig` to `save` and shows it if `show`, closing it if it is only saved."""
+    if save:
+        fig.savefig(save)
+    if show:
+        plt.show()
+    elif save:
+        plt.close(fig)
+    return fig
+
+
+def decimated(
+        x,
+        y,
+        bins:int,
+        ) -> tuple:
+    """Downsample a line with `x` and `y` values to a number of `bins`.
+
+    The points are split in `bins` consecutive chunks of the same size,
+    and only the minimum and maximum values of each chunk are kept, in their original order,
+    together with the first and last points.
+    With one bin per pixel column, the plotted line looks the same as the full line,
+    including narrow peaks, while plotting at most four points per pixel.
+    Lines with less than four points per bin are returned unchanged.
+    Returns a tuple with the decimated `(x, y)` arrays.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    n = len(y)
+    if not decimate or bins is None or bins < 1 or n <= 4 * bins:
+        return x, y
+    chunk = -(-n // bins)  # Ceiling, with a shorter last chunk
+    padded = np.full(chunk * bins, np.nan)
+    padded[:n] = y
+    padded = padded.reshape(bins, chunk)
+    filled = ~np.all(np.isnan(padded), axis=1)
+    offsets = np.arange(bins)[filled] * chunk
+    indexes = np.concatenate([
+        [0, n - 1],
+        np.nanargmin(padded[filled], axis=1) + offsets,
+        np.nanargmax(padded[filled], axis=1) + offsets,
+    ])
+    indexes = np.unique(indexes)  # Sorted
+    return x[indexes], y[indexes]
+
+
+def _bins(fig) -> int:
+    """Number of pixel columns of a `fig`."""
+    return int(fig.get_figwidth() * fig.dpi)
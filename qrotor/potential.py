@@ -15,6 +15,12 @@ User functions:
 | `from_qe()`     | Creates a potential data file from Quantum ESPRESSO outputs |
 | `merge()`       | Add and subtract potentials from systems |
 | `scale()`       | Scale potential values by a given factor |
+| `transform()`   | Transform potential values in place, keeping their fitted interpolation |
+| `fingerprint()` | Hash of the grid and potential values of a system |
+| `adaptive()`    | Resample the potential to a non-uniform grid, with more points in the wells |
+| `derivatives()` | Derivatives of the potential values with respect to the potential constants |
+| `constants_of()` | Full list of potential constants of a system, including default values |
+| `symmetry()`    | Rotational symmetry of the potential of a system |
 
 To solve the system, optionally interpolating to a new gridsize, use the `System.solve(gridsize)` method.  
 However, if you just want to quickly solve or interpolate the potential, check the `System.solve_potential(gridsize)` method.
@@ -40,11 +46,12 @@ Available potentials are:
 """
 
 
-from .system import System
+from .system import System, UniformGrid
 from . import constants
 from . import systems
 import numpy as np
 import os
+import hashlib
 from copy import deepcopy
 from scipy.interpolate import CubicSpline
 import aton.alias as alias
@@ -325,6 +332,8 @@ def merge(
             s.gridsize = max_gridsize
             s = interpolate(s)
 
+    fits = [_get_fit(s) for s in add] + [_get_fit(s) for s in subtract]
+    signs = [1] * len(add) + [-1] * len(subtract)
     if len(add) == 0:
         if len(subtract) == 0:
             raise ValueError('No systems were provided!')
@@ -339,6 +348,21 @@ def merge(
         result.potential_values = np.sum([result.potential_values, system.potential_values], axis=0)
     for system in subtract:
         result.potential_values = np.sum([result.potential_values, -system.potential_values], axis=0)
+    # Merge the previous fits too, if all systems were fitted in the same way
+    result.potential_fit = None
+    merged_fit = {}
+    splines = [fit['spline'] for fit in fits if fit is not None and 'spline' in fit]
+    if len(splines) == len(fits) and all(np.array_equal(spline.x, splines[0].x) for spline in splines):
+        merged_fit['spline'] = deepcopy(splines[0])
+        merged_fit['spline'].c = sum(sign * spline.c for sign, spline in zip(signs, splines))
+    series = [fit['fft'] for fit in fits if fit is not None and 'fft' in fit]
+    if len(series) == len(fits):
+        merged_fit['fft'] = np.zeros(max(len(c) for c in series), dtype=complex)
+        for sign, coefficients in zip(signs, series):
+            merged_fit['fft'][:len(coefficients)] += sign * coefficients
+    if merged_fit:
+        merged_fit['key'] = fingerprint(result)
+        result.potential_fit = merged_fit
     if comment != None:
         result.comment = comment
     return result
@@ -358,31 +382,322 @@ def scale(
         result.potential_values = system.potential_values * factor
     else:
         result.potential_values = np.zeros(system.gridsize)
+    _transform_fit(result, _get_fit(system), factor=factor)
     if comment != None:
         result.comment = comment
     return result
 
 
-def interpolate(system:System) -> System:
+def transform(
+        system:System,
+        factor:float=1.0,
+        shift:float=0.0,
+        ) -> System:
+    """Transforms the `System.potential_values` of a `system` in place as `V * factor + shift`.
+
+    The fitted interpolation in `System.potential_fit` is transformed too,
+    so that it does not need to be fitted again.
+    """
+    fit = _get_fit(system)
+    system.potential_values = np.asarray(system.potential_values, dtype=float) * factor + shift
+    _transform_fit(system, fit, factor, shift)
+    return system
+
+
+def interpolate(
+        system:System,
+        method:str=None,
+        ) -> System:
     """Interpolates the current `System.potential_values`
     to a new grid of size `System.gridsize`.
 
+    The interpolation `method` defaults to `System.interpolation`, and can be:  
+    `'spline'`, a periodic cubic spline (default);  
+    `'fft'`, a band-limited Fourier series. Uniform grids over $2\\pi$ are
+    resampled exactly with a zero-padded FFT, while non-uniform grids
+    (e.g. scans with missing angles) are fitted by least squares.
+    The Fourier series is smoother and exactly periodic, avoiding spurious
+    high-frequency ripples in smooth potentials.
+
+    The fit is stored in `System.potential_fit` and reused in later calls,
+    as long as the grid and potential values are not modified in between,
+    so that resampling the same potential to several gridsizes only fits it once.
+
     This basic function is called by `qrotor.solve.potential()`,
     which is the recommended way to interpolate potentials.
     """
+    if method is None:
+        method = getattr(system, 'interpolation', None) or 'spline'
     print(f"Interpolating potential to a grid of size {system.gridsize}...")
-    V = system.potential_values
-    grid = system.grid
-    gridsize = system.gridsize
-    new_grid = np.linspace(0, 2*np.pi, gridsize)
+    new_grid = UniformGrid(system.gridsize)
+    if method.lower() == 'spline':
+        cubic_spline = _spline(system)
+        new_V = cubic_spline(new_grid)
+    elif method.lower() == 'fft':
+        coefficients = _fourier(system)
+        new_V = _fourier_linspace(coefficients, system.gridsize)
+    else:
+        raise ValueError(f"Unrecognised interpolation method '{method}', use 'spline' or 'fft'")
+    system.grid = new_grid
+    system.potential_values = new_V
+    # The fit is still valid for the resampled potential
+    system.potential_fit['key'] = fingerprint(system)
+    return system
+
+
+def adaptive(
+        system:System,
+        gridsize:int=None,
+        alpha:float=10.0,
+        ) -> System:
+    """Resamples the `system` to a non-uniform grid of `gridsize` points,
+    concentrating them in the potential wells.
+
+    The density of points is proportional to $1 + \\alpha V''_+ / max(V''_+)$,
+    where $V''_+$ is the positive curvature of the potential, largest at the bottom of the wells.
+    Deep and narrow wells are then resolved with fewer points
+    than with a uniform grid of the same accuracy.
+    Larger values of `alpha` are only worth it for very deep wells,
+    since shallow potentials have wavefunctions spread over the whole circle.
+    Current potential values are interpolated with a periodic cubic spline,
+    while named potentials are evaluated again on the new grid upon solving.
+    See `qrotor.solve.laplacian_bands()` for details on how non-uniform grids are solved.
+    """
+    if len(system.grid) == 0 or len(system.potential_values) == 0:
+        raise ValueError('System.grid and System.potential_values must be set first, e.g. with System.solve_potential()')
+    if gridsize:
+        system.gridsize = gridsize
+    print(f"Creating adaptive grid of size {system.gridsize}...")
+    cubic_spline = _spline(system)
+    # Cumulative density of points over a fine uniform grid
+    reference = np.linspace(0, 2*np.pi, 4 * system.gridsize + 1)
+    curvature = np.maximum(cubic_spline(reference, 2), 0)
+    density = 1 + alpha * curvature / max(np.max(curvature), np.finfo(float).tiny)
+    cumulative = np.concatenate([[0], np.cumsum(density[1:] + density[:-1])])
+    cumulative *= 2*np.pi / cumulative[-1]
+    # Invert the cumulative density, without repeating the point at 2pi
+    new_grid = np.interp(np.linspace(0, 2*np.pi, system.gridsize, endpoint=False), cumulative, reference)
+    system.grid = new_grid
+    system.potential_values = cubic_spline(new_grid)
+    system.potential_fit['key'] = fingerprint(system)
+    return system
+
+
+def derivatives(
+        system:System,
+        grid=None,
+        step:float=1e-6,
+        ) -> np.ndarray:
+    """Returns the derivatives of the potential of a `system` with respect to
+    each of its `System.potential_constants`, with shape `(constants, len(grid))`.
+
+    The potential is evaluated from the `System.potential_name` on the `system.grid`,
+    or on an alternative `grid`, including the offset correction
+    if `System.correct_potential_offset = True`.
+    Missing constants are completed with the default values of the potential, see `constants_of()`.
+    Derivatives are calculated with central finite differences of relative `step`,
+    which are exact for constants that enter linearly, such as those of `titov2023()`.
+    Only the potential is evaluated, the system is not solved again.
+    """
+    grid = system.grid if grid is None else grid
+    C = constants_of(system)
+    probe = System(potential_name=system.potential_name, correct_potential_offset=system.correct_potential_offset)
+    probe.grid = grid
+    gradient = np.zeros((len(C), len(grid)))
+    for i, value in enumerate(C):
+        h = step * max(1.0, abs(value))
+        values = []
+        for shift in (h, -h):
+            probe.potential_constants = C[:i] + [value + shift] + C[i+1:]
+            V = np.asarray(solve(probe), dtype=float)
+            values.append(V - min(V) if probe.correct_potential_offset is True else V)
+        gradient[i] = (values[0] - values[1]) / (2 * h)
+    return gradient
+
+
+def constants_of(system:System) -> list:
+    """Returns the full list of potential constants used by a `system`,
+    completing its `System.potential_constants` with the defaults of its `System.potential_name`.
+
+    Returns an empty list for custom potentials without a `potential_name`.
+    """
+    name = system.potential_name.lower() if system.potential_name else ''
+    if name == 'titov2023':
+        defaults = list(constants.constants_titov2023[0])
+    elif name in alias.math['sin'] or name in alias.math['cos']:
+        defaults = [0, 1, 3, 0]
+    else:
+        defaults = []
+    given = [] if system.potential_constants is None else [float(c) for c in system.potential_constants]
+    return given + defaults[len(given):]
+
+
+def symmetry(system:System, tol:float=1e-2) -> int:
+    """Returns the n-fold rotational symmetry of the potential of a `system`,
+    as the greatest common divisor of the harmonics present in the potential.
+
+    Named potentials are resolved from their constants, see `constants_of()`,
+    so that it also works for `qrotor.system.SystemResult` objects without potential values.
+    Custom potentials use the Fourier harmonics of their `System.potential_values`
+    with an amplitude above `tol` times the largest one.
+    Returns 1 if the potential has no symmetry, or if it is unknown, e.g. for a zero potential.
+    """
+    name = system.potential_name.lower() if system.potential_name else ''
+    if name == 'titov2023':
+        C = constants_of(system)
+        harmonics = [n for n, terms in ((3, C[1:3]), (6, C[3:5])) if any(terms)]
+    elif name in alias.math['sin'] or name in alias.math['cos']:
+        C = constants_of(system)
+        fold = round(abs(C[2]))
+        harmonics = [fold] if C[1] and fold and np.isclose(abs(C[2]), fold) else []
+    elif name in alias.math['0']:
+        harmonics = []
+    else:
+        values = getattr(system, 'potential_values', None)
+        if values is None or len(values) < 3:
+            return 1
+        amplitudes = np.abs(_fourier(system)[1:])
+        harmonics = np.flatnonzero(amplitudes > tol * amplitudes.max()) + 1 if amplitudes.any() else []
+    return int(np.gcd.reduce(harmonics)) if len(harmonics) else 1
+
+
+def fingerprint(system:System) -> str:
+    """Returns a hash of the current `System.grid` and `System.potential_values`.
+
+    Used to check whether results derived from them, such as
+    `System.potential_fit` or `System.solved_potential_key`, are still valid.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    for array in (system.grid, system.potential_values):
+        if isinstance(array, UniformGrid):
+            h.update(repr(array).encode())
+            continue
+        array = np.ascontiguousarray(array, dtype=float)
+        h.update(str(array.shape).encode())
+        h.update(array.tobytes())
+    return h.hexdigest()
+
+
+def _get_fit(system:System) -> dict:
+    """Returns the `System.potential_fit` if it is still valid
+    for the current grid and potential values, None otherwise."""
+    fit = getattr(system, 'potential_fit', None)
+    if fit and fit.get('key') == fingerprint(system):
+        return fit
+    return None
+
+
+def _periodic_data(system:System) -> tuple:
+    """Returns the grid and potential values over a single period,
+    dropping the last point if it closes the period, as in `np.linspace(0, 2*np.pi)`."""
+    V = np.asarray(system.potential_values, dtype=float)
+    grid = np.asarray(system.grid, dtype=float)
+    if len(grid) > 2 and np.isclose(grid[-1] - grid[0], 2*np.pi):
+        grid = grid[:-1]
+        V = V[:-1]
+    return grid, V
+
+
+def _spline(system:System) -> CubicSpline:
+    """Returns the periodic cubic spline of the potential values,
+    reusing the one cached in `System.potential_fit` if still valid."""
+    fit = _get_fit(system)
+    if fit is not None and 'spline' in fit:
+        return fit['spline']
+    grid, V = _periodic_data(system)
     # Impose periodic boundary conditions
     grid_periodic = np.append(grid, grid[0] + 2*np.pi)
     V_periodic = np.append(V, V[0])
     cubic_spline = CubicSpline(grid_periodic, V_periodic, bc_type='periodic')
-    new_V = cubic_spline(new_grid)
-    system.grid = new_grid
-    system.potential_values = new_V
-    return system
+    if fit is None:
+        fit = {'key': fingerprint(system)}
+        system.potential_fit = fit
+    fit['spline'] = cubic_spline
+    return cubic_spline
+
+
+def _fourier(system:System) -> np.ndarray:
+    """Returns the complex Fourier coefficients of the potential values,
+    reusing the ones cached in `System.potential_fit` if still valid.
+
+    The potential is expressed as $V(x) = Re(\\sum_k C_k e^{ikx})$.
+    Uniform grids are transformed with an FFT.
+    Non-uniform grids are fitted by least squares,
+    keeping only the harmonics resolved by the largest gap between points.
+    """
+    fit = _get_fit(system)
+    if fit is not None and 'fft' in fit:
+        return fit['fft']
+    grid, V = _periodic_data(system)
+    M = len(grid)
+    steps = np.diff(np.append(grid, grid[0] + 2*np.pi))
+    if np.allclose(steps, 2*np.pi / M, rtol=1e-6, atol=0):
+        F = np.fft.rfft(V)
+        k = np.arange(len(F))
+        coefficients = 2 * F / M
+        coefficients[0] = F[0] / M
+        if M % 2 == 0:  # Nyquist term
+            coefficients[-1] = F[-1] / M
+        coefficients = coefficients * np.exp(-1j * k * grid[0])
+    else:
+        K = min((M - 1) // 2, int(np.pi / np.max(steps)))
+        k = np.arange(1, K + 1)
+        A = np.hstack([np.ones((M, 1)), np.cos(np.outer(grid, k)), np.sin(np.outer(grid, k))])
+        solution = np.linalg.lstsq(A, V, rcond=None)[0]
+        coefficients = np.empty(K + 1, dtype=complex)
+        coefficients[0] = solution[0]
+        coefficients[1:] = solution[1:K+1] - 1j * solution[K+1:]
+    if fit is None:
+        fit = {'key': fingerprint(system)}
+        system.potential_fit = fit
+    fit['fft'] = coefficients
+    return coefficients
+
+
+def _fourier_linspace(
+        coefficients:np.ndarray,
+        gridsize:int,
+        ) -> np.ndarray:
+    """Evaluates a Fourier series over `np.linspace(0, 2*np.pi, gridsize)` with an inverse FFT.
+
+    Harmonics that can not be resolved with `gridsize` points are discarded.
+    """
+    N = gridsize - 1  # Last point closes the period
+    G = np.zeros(N // 2 + 1, dtype=complex)
+    K = min(len(coefficients) - 1, N // 2)
+    G[0] = N * coefficients[0].real
+    G[1:K+1] = N * coefficients[1:K+1] / 2
+    if N % 2 == 0 and K == N // 2:  # Nyquist term
+        G[K] = N * coefficients[K].real
+    V = np.fft.irfft(G, N)
+    return np.append(V, V[0])
+
+
+def _transform_fit(
+        system:System,
+        fit:dict,
+        factor:float=1.0,
+        shift:float=0.0,
+        ) -> None:
+    """Keeps a previous `fit` valid after the potential values of the `system`
+    were transformed as `V * factor + shift`, without fitting them again."""
+    if fit is None:
+        return None
+    new_fit = {}
+    if 'spline' in fit and factor == 1 and shift == 0:
+        new_fit['spline'] = fit['spline']
+    elif 'spline' in fit:
+        spline = deepcopy(fit['spline'])
+        spline.c *= factor
+        spline.c[-1] += shift
+        new_fit['spline'] = spline
+    if 'fft' in fit:
+        coefficients = fit['fft'] * factor
+        coefficients[0] += shift
+        new_fit['fft'] = coefficients
+    new_fit['key'] = fingerprint(system)
+    system.potential_fit = new_fit
+    return None
 
 
 def solve(system:System):
@@ -0,0 +1,173 @@
+"""
+# Description
+
+This module contains a precomputed table of the energies of $cos(3\\varphi)$ potentials in reduced units.
+
+For a potential $V(\\varphi) = \\frac{V_3}{2} cos(3\\varphi)$ with a barrier height $V_3$,
+as the `'cos'` potential with `potential_constants = [0, V3, 3, 0]`,
+the spectrum only depends on the ratio $V_3/B$.
+The reduced eigenvalues $E/B$, tunnel splittings and excitations
+are stored over a dense range of $V_3/B$ in the bundled data file `filepath`,
+and are interpolated with cubic splines for any barrier height and B, without solving any system:
+```python
+import numpy as np
+import qrotor as qr
+qr.reduced.splittings(V=30, B=qr.B_CH3)  # Same as solving qr.System(potential_name='cos', potential_constants=[0, 30, 3, 0])
+qr.reduced.splittings(V=np.linspace(10, 100, 1000), B=qr.B_CD3)  # Many barriers at once
+```
+Arrays of barriers `V` and kinetic energies `B` are broadcasted,
+returning arrays with an additional last axis for the levels.
+
+Levels are the consecutive triplets of eigenvalues, as expected from the C3 symmetry.
+Tunnel splittings are the energy differences between the singlet and the doublet of each triplet,
+and excitations are the mean energies of each triplet with respect to the ground one,
+as in `qrotor.solve.excitations()`.
+Note that for shallow potentials, $V_3/B$ below 10, the free-rotor levels are mixed between triplets.
+
+The table covers $V_3/B$ from 0 to `V_B_max`, where the ground splitting is still above $10^{-8}B$.
+Values outside this range are NaN.
+The table was generated with `generate()`, which can be run again as `python -m qrotor.reduced`.
+Its format is given by `table_version`; tables from other versions must be generated again.
+
+
+# Index
+
+| | |
+| --- | --- |
+| `eigenvalues()` | Eigenvalues in meV for any barrier height and B |
+| `splittings()`  | Tunnel splittings in meV for any barrier height and B |
+| `excitations()` | Excitation energies in meV for any barrier height and B |
+| `load()`        | Load the table of reduced energies |
+| `generate()`    | Generate the table of reduced energies |
+
+---
+"""
+
+
+from .system import System
+from .constants import B_CH3
+from .fit import surrogate
+from ._version import __version__
+import os
+import numpy as np
+from scipy.interpolate import CubicSpline
+
+
+filepath: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'reduced_cos3.npz')
+"""Bundled table of reduced energies."""
+table_version: int = 1
+"""Version of the table format."""
+V_B_max: float = 300.0
+"""Maximum reduced barrier $V_3/B$ of the bundled table."""
+
+_cache = {}
+
+
+def eigenvalues(V, B=B_CH3) -> np.ndarray:
+    """Returns the eigenvalues in meV of a $cos(3\\varphi)$ potential
+    with a barrier height `V` and kinetic energy `B`, both in meV,
+    from the interpolated table of reduced energies.
+    B defaults to that of methyl groups, `qrotor.constants.B_CH3`."""
+    return _interpolate('eigenvalues', V, B)
+
+
+def splittings(V, B=B_CH3) -> np.ndarray:
+    """Returns the tunnel splittings in meV of each level of a $cos(3\\varphi)$ potential
+    with a barrier height `V` and kinetic energy `B`, both in meV,
+    from the interpolated table of reduced energies."""
+    return _interpolate('splittings', V, B)
+
+
+def excitations(V, B=B_CH3) -> np.ndarray:
+    """Returns the excitation energies in meV of a $cos(3\\varphi)$ potential
+    with a barrier height `V` and kinetic energy `B`, both in meV,
+    from the interpolated table of reduced energies."""
+    return _interpolate('excitations', V, B)
+
+
+def load(path:str=None) -> dict:
+    """Loads the table of reduced energies from `path`, or the bundled `filepath` by default.
+
+    Returns a dict with the `V_B` values and the reduced `eigenvalues`, `splittings` and `excitations`,
+    with one row per $V_3/B$ value, as well as the generation parameters.
+    Raises a ValueError if the table was generated with another `table_version`.
+    """
+    path = filepath if path is None else path
+    if path in _cache:
+        return _cache[path]['table']
+    with np.load(path) as data:
+        table = {key: data[key] for key in data.files}
+    if int(table['table_version']) != table_version:
+        raise ValueError(f'The table in {path} has version {int(table["table_version"])}, '
+                         f'expected {table_version}. Generate it again with qrotor.reduced.generate()')
+    # Splittings decay exponentially, so they are interpolated in logarithmic scale
+    splines = {
+        'eigenvalues': CubicSpline(table['V_B'], table['eigenvalues'], axis=0),
+        'splittings': CubicSpline(table['V_B'], np.log(table['splittings']), axis=0),
+        'excitations': CubicSpline(table['V_B'], table['excitations'], axis=0),
+    }
+    _cache[path] = {'table': table, 'splines': splines}
+    return table
+
+
+def generate(
+        path:str=None,
+        V_B_max:float=V_B_max,
+        step:float=0.2,
+        searched_E:int=15,
+        modes:int=60,
+        ) -> str:
+    """Generates the table of reduced energies, saving it to `path`, or to the bundled `filepath`.
+
+    The eigenvalues are solved with B = 1 for barriers from 0 to `V_B_max` in steps of `step`,
+    with the free-rotor basis of `qrotor.fit.surrogate()` of a given number of `modes`,
+    which is converged to $10^{-12}B$ for the default values.
+    Only complete triplets of the `searched_E` eigenvalues are kept.
+    Returns the path of the new table.
+    """
+    path = filepath if path is None else path
+    V_B = np.arange(0, V_B_max + step / 2, step)
+    searched_E = searched_E - searched_E % 3
+    print(f'Generating table of reduced energies for {len(V_B)} barriers...')
+    E = np.empty((len(V_B), searched_E))
+    for i, value in enumerate(V_B):
+        system = System(B=1.0, potential_name='cos', potential_constants=[0, float(value), 3, 0], searched_E=searched_E)
+        E[i] = surrogate(system, modes)
+    triplets = E.reshape(len(V_B), -1, 3)
+    singlet_low = (triplets[..., 1] - triplets[..., 0]) > (triplets[..., 2] - triplets[..., 1])
+    split = np.where(singlet_low,
+                     (triplets[..., 1] + triplets[..., 2]) / 2 - triplets[..., 0],
+                     triplets[..., 2] - (triplets[..., 0] + triplets[..., 1]) / 2)
+    means = triplets.mean(axis=-1)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    np.savez_compressed(
+        path,
+        V_B=V_B,
+        eigenvalues=E,
+        splittings=split,
+        excitations=means[:, 1:] - means[:, :1],
+        table_version=table_version,
+        qrotor_version=__version__,
+        modes=modes,
+    )
+    _cache.pop(path, None)
+    print(f'Saved to {path}')
+    return path
+
+
+def _interpolate(name:str, V, B) -> np.ndarray:
+    """Interpolates the `name` column of the table for barriers `V` and kinetic energies `B`, in meV."""
+    table = load()
+    spline = _cache[filepath]['splines'][name]
+    V, B = np.broadcast_arrays(np.asarray(V, dtype=float), np.asarray(B, dtype=float))
+    V_B = V / B
+    outside = ~((V_B >= table['V_B'][0]) & (V_B <= table['V_B'][-1]))
+    values = spline(np.clip(np.nan_to_num(V_B), table['V_B'][0], table['V_B'][-1]))
+    if name == 'splittings':
+        values = np.exp(values)
+    values = np.where(outside[..., None], np.nan, values)
+    return values * B[..., None]
+
+
+if __name__ == '__main__':
+    generate()
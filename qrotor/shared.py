@@ -0,0 +1,162 @@
+"""
+# Description
+
+This module contains a registry of read-only arrays shared between systems and processes.
+
+Many systems often share the same grid and potential values.
+Arrays registered with `share()` are stored once as memory-mapped `.npy` files
+in `qrotor.shared.folder`, identified by a hash of their contents,
+and every system receives a read-only view of the same data.
+Identical arrays are deduplicated within a process.
+Shared arrays are pickled with their values by default, so saved systems can always be loaded.
+When systems are only sent to other processes, e.g. with a `multiprocessing.Pool`,
+set `by_reference = True` to pickle shared arrays as a reference to their file instead.
+The workers then map the same file, so no copies are made.
+
+```python
+import qrotor as qr
+systems = []
+for B in [qr.B_CH3, qr.B_CD3]:
+    system = qr.System(B=B, potential_name='titov2023')
+    system.solve_potential()
+    systems.append(qr.shared.share_system(system))
+systems[0].potential_values is systems[1].potential_values  # True
+```
+
+Note that shared arrays can not be modified in place.
+Arithmetic operations return regular NumPy arrays.
+Shared files are kept until `clear()` is called,
+so systems pickled by reference can not be loaded after that.
+
+
+# Index
+
+| | |
+| --- | --- |
+| `share()`        | Register an array, returning a read-only shared view |
+| `share_system()` | Share the grid and potential values of a system |
+| `clear()`        | Remove all shared arrays |
+
+---
+"""
+
+
+from .system import System, UniformGrid
+import os
+import getpass
+import tempfile
+import hashlib
+import weakref
+import numpy as np
+
+
+folder: str = None
+"""Folder where the shared arrays are stored as memory-mapped files.
+Defaults to a `qrotor-shared-<user>` folder in the temporary directory."""
+by_reference: bool = False
+"""Pickle shared arrays as a reference to their file instead of their values.
+Only use it to send systems to other processes, never to save them."""
+
+_registry = weakref.WeakValueDictionary()
+
+
+class SharedArray(np.ndarray):
+    """Read-only view of an array stored in a memory-mapped file.
+
+    Pickled with its values, or as a reference to its file if `by_reference = True`.
+    Views and operations return regular `np.ndarray` objects.
+    """
+    def __array_finalize__(self, obj):
+        self.path = None
+
+    def __array_wrap__(self, array, context=None, return_scalar=False):
+        array = np.asarray(array)
+        if return_scalar:
+            return array[()]
+        return array
+
+    def __reduce__(self):
+        if self.path is None or not by_reference:
+            return np.array(self).__reduce__()
+        return (attach, (self.path,))
+
+    def __deepcopy__(self, memo):
+        return self  # Already read-only
+
+
+def _folder() -> str:
+    """Returns the current `folder`, resolving the default one for the current user."""
+    if folder is not None:
+        return folder
+    try:
+        user = getpass.getuser()
+    except Exception:  # No user name in some containers
+        user = str(os.getuid()) if hasattr(os, 'getuid') else 'default'
+    return os.path.join(tempfile.gettempdir(), f'qrotor-shared-{user}')
+
+
+def _key(array:np.ndarray) -> str:
+    h = hashlib.blake2b(digest_size=20)
+    h.update(f'{array.dtype.str}{array.shape}'.encode())
+    h.update(array.tobytes())
+    return h.hexdigest()
+
+
+def attach(path:str) -> SharedArray:
+    """Returns the shared array stored in `path`, mapping it only once per process."""
+    shared = _registry.get(path)
+    if shared is None:
+        shared = np.load(path, mmap_mode='r').view(SharedArray)
+        shared.path = path
+        _registry[path] = shared
+    return shared
+
+
+def share(array) -> SharedArray:
+    """Registers an `array`, returning a read-only view shared with
+    all identical arrays of the current and other processes."""
+    if isinstance(array, SharedArray) and array.path is not None:
+        return array
+    array = np.ascontiguousarray(array)
+    directory = _folder()
+    path = os.path.join(directory, f'{_key(array)}.npy')
+    if path not in _registry and not os.path.isfile(path):
+        os.makedirs(directory, exist_ok=True)
+        temp_path = f'{path}.{os.getpid()}.tmp.npy'
+        np.save(temp_path, array)
+        os.replace(temp_path, path)  # Atomic, safe across processes
+    return attach(path)
+
+
+def share_system(system:System) -> System:
+    """Replaces the grid and potential values of a `system` with shared arrays.
+
+    A `qrotor.system.UniformGrid` is already compact, so it is not replaced.
+
+    Should be called after solving the potential,
+    since solving it again creates new arrays.
+    """
+    if len(system.grid) > 0 and not isinstance(system.grid, UniformGrid):
+        system.grid = share(system.grid)
+    if len(system.potential_values) > 0:
+        system.potential_values = share(system.potential_values)
+    return system
+
+
+def clear() -> None:
+    """Removes all shared arrays from the registry and from `folder`.
+
+    Systems of the current process keep their data,
+    but other processes will not be able to attach to it.
+    """
+    _registry.clear()
+    directory = _folder()
+    if not os.path.isdir(directory):
+        return None
+    for filename in os.listdir(directory):
+        if filename.endswith('.npy'):
+            try:
+                os.remove(os.path.join(directory, filename))
+            except OSError:  # Still mapped in Windows
+                pass
+    return None
@@ -20,45 +20,290 @@ This documentation page is left for reference and advanced users only.
 | --- | --- |
 | `energies()`              | Solve the quantum system, including eigenvalues and eigenvectors |
 | `potential()`             | Solve the potential values of the system |
+| `scan()`                  | Solve many systems one at a time, saving the results incrementally |
+| `threads()`               | Limit the number of BLAS, LAPACK and OpenMP threads |
+| `cpu_count()`             | Number of cores available to the current process |
 | `schrodinger()`           | Solve the Schrödiger equation for the system |
 | `hamiltonian_matrix()`    | Calculate the hamiltonian matrix of the system |
+| `hamiltonian_operator()`  | Matrix-free hamiltonian operator of the system |
 | `laplacian_matrix()`      | Calculate the second derivative matrix for a given grid |
+| `laplacian_bands()`       | Calculate the periodic tridiagonal bands of the second derivative |
+| `grid_weights()`          | Integration weights of a uniform or non-uniform grid |
+| `hamiltonian_bands()`     | Calculate the periodic tridiagonal bands of the hamiltonian |
 | `excitations()`           | Get excitation levels and tunnel splitting energies |
+| `excitations_many()`      | Get excitation levels and tunnel splittings of many spectra at once |
 | `E_levels`                | Group a list of degenerated eigenvalues by energy levels |
+| `E_levels_many()`         | Group the energy levels of many spectra at once, with their excitations and splittings |
 
 ---
 """
 
 
-from .system import System
+from .system import System, is_uniform
 from .potential import solve as solve_potential
 from .potential import interpolate
+from .potential import transform, fingerprint, symmetry
+from . import cache
+from . import shared
+from .systems import save_summary, _summary_rows
+import os
 import time
+import importlib
+import functools
+import warnings
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 from scipy import sparse
+from scipy.sparse.linalg import LinearOperator
+from scipy.linalg import lapack
 import aton
 from ._version import __version__
 
 
-def energies(system:System, filename:str=None) -> System:
+lobpcg_tol: float = 1e-3
+"""Tolerance for the residual norms of the `'lobpcg'` solver, in meV."""
+
+
+def energies(
+        system:System,
+        filename:str=None,
+        use_cache:bool=None,
+        ) -> System:
     """Solves the quantum `system`.
 
     This includes solving the potential, the eigenvalues and the eigenvectors.
 
     The resulting System object is saved with pickle to `filename` if specified.
+
+    If `use_cache = True`, previous results for identical inputs are
+    loaded from the persistent `qrotor.cache` instead of solving the system again.
+    Defaults to `qrotor.cache.enabled`.
     """
+    if use_cache is None:
+        use_cache = cache.enabled
+    if use_cache:
+        inputs_key = cache.key(system)
+        if cache.load(system, inputs_key) is not None:
+            print('Loaded solved system from cache.')
+            if filename:
+                aton.file.save(system, filename)
+            return system
     system = potential(system)
     system = schrodinger(system)
+    if use_cache:
+        cache.save(system, inputs_key)
     if filename:
         aton.file.save(system, filename)
     return system
 
 
+def scan(
+        systems,
+        filepath:str='qrotor_summary.csv',
+        folder:str=None,
+        resume:bool=False,
+        reduce:bool=True,
+        comment:str='',
+        workers:int=1,
+        threads_per_worker:int=None,
+        ):
+    """Solves an iterable of `systems` one at a time, yielding each solved System.
+
+    This generator is intended for very large parameter scans.
+    The `systems` can be a list, or better, a generator creating each System on demand.
+    After solving each system, a new row is appended to the summary CSV in `filepath`,
+    see `qrotor.systems.save_summary()`.
+    If a `folder` is specified, the eigenvalues, eigenvectors, grid and potential values
+    of each system are also saved there as `{index}.npz` NumPy files.
+    With `reduce = True` (default), the heavy data of each system is discarded
+    after saving it, so that memory stays flat regardless of the scan length,
+    see `qrotor.system.System.reduce_size()`.
+
+    By default, any previous `filepath` is overwritten.
+    If the scan is interrupted, running it again with `resume = True`
+    skips the systems already present in `filepath`,
+    so the `systems` must be provided in the same order.
+    A ValueError is raised if the comment or B of a skipped system
+    does not match its row, e.g. if `filepath` belongs to another scan.
+
+    By default the systems are solved in the current process,
+    with as many BLAS threads as available cores.
+    With `workers > 1`, they are solved in parallel by a pool of processes,
+    each limited to `threads_per_worker` threads, see `threads()`.
+    Results are still saved and yielded in order.
+    With `workers = None`, the number of workers and threads is chosen automatically
+    to use all cores without oversubscription: one single-threaded worker per core
+    for long scans, or fewer workers with more threads each when there are less systems than cores.
+    Parallel scans must be run under `if __name__ == '__main__':` in scripts.
+    ```python
+    def scan_inputs():
+        for V in np.linspace(0, 100, 10000):
+            yield qr.System(potential_name='cos', potential_constants=[0, V, 3, 0], comment=str(V))
+    for system in qr.solve.scan(scan_inputs(), 'scan.csv', resume=True):
+        print(system.comment, system.splittings[0])
+    ```
+    """
+    rows = _summary_rows(filepath) if resume else []
+    done = len(rows)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    pending = _skip_solved(systems, rows)
+    length = len(systems) - done if hasattr(systems, '__len__') else None
+    workers, threads_per_worker = _thread_budget(length, workers, threads_per_worker)
+    if workers > 1:
+        solved = _solve_parallel(pending, workers, threads_per_worker)
+    else:
+        solved = _solve_serial(pending, threads_per_worker)
+    for index, system in enumerate(solved, start=done):
+        if folder:
+            np.savez(
+                os.path.join(folder, f'{index}.npz'),
+                eigenvalues=np.asarray(system.eigenvalues, dtype=float),
+                eigenvectors=np.asarray(system.eigenvectors, dtype=float),
+                grid=np.asarray(system.grid, dtype=float),
+                potential_values=np.asarray(system.potential_values, dtype=float),
+            )
+        save_summary(system, comment=comment, filepath=filepath, append=(index > 0 or done > 0))
+        if reduce:
+            system.reduce_size()
+        yield system
+
+
+def _skip_solved(systems, rows:list):
+    """Yields the `systems` after the ones already saved in the summary `rows`,
+    checking that the skipped systems have the same comment and B as their rows."""
+    for index, system in enumerate(systems):
+        if index >= len(rows):
+            yield system
+            continue
+        comment, B = rows[index]
+        if comment != ('' if system.comment is None else str(system.comment)) or not np.isclose(B, system.B):
+            raise ValueError(f'Row {index} of the summary does not match system {index} of the scan, '
+                             f'found comment={comment!r} and B={B}. Set resume=False or use another filepath.')
+
+
+@contextmanager
+def threads(limit:int=1):
+    """Context manager that limits the number of BLAS, LAPACK and OpenMP threads to `limit`.
+
+    Use it to avoid oversubscription when solving systems inside your own pool of processes:
+    ```python
+    with qr.solve.threads(1):
+        system.solve()
+    ```
+    Requires the optional [threadpoolctl](https://github.com/joblib/threadpoolctl) package,
+    installed with `pip install qrotor[threads]`.
+    If it is not installed, a warning is printed and the number of threads is not limited.
+    """
+    threadpool_limits = _threadpool_limits()
+    if threadpool_limits is None:
+        yield
+        return
+    with threadpool_limits(limits=limit):
+        yield
+
+
+@functools.lru_cache(maxsize=None)
+def _threadpool_limits():
+    """Returns `threadpoolctl.threadpool_limits`, or None with a warning if it is not installed.
+    The result is cached, so the warning is only printed once per process."""
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        print('WARNING:  threadpoolctl is not installed, the number of threads will not be limited.\n')
+        return None
+    return threadpool_limits
+
+
+def cpu_count() -> int:
+    """Returns the number of cores available to the current process.
+
+    Unlike `os.cpu_count()`, it respects the CPU affinity of the process where supported,
+    e.g. when running under a job scheduler or inside a container limited to some cores.
+    """
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def _thread_budget(
+        length:int=None,
+        workers:int=None,
+        threads_per_worker:int=None,
+        ) -> tuple:
+    """Returns the number of `(workers, threads_per_worker)` to solve `length` systems.
+
+    Unset values are chosen to use all cores, preferring parallel solves,
+    since each solve only scales to a few threads.
+    `length` is None when unknown, e.g. for generators.
+    """
+    cores = cpu_count()
+    if workers is None:
+        workers = cores if length is None else max(1, min(cores, length))
+    if threads_per_worker is None and workers > 1:
+        threads_per_worker = max(1, cores // workers)
+    return workers, threads_per_worker
+
+
+def _solve_serial(systems, threads_per_worker:int=None):
+    """Solves the `systems` one by one in the current process."""
+    for system in systems:
+        if threads_per_worker:
+            with threads(threads_per_worker):
+                system = energies(system)
+        else:
+            system = energies(system)
+        yield system
+
+
+def _solve_parallel(systems, workers:int, threads_per_worker:int):
+    """Solves the `systems` in a pool of `workers` processes, yielding them in order.
+
+    Only a few systems per worker are submitted at a time,
+    so that generators of systems are not consumed all at once.
+    The module settings of the current process are applied in the workers, see `_settings()`.
+    """
+    if threads_per_worker and _threadpool_limits() is None:
+        threads_per_worker = None
+    initargs = (threads_per_worker, _settings())
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as pool:
+        queue = deque()
+        for system in systems:
+            queue.append(pool.submit(energies, system))
+            if len(queue) >= 2 * workers:
+                yield queue.popleft().result()
+        while queue:
+            yield queue.popleft().result()
+
+
+def _settings() -> dict:
+    """Module settings of the current process that change how systems are solved, by module."""
+    return {
+        cache.__name__: {'enabled': cache.enabled, 'folder': cache.folder, 'max_size': cache.max_size},
+        shared.__name__: {'folder': shared.folder, 'by_reference': shared.by_reference},
+        __name__: {'lobpcg_tol': lobpcg_tol},
+    }
+
+
+def _init_worker(threads_per_worker:int, settings:dict) -> None:
+    """Applies the module `settings` of the parent process and
+    limits the threads of each worker process for its whole lifetime."""
+    for module, values in settings.items():
+        for name, value in values.items():
+            setattr(importlib.import_module(module), name, value)
+    if threads_per_worker:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(limits=threads_per_worker)
+
+
 def potential(system:System, gridsize:int=None) -> System:
     """Solves the potential values of the `system`.
 
     Creates a grid if not yet present.
-    It also interpolates the potential if `system.gridsize` is larger than the current grid;
+    It also interpolates the potential if `system.gridsize` is larger than the current grid,
+    with the method in `system.interpolation`, see `qrotor.potential.interpolate()`;
     optionally, an alternative `gridsize` can be specified.
 
     It then solves the potential according to the potential name.
@@ -67,33 +312,56 @@ def potential(system:System, gridsize:int=None) -> System:
     """
     if gridsize:
         system.gridsize = gridsize
-    if not any(system.grid):
+    if len(system.grid) == 0:
         system.set_grid()
-    if system.gridsize and any(system.grid):
+    if system.gridsize and len(system.grid) > 0:
         if system.gridsize > len(system.grid):
             system = interpolate(system)
     V = solve_potential(system)
+    if not np.array_equal(V, system.potential_values):
+        system.potential_values = V  # New values from the potential_name, the previous fit is not valid
+    offset = 0.0
     if system.correct_potential_offset is True:
         offset = min(V)
-        V = V - offset
         system.potential_offset = offset
-    system.potential_max = max(V)
-    system.potential_min = min(V)
-    system.potential_values = V
+    system = transform(system, shift=-offset)
+    system.potential_max = max(system.potential_values)
+    system.potential_min = min(system.potential_values)
     return system
 
 
 def schrodinger(system:System) -> System:
     """Solves the Schrödinger equation for a given `system`.
     
-    Uses ARPACK in shift-inverse mode to solve the hamiltonian sparse matrix.
+    Uses ARPACK in shift-inverse mode to solve the hamiltonian.
+    The linear solver used in the shift-inverse iterations is selected with `System.solver`:
+    `'tridiagonal'` (default) factorises the periodic tridiagonal hamiltonian
+    in O(N) time and memory, see `hamiltonian_bands()`;
+    `'sparse'` performs a general sparse LU decomposition of `hamiltonian_matrix()`.
+
+    Alternatively, `'lobpcg'` uses the iterative LOBPCG eigensolver instead of ARPACK,
+    with the matrix-free `hamiltonian_operator()` and a free-rotor preconditioner.
+    It only stores a few blocks of `System.searched_E` vectors,
+    so it is suited for very large grids of millions of points.
+    Its convergence criterion is set by `lobpcg_tol`.
+
+    All solvers support non-uniform grids, such as those from `qrotor.potential.adaptive()`,
+    see `laplacian_bands()`.
     """
     time_start = time.time()
     V = system.potential_values
-    H = hamiltonian_matrix(system)
-    print('Solving Schrodinger equation...')
-    # Solve eigenvalues with ARPACK in shift-inverse mode, with a sparse matrix
-    eigenvalues, eigenvectors = sparse.linalg.eigsh(H, system.searched_E, which='LM', sigma=0, maxiter=10000)
+    solver = getattr(system, 'solver', 'tridiagonal')
+    if solver == 'sparse':
+        H = hamiltonian_matrix(system)
+        print('Solving Schrodinger equation...')
+        # Solve eigenvalues with ARPACK in shift-inverse mode, with a sparse matrix
+        eigenvalues, eigenvectors = sparse.linalg.eigsh(H, system.searched_E, which='LM', sigma=0, maxiter=10000)
+    elif solver == 'tridiagonal':
+        eigenvalues, eigenvectors = _eigsh_tridiagonal(system)
+    elif solver == 'lobpcg':
+        eigenvalues, eigenvectors = _lobpcg(system)
+    else:
+        raise ValueError(f"Unrecognised System.solver '{solver}'")
     if any(eigenvalues) is None:
         print('WARNING:  Not all eigenvalues were found.\n')
     else: print('Done.')
@@ -105,13 +373,91 @@ def schrodinger(system:System) -> System:
     system = excitations(system)
     # Do we really need to save eigenvectors?
     if system.save_eigenvectors == True:
+        if _spacings(system.grid) is not None:
+            # Back from the symmetric form, normalised as in uniform grids
+            weights = grid_weights(system.grid)
+            eigenvectors = eigenvectors * np.sqrt(np.mean(weights) / weights)[:, None]
         system.eigenvectors = np.transpose(eigenvectors)
     # Save potential max and min, in case these are not already saved
     system.potential_max = max(V)
     system.potential_min = min(V)
+    system.solved_potential_key = fingerprint(system)
     return system
 
 
+def _eigsh_tridiagonal(system:System) -> tuple:
+    """Solves the lowest `System.searched_E` eigenpairs exploiting the band structure of the hamiltonian.
+
+    The hamiltonian is shifted below `min(V)`, where it is positive definite.
+    The open tridiagonal part is factorised once with LAPACK `pttrf`,
+    and the periodic corners are added back as a rank-one
+    Sherman-Morrison correction in every shift-inverse iteration.
+    """
+    diagonal, offdiagonal, corner = hamiltonian_bands(system)
+    n = len(diagonal)
+    # Any shift below min(V) keeps H - sigma positive definite
+    sigma = min(system.potential_values) - abs(system.B)
+    # H - sigma = T + corner * w w^T, with w = e_0 + e_(n-1)
+    T = diagonal - sigma
+    T[0] -= corner
+    T[-1] -= corner
+    d, e, info = lapack.dpttrf(T, offdiagonal)
+    if info != 0:
+        raise np.linalg.LinAlgError(f'Tridiagonal factorisation failed with LAPACK info = {info}')
+    w = np.zeros(n)
+    w[0] = w[-1] = 1.0
+    z, info = lapack.dpttrs(d, e, w)
+    correction = corner / (1.0 + corner * (z[0] + z[-1]))
+    def solve_shifted(b):
+        b = np.asarray(b, dtype=float).reshape(n, -1)
+        y, info = lapack.dpttrs(d, e, b)
+        y = y - correction * np.outer(z, y[0] + y[-1])
+        return y
+    H = hamiltonian_operator(system)
+    OPinv = LinearOperator((n, n), matvec=solve_shifted, matmat=solve_shifted, dtype=float)
+    print('Solving Schrodinger equation...')
+    return sparse.linalg.eigsh(H, system.searched_E, which='LM', sigma=sigma, OPinv=OPinv, maxiter=10000)
+
+
+def _lobpcg(system:System) -> tuple:
+    """Solves the lowest `System.searched_E` eigenpairs with LOBPCG, without storing any matrix.
+
+    The hamiltonian is applied with `hamiltonian_operator()`.
+    The preconditioner is the inverse of the free-rotor hamiltonian,
+    shifted by the mean potential, which is diagonal in Fourier space and applied with FFTs.
+    The initial guesses are the free-rotor eigenstates, $1$, $cos(mx)$ and $sin(mx)$,
+    with a small random perturbation so that they span the full search space.
+    """
+    V = np.asarray(system.potential_values, dtype=float)
+    n = len(V)
+    x = np.asarray(system.grid, dtype=float)
+    kinetic = system.B / np.mean(grid_weights(system.grid))**2
+    # Eigenvalues of the periodic kinetic operator, plus a positive shift
+    k = np.arange(n // 2 + 1)
+    free_rotor = 2 * kinetic * (1 - np.cos(2 * np.pi * k / n)) + np.mean(V) - min(V) + abs(system.B)
+    def precondition(r):
+        r = np.asarray(r, dtype=float).reshape(n, -1)
+        return np.fft.irfft(np.fft.rfft(r, axis=0) / free_rotor[:, None], n, axis=0)
+    M = LinearOperator((n, n), matvec=precondition, matmat=precondition, dtype=float)
+    modes = [np.ones(n)]
+    m = 1
+    while len(modes) < system.searched_E:
+        modes.extend([np.cos(m * x), np.sin(m * x)])
+        m += 1
+    X = np.column_stack(modes[:system.searched_E])
+    X += 0.01 * np.random.default_rng(0).standard_normal(X.shape)
+    print('Solving Schrodinger equation...')
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', UserWarning)
+        eigenvalues, eigenvectors, residuals = sparse.linalg.lobpcg(
+            hamiltonian_operator(system), X, M=M, largest=False,
+            tol=lobpcg_tol, maxiter=1000, retResidualNormsHistory=True)
+    if np.max(residuals[-1]) > lobpcg_tol:
+        print(f'WARNING:  LOBPCG did not converge, max residual {np.max(residuals[-1]):.2e} > {lobpcg_tol}\n')
+    order = np.argsort(eigenvalues)
+    return eigenvalues[order], eigenvectors[:, order]
+
+
 def hamiltonian_matrix(system:System):
     """Calculates the Hamiltonian sparse matrix for a given `system`."""
     print(f'Creating Hamiltonian sparse matrix of size {system.gridsize}...')
@@ -124,19 +470,108 @@ def hamiltonian_matrix(system:System):
 
 
 def laplacian_matrix(grid):
-    """Calculates the Laplacian (second derivative) matrix for a given `grid`."""
-    x = grid
-    n = len(x)
-    diagonals = [-2*np.ones(n), np.ones(n), np.ones(n)]
-    laplacian_matrix = sparse.spdiags(diagonals, [0, -1, 1], m=n, n=n, format='lil')
+    """Calculates the Laplacian (second derivative) matrix for a given `grid`.
+
+    Non-uniform grids are discretised in a symmetric form, see `laplacian_bands()`.
+    """
+    diagonal, offdiagonal, corner = laplacian_bands(grid)
+    laplacian_matrix = sparse.diags([diagonal, offdiagonal, offdiagonal], [0, -1, 1], format='lil')
     # Periodic boundary conditions
-    laplacian_matrix[0, -1] = 1
-    laplacian_matrix[-1, 0] = 1
-    dx = x[1] - x[0]
-    laplacian_matrix /= dx**2
+    laplacian_matrix[0, -1] = corner
+    laplacian_matrix[-1, 0] = corner
     return laplacian_matrix
 
 
+def laplacian_bands(grid) -> tuple:
+    """Calculates the bands of the periodic tridiagonal Laplacian for a given `grid`.
+
+    Returns a tuple with the `(diagonal, offdiagonal, corner)` elements,
+    where `corner` is the element coupling the first and last points of the grid.
+    Uniform grids use the three-point stencil with `dx = grid[1] - grid[0]`.
+
+    Non-uniform grids must be sorted and span less than $2\\pi$, without repeating the first point,
+    since the last spacing closes the circle back to the first point.
+    They are discretised with finite volumes as $W^{-1} D$,
+    with $W$ the diagonal matrix of `grid_weights()` and $D$ a symmetric matrix,
+    and the symmetric form $W^{-1/2} D W^{-1/2}$ is returned.
+    Its eigenvectors are scaled back by $W^{-1/2}$ in `schrodinger()`.
+    """
+    n = len(grid)
+    spacings = _spacings(grid)
+    if spacings is None:
+        dx = grid[1] - grid[0]
+        return np.full(n, -2 / dx**2), np.full(n - 1, 1 / dx**2), 1 / dx**2
+    weights = (spacings + np.roll(spacings, 1)) / 2
+    diagonal = -(1 / spacings + 1 / np.roll(spacings, 1)) / weights
+    # Coupling between each point and the next one
+    coupling = 1 / (spacings * np.sqrt(weights * np.roll(weights, -1)))
+    return diagonal, coupling[:-1], coupling[-1]
+
+
+def grid_weights(grid) -> np.ndarray:
+    """Returns the integration weights of the points of a periodic `grid`.
+
+    These are the constant step `grid[1] - grid[0]` for uniform grids,
+    and the mean of the spacings to the previous and next points for non-uniform grids.
+    """
+    spacings = _spacings(grid)
+    if spacings is None:
+        return np.full(len(grid), grid[1] - grid[0])
+    return (spacings + np.roll(spacings, 1)) / 2
+
+
+def _spacings(grid) -> np.ndarray:
+    """Returns the spacings between each point of a non-uniform periodic `grid` and the next one,
+    closing the circle from the last point to the first one. Returns None for uniform grids."""
+    if is_uniform(grid):
+        return None
+    x = np.asarray(grid, dtype=float)
+    spacings = np.diff(x)
+    spacings = np.append(spacings, 2 * np.pi - (x[-1] - x[0]))
+    if np.any(spacings <= 0):
+        raise ValueError('Non-uniform grids must be sorted and span less than 2π, without repeating the first point')
+    return spacings
+
+
+def hamiltonian_operator(system:System) -> LinearOperator:
+    """Returns the hamiltonian of a `system` as a matrix-free `LinearOperator`.
+
+    The hamiltonian $-B \\nabla^2 + V$ is applied as a periodic three-point stencil,
+    storing only its diagonal, plus the off-diagonal for non-uniform grids, in O(N) memory.
+    Equivalent to `hamiltonian_matrix()`.
+    """
+    diagonal, offdiagonal, corner = hamiltonian_bands(system)
+    n = len(diagonal)
+    diagonal = diagonal[:, None]
+    if np.all(offdiagonal == corner):
+        offdiagonal = corner  # Uniform grid, a single value is enough
+    else:
+        offdiagonal = offdiagonal[:, None]
+    def matvec(psi):
+        psi = np.asarray(psi).reshape(n, -1)
+        y = diagonal * psi
+        y[:-1] += offdiagonal * psi[1:]
+        y[1:] += offdiagonal * psi[:-1]
+        y[0] += corner * psi[-1]
+        y[-1] += corner * psi[0]
+        return y
+    return LinearOperator((n, n), matvec=matvec, matmat=matvec, dtype=float)
+
+
+def hamiltonian_bands(system:System) -> tuple:
+    """Calculates the bands of the periodic tridiagonal hamiltonian of a `system`.
+
+    Returns a tuple with the `(diagonal, offdiagonal, corner)` elements,
+    where `corner` is the element coupling the first and last points of the grid.
+    Equivalent to `hamiltonian_matrix()`, but stored in O(N) memory.
+    Non-uniform grids are supported as in `laplacian_bands()`.
+    """
+    B = system.B
+    V = np.asarray(system.potential_values, dtype=float)
+    diagonal, offdiagonal, corner = laplacian_bands(system.grid)
+    return V - B * diagonal, -B * offdiagonal, -B * corner
+
+
 def excitations(system: System) -> System:
     """Calculate the excitation levels and the tunnel splitting energies of a system.
 
@@ -147,60 +582,66 @@ def excitations(system: System) -> System:
     Excitations are calculated as the energy difference between the mean energy of the
     ground state level and the mean energy of each excited level.
 
-    Tunnel splittings are calculated as the difference between the mean values of
+    Tunnel splittings are calculated as the difference between the medians of
     the two subgroups within each degenerate level.
+
+    See `excitations_many()` to calculate them for many systems at once.
     """
     # Get eigenvalues, stop before any possible None value
     eigenvalues = system.eigenvalues
     if not isinstance(eigenvalues, (list, np.ndarray)) or len(eigenvalues) == 0:
         return system
     if None in eigenvalues:
-        none_index = eigenvalues.tolist().index(None)
+        none_index = list(eigenvalues).index(None)
         eigenvalues = eigenvalues[:none_index]
     if len(eigenvalues) < 3:
         return system
-    # Group degenerated eigenvalues into energy levels
-    levels, degeneracy = E_levels(eigenvalues, system.potential_max)
-    system.E_levels = levels
-    system.deg = degeneracy
-    # Calculate excitations and splittings
-    ground_energy = np.mean(levels[0])  # Mean of ground state level
-    excitations = []
-    tunnel_splittings = []
-    for level in levels:
-        level_mean = np.mean(level)
-        excitations.append(level_mean - ground_energy)
-        # Get the tunnel splitting within the level
-        if len(level) > 1:
-            # Find the largest gap within the level to split into two subgroups
-            internal_gaps = np.diff(level)
-            split_idx = np.argmax(internal_gaps) + 1
-            # Split into two subgroups
-            subgroup1 = level[:split_idx]
-            subgroup2 = level[split_idx:]
-            # Medians of subgroups
-            median1 = np.median(subgroup1)
-            median2 = np.median(subgroup2)
-            # Tunnel splitting is the difference between medians
-            tunnel_splittings.append(abs(median2 - median1))
-        else:
-            tunnel_splittings.append(0)
-    system.excitations = excitations[1:]  # Exclude ground state
-    system.splittings = tunnel_splittings
+    eigenvalues = np.asarray(eigenvalues, dtype=float)
+    labels, degeneracy, excitations, splittings = E_levels_many(eigenvalues, system.potential_max, symmetry(system))
+    system.E_levels = _split_levels(eigenvalues, labels)
+    system.deg = int(degeneracy)
+    n_levels = len(system.E_levels)
+    system.excitations = excitations[:n_levels - 1].tolist()  # Exclude ground state
+    system.splittings = splittings[:n_levels].tolist()
     return system
 
 
-def E_levels(eigenvalues, vmax:float=None) -> list:
+def excitations_many(eigenvalues, vmax=None, symmetry=None) -> tuple:
+    """Calculate the excitations and tunnel splittings of many spectra at once.
+
+    Vectorised version of `excitations()`, for a 2-D array of `eigenvalues`
+    with one spectrum per row, padded with NaN if they have different lengths,
+    and an optional `vmax` value per spectrum, usually the `System.potential_max`,
+    and `symmetry` of each potential, from `qrotor.potential.symmetry()`.
+    Returns a tuple with the `(excitations, splittings)` 2-D arrays, padded with NaN.
+    See `E_levels_many()` for details.
+
+    This allows to analyse a whole parameter scan in a single call,
+    e.g. from a `qrotor.systems.SystemTable`, without solving the systems again:
+    ```python
+    table = qr.systems.SystemTable(systems)
+    excitations, splittings = qr.solve.excitations_many(table['eigenvalues'], table['potential_max'], table['symmetry'])
+    ```
+    To update the systems themselves, use `qrotor.systems.update_excitations()`.
+    """
+    _, _, excitations, splittings = E_levels_many(eigenvalues, vmax, symmetry)
+    return excitations, splittings
+
+
+def E_levels(eigenvalues, vmax:float=None, symmetry:int=None) -> list:
     """Group a list of degenerated eigenvalues by energy levels.
 
     Automatically detects degenerated energy levels by
-    looking at significant jumps between consecutive eigenvalues.
+    looking at significant jumps between consecutive eigenvalues,
+    see `E_levels_many()` for details.
 
     An optional `vmax` can be specified,
     to avoid including too many eigenvalues
     above a certain potential maximum.
     Only two more eigenvalues are considered after `vmax`,
     to properly detect energy levels around the maximum.
+    The `symmetry` of the potential, from `qrotor.potential.symmetry()`,
+    can also be specified to group shallow potentials.
 
     Example:
     ```python
@@ -209,63 +650,256 @@ def E_levels(eigenvalues, vmax:float=None) -> list:
     deg  # 3
     ```
     """
-    if vmax:  # Include all eigenvalues below Vmax plus 3 more eigenvalues
-        # Check if any values are above vmax
-        eigenvalues_above_vmax = eigenvalues > vmax
-        if np.any(eigenvalues_above_vmax):
-            index_first_above_vmax = np.where(eigenvalues_above_vmax)[0][0]
-            eigenvalues = eigenvalues[:(index_first_above_vmax + 2)]
-    # Group degenerated eigenvalues into energy levels
-    for scale in np.arange(2, 4, 0.25):  # First search going to bigger scales
-        levels, degeneracy = _get_E_levels_by_gap(eigenvalues, scale)
-        if (degeneracy > 1) and (degeneracy % 1 == 0):
-            break
-        else:
-            levels, degeneracy = None, None
-    if not degeneracy:  # If it didn't work, search with tighter values
-        for scale in np.arange(0.75, 2, 0.25):
-            levels, degeneracy = _get_E_levels_by_gap(eigenvalues, scale)
-            if (degeneracy > 1) and (degeneracy % 1 == 0):
-                break
-    if not (degeneracy > 1) or not (degeneracy % 1) == 0:
-        return levels, degeneracy  # I give up
-    # Correct the last two levels
-    if len(levels) >= 2 and len(levels[-2]) != degeneracy:
-        levels[-2] = np.concatenate((levels[-2], levels[-1]))
-        levels.pop(-1)
-    # Split last level into groups of size = degeneracy
-    last_level = levels[-1]
-    additional_levels = len(last_level) // degeneracy
-    if additional_levels > 0:
-        # Replace last level with list of complete degeneracy groups
-        complete_groups = [last_level[i:i+degeneracy] for i in range(0, additional_levels*degeneracy, degeneracy)]
-        levels.pop(-1)  # Remove original last level
-        levels.extend(complete_groups)  # Add all complete groups
-    else:
-        levels.pop(-1)  # Remove incomplete last level
-    return levels, degeneracy
-
-
-def _get_E_levels_by_gap(eigenvalues, scale:float=2) -> tuple:
-    """Split a list of eigenvalues into energy levels by looking at gaps.
-    
-    If the gap is bigger than the average gap times `scale`, it is considered a new level.
-
-    Returns a tuple with the estimated levels and the average degeneracy.
-    The last two levels are not taken into account to estimate the degeneracy.
+    eigenvalues = np.asarray(eigenvalues, dtype=float)
+    labels, degeneracy, _, _ = E_levels_many(eigenvalues, vmax, symmetry)
+    return _split_levels(eigenvalues, labels), int(degeneracy)
+
+
+def _split_levels(eigenvalues:np.ndarray, labels:np.ndarray) -> list:
+    """Returns a list with the `eigenvalues` of each level in `labels`."""
+    valid = labels >= 0
+    sizes = np.bincount(labels[valid])
+    return np.split(eigenvalues[valid], np.cumsum(sizes)[:-1])
+
+
+def E_levels_many(eigenvalues, vmax=None, symmetry=None) -> tuple:
+    """Group the energy levels of many spectra at once.
+
+    The `eigenvalues` can be a 1-D array with a single sorted spectrum,
+    or a 2-D array with one spectrum per row, padded with NaN if they have different lengths.
+    The optional `vmax` can be a single value or one value per spectrum,
+    to only consider two more eigenvalues after the potential maximum, as in `E_levels()`.
+    Zero or NaN values of `vmax` are ignored.
+    The optional `symmetry` of the potentials, a single value or one value per spectrum
+    as returned by `qrotor.potential.symmetry()`, is used when the gaps are not conclusive;
+    values of 1, zero or NaN are ignored.
+
+    The gap threshold between energy levels is chosen once per spectrum,
+    from the largest relative jumps in its sorted gap distribution.
+    Tunnel splittings are the small gaps within levels and excitations the large gaps between them.
+    When several jumps are similar, the threshold yielding the most regular levels is kept.
+    The degeneracy is the size of the levels containing most eigenvalues,
+    only considering the levels below `vmax` if there are any.
+    If it differs from a given `symmetry`, as in shallow potentials where the gaps
+    between levels are similar to the splittings, the levels are instead
+    the consecutive groups of `symmetry` eigenvalues, with the degeneracy of an n-fold potential.
+    The levels after the last regular level below `vmax`, that may be incomplete or mixed,
+    are regrouped into levels of that size, and incomplete levels are discarded.
+
+    Returns a tuple with the `(labels, degeneracy, excitations, splittings)` arrays, with:  
+    `labels`, the energy level of each eigenvalue, or -1 if discarded;  
+    `degeneracy`, the degeneracy of each spectrum;  
+    `excitations`, the energy of each excited level, as the mean of its eigenvalues,
+    with respect to the mean of the ground level;  
+    `splittings`, the tunnel splitting of each level, as the difference between the medians
+    of the two subgroups separated by the largest gap within the level.  
+    Excitations and splittings are padded with NaN up to the maximum number of levels.
+    For 1-D `eigenvalues`, the leading dimension is dropped.
+    ```python
+    labels, deg, excitations, splittings = qr.solve.E_levels_many(eigenvalue_matrix, vmax_array)
+    ```
+    """
+    E = np.array(eigenvalues, dtype=float, ndmin=2)
+    S, N = E.shape
+    valid = ~np.isnan(E)
+    above = None
+    if vmax is not None:
+        vmax = np.broadcast_to(np.asarray(vmax, dtype=float), (S,))
+        vmax = np.where(np.isnan(vmax) | (vmax == 0), np.inf, vmax)
+        above = E > vmax[:, None]
+        first_above = np.where(above.any(axis=1), above.argmax(axis=1), N)
+        valid &= np.arange(N) < (first_above + 2)[:, None]
+    gaps = np.where(valid[:, 1:] & valid[:, :-1], np.diff(E, axis=1), np.nan)
+    # Cluster every spectrum with each candidate threshold, keeping the most regular clustering
+    thresholds = _level_thresholds(gaps)
+    J = thresholds.shape[1]
+    labels = _level_labels(np.repeat(gaps, J, axis=0), thresholds.ravel(), np.repeat(valid, J, axis=0))
+    degeneracy, regularity = _degeneracy(labels, None if above is None else np.repeat(above, J, axis=0))
+    score = np.where(degeneracy > 1, regularity, regularity / 2)  # Prefer degenerated levels
+    best = np.arange(S) * J + score.reshape(S, J).argmax(axis=1)
+    degeneracy = degeneracy[best]
+    labels = labels[best]
+    if symmetry is not None:  # Levels of n-fold potentials hold n states, one per irreducible representation
+        symmetry = np.broadcast_to(np.nan_to_num(np.asarray(symmetry, dtype=float)), (S,)).astype(int)
+        grouped = (symmetry > 1) & (degeneracy != symmetry)
+        degeneracy = np.where(grouped, symmetry, degeneracy)
+        labels = np.where(grouped[:, None] & valid, 0, labels)  # Regrouped from the ground level
+    labels = _regroup_last_levels(labels, degeneracy, above)
+    means, splittings = _level_statistics(E, labels)
+    excitations = means[:, 1:] - means[:, :1]
+    if np.ndim(eigenvalues) == 1:
+        return labels[0], degeneracy[0], excitations[0], splittings[0]
+    return labels, degeneracy, excitations, splittings
+
+
+def _level_thresholds(
+        gaps:np.ndarray,
+        candidates:int=3,
+        jump:float=2.0,
+        ) -> np.ndarray:
+    """Returns candidate thresholds between energy levels for each row of `gaps`.
+
+    Candidates lie in the largest relative jumps of the sorted gaps, if larger than `jump`.
+    Gaps close to zero are regularised with a thousandth of the mean gap.
+    A last candidate of -inf, with one level per eigenvalue, is always included.
     """
-    # Find gaps between consecutive eigenvalues
-    gaps = np.diff(eigenvalues)
-    # Use mean gap times scale as threshold to distinguish energy levels
-    med_gap = np.mean(gaps)
-    level_breaks = np.where(gaps > scale * med_gap)[0] + 1
-    levels = np.split(eigenvalues, level_breaks)
-    # Calculate average degeneracy excluding last two levels if possible
-    if len(levels) > 2:
-        avg_degeneracy = float(np.mean([len(level) for level in levels[:-2]]))
+    S = len(gaps)
+    sorted_gaps = np.sort(gaps, axis=1)  # NaN at the end
+    with np.errstate(invalid='ignore', divide='ignore'), warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # Empty rows
+        regulariser = 1e-3 * np.nanmean(sorted_gaps, axis=1)
+        ratios = sorted_gaps[:, 1:] / (sorted_gaps[:, :-1] + regulariser[:, None])
+    ratios = np.where(np.isnan(ratios) | (ratios < jump), 0, ratios)
+    largest = np.argsort(-ratios, axis=1, kind='stable')[:, :candidates]
+    low = np.take_along_axis(sorted_gaps, largest, axis=1)
+    high = np.take_along_axis(sorted_gaps, largest + 1, axis=1)
+    thresholds = np.where(np.take_along_axis(ratios, largest, axis=1) > 0, (low + high) / 2, -np.inf)
+    return np.concatenate([thresholds, np.full((S, 1), -np.inf)], axis=1)
+
+
+def _level_labels(gaps:np.ndarray, thresholds:np.ndarray, valid:np.ndarray) -> np.ndarray:
+    """Labels the energy level of each eigenvalue, breaking levels at `gaps` above the `thresholds`."""
+    breaks = ~(gaps <= thresholds[:, None])
+    labels = np.concatenate([np.zeros((len(gaps), 1), dtype=int), np.cumsum(breaks, axis=1)], axis=1)
+    return np.where(valid, labels, -1)
+
+
+def _level_sizes(labels:np.ndarray) -> np.ndarray:
+    """Number of eigenvalues in each energy level, for each row of `labels`."""
+    R, N = labels.shape
+    rows = np.broadcast_to(np.arange(R)[:, None], labels.shape)
+    valid = labels >= 0
+    return np.bincount((rows * N + labels)[valid], minlength=R * N).reshape(R, N)
+
+
+def _degeneracy(labels:np.ndarray, above:np.ndarray=None) -> tuple:
+    """Returns the degeneracy of each row of `labels` and the fraction of eigenvalues in regular levels.
+
+    The last level is not considered, since it may be incomplete.
+    Levels with eigenvalues `above` the potential maximum are not considered either,
+    unless there are no other levels, since states over the barrier are mixed.
+    """
+    R, N = labels.shape
+    sizes = _level_sizes(labels)
+    n_levels = labels.max(axis=1) + 1
+    sizes = np.where(np.arange(N) < np.maximum(n_levels - 1, 1)[:, None], sizes, 0)
+    if above is not None:
+        below = sizes * (_level_sizes(np.where(above, labels, -1)) == 0)
+        sizes = np.where(below.any(axis=1)[:, None], below, sizes)
+    # Number of eigenvalues in levels of each size
+    coverage = np.zeros((R, N + 1), dtype=int)
+    np.add.at(coverage, (np.broadcast_to(np.arange(R)[:, None], sizes.shape), sizes), sizes)
+    degeneracy = np.maximum(coverage.argmax(axis=1), 1)
+    regularity = coverage[np.arange(R), degeneracy] / np.maximum(coverage.sum(axis=1), 1)
+    return degeneracy, regularity
+
+
+def _regroup_last_levels(
+        labels:np.ndarray,
+        degeneracy:np.ndarray,
+        above:np.ndarray=None,
+        ) -> np.ndarray:
+    """Regroups the eigenvalues after the last level of size `degeneracy`
+    into new levels of that size, discarding the incomplete remainder.
+
+    Levels with eigenvalues `above` the potential maximum are regrouped too,
+    so that no irregular level is left between regular ones close to the maximum.
+    """
+    R, N = labels.shape
+    positions = np.arange(N)
+    valid = labels >= 0
+    sizes = _level_sizes(labels)
+    regular = (sizes == degeneracy[:, None]) & (positions < (labels.max(axis=1) + 1)[:, None])
+    if above is not None:
+        regular &= _level_sizes(np.where(above, labels, -1)) == 0
+    last_regular = np.where(regular.any(axis=1), N - 1 - regular[:, ::-1].argmax(axis=1), -1)
+    ends = np.cumsum(sizes, axis=1)
+    start = np.where(last_regular >= 0, ends[np.arange(R), np.maximum(last_regular, 0)], 0)
+    group = (positions - start[:, None]) // degeneracy[:, None]
+    complete = group < ((valid.sum(axis=1) - start) // degeneracy)[:, None]
+    regrouped = np.where(complete, last_regular[:, None] + 1 + group, -1)
+    return np.where(valid & (positions >= start[:, None]), regrouped, labels)
+
+
+def _level_statistics(E:np.ndarray, labels:np.ndarray) -> tuple:
+    """Returns the mean energy and the tunnel splitting of each level in `labels`."""
+    R, N = labels.shape
+    L = max(int(labels.max()) + 1, 1)
+    rows = np.broadcast_to(np.arange(R)[:, None], labels.shape)
+    positions = np.broadcast_to(np.arange(N), labels.shape)
+    valid = labels >= 0
+    index = (rows * L + labels)[valid]
+    counts = np.bincount(index, minlength=R * L)
+    sums = np.bincount(index, weights=E[valid], minlength=R * L)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = np.where(counts > 0, sums / counts, np.nan)
+    # Levels are contiguous, from start to end
+    start = np.full(R * L, N)
+    np.minimum.at(start, index, positions[valid])
+    end = start + counts
+    # Split each level at its largest internal gap
+    inner = valid[:, 1:] & (labels[:, 1:] == labels[:, :-1])
+    inner_index = (rows[:, 1:] * L + labels[:, 1:])[inner]
+    inner_gaps = np.diff(E, axis=1)[inner]
+    largest = np.full(R * L, -np.inf)
+    np.maximum.at(largest, inner_index, inner_gaps)
+    is_largest = inner_gaps == largest[inner_index]
+    split = end.copy()
+    np.minimum.at(split, inner_index[is_largest], positions[:, 1:][inner][is_largest])
+    # Medians of the subgroups from their sorted positions
+    offset = np.repeat(np.arange(R) * N, L)
+    flat = np.append(E.ravel(), np.nan)
+    def median(a, b):
+        exists = b > a
+        lower = np.where(exists, offset + a + (b - a - 1) // 2, -1)
+        upper = np.where(exists, offset + a + (b - a) // 2, -1)
+        return (flat[lower] + flat[upper]) / 2
+    splittings = np.where(counts > 1, np.abs(median(split, end) - median(start, split)), np.where(counts == 1, 0.0, np.nan))
+    return means.reshape(R, L), splittings.reshape(R, L)
+
+
+def _level_weights(
+        eigenvalues:np.ndarray,
+        vmax:float=None,
+        extend:bool=False,
+        symmetry:int=None,
+        ) -> dict:
+    """Returns the splittings and excitations of a spectrum as linear combinations of its sorted `eigenvalues`,
+    as dicts of weight vectors by level, following `E_levels_many()`.
+
+    Used to propagate derivatives of the eigenvalues to the splittings and excitations.
+    With `extend = True`, the eigenvalues after the last level are grouped
+    with the degeneracy of the ground level, so that levels above `vmax` are also defined.
+    """
+    labels = E_levels_many(eigenvalues, vmax, symmetry)[0]
+    n = len(eigenvalues)
+    members = [np.flatnonzero(labels == level) for level in range(labels.max() + 1)]
+    if extend:
+        deg = len(members[0]) if members else 1
+        start = members[-1][-1] + 1 if members else 0
+        while start + deg <= n:
+            members.append(np.arange(start, start + deg))
+            start += deg
+    means = []
+    splittings = {}
+    for level, indexes in enumerate(members):
+        mean = np.zeros(n)
+        mean[indexes] = 1 / len(indexes)
+        means.append(mean)
+        if len(indexes) < 2:
+            continue
+        cut = np.argmax(np.diff(eigenvalues[indexes])) + 1
+        splittings[level] = _median(indexes[cut:], n) - _median(indexes[:cut], n)
+    excitations = {level - 1: means[level] - means[0] for level in range(1, len(means))}
+    return {'splittings': splittings, 'excitations': excitations}
+
+
+def _median(indexes:np.ndarray, n:int) -> np.ndarray:
+    """Weight vector of the median of the sorted eigenvalues with `indexes`."""
+    w = np.zeros(n)
+    middle = len(indexes) // 2
+    if len(indexes) % 2:
+        w[indexes[middle]] = 1.0
     else:
-        avg_degeneracy = float(len(levels[0]))
-    if avg_degeneracy % 1 == 0:
-        avg_degeneracy = int(avg_degeneracy)
-    return levels, avg_degeneracy
-
+        w[indexes[middle - 1:middle + 1]] = 0.5
+    return w
@@ -0,0 +1,217 @@
+"""
+# Description
+
+This module simulates inelastic neutron scattering (INS) and
+quasielastic (QENS) spectra of rotational tunnelling from solved systems.
+
+The incoherent scattering of a proton rotating on a circle of a given `radius`,
+averaged over all orientations of a powder, is calculated for every transition
+between the eigenstates of the systems, see `transitions()`:
+$$
+I_{ij}(Q) = \\int\\int \\psi_i(\\varphi)\\psi_j(\\varphi) \\psi_i(\\varphi')\\psi_j(\\varphi')
+j_0\\left(2Qr \\sin\\frac{\\varphi-\\varphi'}{2}\\right) d\\varphi d\\varphi'
+$$
+The $j_0$ kernel only depends on $\\varphi-\\varphi'$,
+so it is applied with FFTs on a coarse uniform grid, for all transitions of many systems at once.
+All equivalent protons of the rotor contribute the same way,
+so intensities are given per proton.
+
+The transitions are then weighted by the thermal populations of the initial states,
+and broadened onto an energy grid at many temperatures with `broaden()`.
+Both steps are combined in `simulate()`:
+```python
+import qrotor as qr
+import numpy as np
+system = qr.System(B=qr.B_CH3, potential_name='cos', potential_constants=[0, 30, 3, 0])
+system.solve()
+E = np.linspace(-1, 1, 2001)  # meV
+S = qr.spectrum.simulate(system, E, T=[5, 20, 50], Q=np.linspace(0.5, 2.5, 5), fwhm=0.02)
+S.shape  # (3, 5, 2001), temperatures, Q values and energies
+```
+
+
+# Index
+
+| | |
+| --- | --- |
+| `simulate()`    | Simulate the spectra of systems at several temperatures and Q values |
+| `transitions()` | Energies and powder-averaged intensities of all transitions |
+| `broaden()`     | Broaden spectral lines onto an energy grid |
+
+---
+"""
+
+
+from .system import System
+from . import constants
+from .observables import _states, compress, decompress
+from .thermal import _boltzmann
+import numpy as np
+from scipy.signal import fftconvolve
+
+
+def simulate(
+        data,
+        E,
+        T=5.0,
+        Q=1.0,
+        fwhm:float=0.01,
+        shape:str='gaussian',
+        radius:float=None,
+        initial:int=None,
+        gridsize:int=256,
+        batch:int=64,
+        ) -> np.ndarray:
+    """Simulates the INS spectra of `data`, a System or a list of systems, on the energies `E`.
+
+    Returns the scattering function $S(Q, E)$ with shape `(systems, T, Q, E)`,
+    for all temperatures `T` (K) and momentum transfers `Q` (1/AA).
+    Axes of single systems, and of scalar `T` and `Q` values, are removed.
+    Positive energies correspond to neutron energy loss.
+    Transitions are broadened with a `shape` of a given `fwhm` (meV), see `broaden()`.
+    The elastic line at zero energy includes the transitions within each state
+    and within degenerate levels.
+    See `transitions()` for the other parameters.
+    """
+    single = isinstance(data, System)
+    energies, intensities = transitions(data, np.atleast_1d(Q), radius, initial, gridsize, batch)
+    if single:
+        energies, intensities = energies[None], intensities[None]
+    temperatures = np.atleast_1d(np.asarray(T, dtype=float))
+    populations = _boltzmann(energies[:, 0, :], temperatures)  # (systems, T, states)
+    populations = populations[:, :, :energies.shape[1]]  # Only initial states
+    weights = populations[:, :, None, :, None] * intensities[:, None]  # (systems, T, Q, i, j)
+    lines = np.broadcast_to(energies[:, None, None], weights.shape)
+    n_systems, n_T, n_Q = weights.shape[:3]
+    spectra = broaden(lines.reshape(n_systems, n_T, n_Q, -1), weights.reshape(n_systems, n_T, n_Q, -1), E, fwhm, shape)
+    if np.ndim(Q) == 0:
+        spectra = spectra[:, :, 0]
+    if np.ndim(T) == 0:
+        spectra = spectra[:, 0]
+    return spectra[0] if single else spectra
+
+
+def transitions(
+        data,
+        Q=1.0,
+        radius:float=None,
+        initial:int=None,
+        gridsize:int=256,
+        batch:int=64,
+        ) -> tuple:
+    """Calculates the energies and powder-averaged intensities of the transitions of `data`.
+
+    The `data` can be a System or a list of systems,
+    solved with `save_eigenvectors = True`.
+    Returns a tuple with the transition `energies` $E_j - E_i$ (meV), with shape `(systems, i, j)`,
+    and their `intensities` for each momentum transfer `Q` (1/AA), with shape `(systems, Q, i, j)`.
+    Axes of single systems and of a scalar `Q` are removed.
+    Missing states of systems with less eigenvalues are NaN for energies and zero for intensities.
+
+    The `radius` of rotation is given in AA, defaulting to the methyl group, `qrotor.constants.r_CH`.
+    Only the first `initial` states are considered as initial states, all of them by default.
+    The eigenvectors are resampled to a uniform grid of `gridsize` points,
+    and systems are processed in batches of `batch` systems to limit memory use.
+    """
+    single = isinstance(data, System)
+    systems = [data] if single else list(data)
+    radius = constants.r_CH * 1e10 if radius is None else radius
+    Q_values = np.atleast_1d(np.asarray(Q, dtype=float))
+    states = max(len(s.eigenvalues) for s in systems)
+    initial = states if initial is None else min(initial, states)
+    # Energies of all transitions, padded with NaN
+    eigenvalues = np.full((len(systems), states), np.nan)
+    for k, system in enumerate(systems):
+        eigenvalues[k, :len(system.eigenvalues)] = system.eigenvalues
+    energies = eigenvalues[:, None, :] - eigenvalues[:, :initial, None]
+    # Powder kernel of each Q value, in Fourier space
+    kernel = _kernel(Q_values, radius, gridsize)
+    intensities = np.zeros((len(systems), len(Q_values), initial, states))
+    for start in range(0, len(systems), batch):
+        psi = np.zeros((len(systems[start:start+batch]), states, gridsize))
+        for k, system in enumerate(systems[start:start+batch]):
+            vectors = _resample(system, gridsize)
+            psi[k, :len(vectors)] = vectors
+        products = psi[:, :initial, None, :] * psi[:, None, :, :]
+        power = np.abs(np.fft.rfft(products, axis=-1))**2
+        intensities[start:start+batch] = np.einsum('bijk,qk->bqij', power, kernel)
+    if np.ndim(Q) == 0:
+        intensities = intensities[:, 0]
+    if single:
+        return energies[0], intensities[0]
+    return energies, intensities
+
+
+def broaden(
+        energies,
+        weights,
+        E,
+        fwhm:float=0.01,
+        shape:str='gaussian',
+        ) -> np.ndarray:
+    """Broadens spectral lines of given `energies` and `weights` onto a uniform energy grid `E`.
+
+    Lines are taken along the last axis of `energies` and `weights`,
+    and any other leading axes are kept, returning an array of shape `(..., len(E))`.
+    Lines are first binned into the grid, splitting them between the two closest points,
+    and then convolved with a `'gaussian'` or `'lorentzian'` `shape` of a given `fwhm` with FFTs,
+    so the cost does not depend on the number of lines.
+    The area of each line equals its weight. Lines outside the grid or with NaN values are ignored.
+    """
+    E = np.asarray(E, dtype=float)
+    step = E[1] - E[0]
+    if not np.allclose(np.diff(E), step):
+        raise ValueError('The energy grid E must be uniform.')
+    energies, weights = np.broadcast_arrays(np.asarray(energies, dtype=float), np.asarray(weights, dtype=float))
+    leading = energies.shape[:-1]
+    energies = energies.reshape(-1, energies.shape[-1])
+    weights = weights.reshape(-1, weights.shape[-1])
+    n = len(E)
+    # Linear binning
+    position = (energies - E[0]) / step
+    lower = np.floor(position)
+    fraction = position - lower
+    rows = np.arange(len(energies))[:, None] * n
+    histogram = np.zeros(len(energies) * n)
+    for index, weight in ((lower, weights * (1 - fraction)), (lower + 1, weights * fraction)):
+        valid = (index >= 0) & (index < n) & np.isfinite(weight)
+        index = np.where(valid, index, 0).astype(int)
+        histogram += np.bincount((rows + index)[valid], weight[valid], minlength=histogram.size)
+    histogram = histogram.reshape(len(energies), n) / step
+    if fwhm:
+        x = step * np.arange(-(n - 1), n)
+        if shape.lower() == 'gaussian':
+            sigma = fwhm / (2 * np.sqrt(2 * np.log(2)))
+            profile = np.exp(-x**2 / (2 * sigma**2)) / (sigma * np.sqrt(2 * np.pi))
+        elif shape.lower() == 'lorentzian':
+            gamma = fwhm / 2
+            profile = gamma / (np.pi * (x**2 + gamma**2))
+        else:
+            raise ValueError(f"shape must be 'gaussian' or 'lorentzian', found instead: '{shape}'")
+        histogram = fftconvolve(histogram, profile[None, :] * step, mode='same', axes=-1)
+    return histogram.reshape(leading + (n,))
+
+
+def _kernel(Q:np.ndarray, radius:float, gridsize:int) -> np.ndarray:
+    """Returns the Fourier transform of the powder-averaged $j_0$ kernel for each `Q`,
+    including the weights of the real FFT and the integration steps."""
+    step = 2 * np.pi / gridsize
+    distances = 2 * radius * np.abs(np.sin(np.arange(gridsize) * step / 2))
+    kernel = np.fft.rfft(np.sinc(Q[:, None] * distances[None, :] / np.pi), axis=-1).real
+    symmetry = np.full(kernel.shape[-1], 2.0)
+    symmetry[0] = 1.0
+    if gridsize % 2 == 0:
+        symmetry[-1] = 1.0  # Nyquist term
+    return kernel * symmetry * step**2 / gridsize
+
+
+def _resample(system:System, gridsize:int) -> np.ndarray:
+    """Returns the normalised eigenvectors of a `system` on a uniform grid of `gridsize` points."""
+    psi, x, weights = _states(system)
+    if np.allclose(weights, weights[0]):
+        psi = decompress(compress(psi, gridsize // 2 + 1, np.complex128), gridsize)
+    else:
+        grid = 2 * np.pi * np.arange(gridsize) / gridsize
+        psi = np.array([np.interp(grid, x, vector, period=2*np.pi) for vector in psi])
+    norms = np.sqrt(np.sum(psi**2, axis=-1) * 2 * np.pi / gridsize)
+    return psi / norms[:, None]
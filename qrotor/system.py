@@ -4,6 +4,15 @@
 The `System` object contains all the information needed for a single QRotor calculation.
 This class can be loaded directly as `qrotor.System()`.
 
+The `SystemResult` object is a compact version of a solved System,
+containing only its parameters and resulting energies.
+It can be loaded directly as `qrotor.SystemResult()`.
+
+The `UniformGrid` object describes the default grids of the systems,
+from $0$ to $2\\pi$, with only three numbers instead of a full array.
+It can be loaded directly as `qrotor.UniformGrid()`.
+Any grid can be checked with `is_uniform()`.
+
 ---
 """
 
@@ -32,6 +41,8 @@ class System:
             potential_name: str = '',
             potential_constants: list = None,
             tags: str = '',
+            solver: str = 'tridiagonal',
+            interpolation: str = 'spline',
             ):
         """A new quantum system can be instantiated as `system = qrotor.System()`.
         This new system will contain the default values listed above.
@@ -47,6 +58,16 @@ class System:
         """Correct the potential offset as `V - min(V)` or not."""
         self.save_eigenvectors: bool = save_eigenvectors
         """Save or not the eigenvectors. Final file size will be bigger."""
+        self.solver: str = solver
+        """Solver used to diagonalise the hamiltonian, `'tridiagonal'`, `'sparse'` or `'lobpcg'`.
+
+        See `qrotor.solve.schrodinger()` for details.
+        """
+        self.interpolation: str = interpolation
+        """Method used to interpolate the potential to a larger `gridsize`, `'spline'` or `'fft'`.
+
+        See `qrotor.potential.interpolate()` for details.
+        """
         self.tags: str = tags
         """Custom tags separated by spaces, such as the molecular group, etc.
 
@@ -63,7 +84,8 @@ class System:
         self.grid = []
         """The grid with the points to be used in the calculation.
 
-        Can be set automatically over $2 \\pi$ with `System.set_grid()`.
+        Can be set automatically over $2 \\pi$ with `System.set_grid()`,
+        as a `UniformGrid` that is not stored point by point.
         Units must be in radians.
         """
         self.potential_name: str = potential_name
@@ -80,6 +102,12 @@ class System:
         or loaded externally with the `qrotor.potential.load()` function.
         Potential energy units must be in meV.
         """
+        self.potential_fit: dict = None
+        """Fitted interpolation of the `potential_values`, reused by `qrotor.potential.interpolate()`.
+
+        It is ignored and fitted again when `grid` or `potential_values` change,
+        and it is not kept when the System is pickled or copied, to keep saved files small.
+        """
         # Potential values determined upon solving
         self.potential_offset: float = None
         """`min(V)` before offset correction when `correct_potential_offset = True`"""
@@ -112,6 +140,16 @@ class System:
         """
         self.runtime: float = None
         """Time taken to solve the eigenvalues."""
+        self.solved_potential_key: str = None
+        """Fingerprint of the `grid` and `potential_values` with which the eigenvalues were solved.
+
+        Used to check that the results are still valid, e.g. in `System.change_phase()`.
+        """
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['potential_fit'] = None  # Fitted again when needed
+        return state
 
     def solve(self, gridsize:int=None, B:int=None):
         """Default user method to solve the quantum system.
@@ -152,51 +190,82 @@ class System:
         The `phase` should be a multiple of $\\pi$ (e.g., 3/2 for $3\\pi/2$).
         The resulting grid will be expressed between $-2\\pi$ and $2\\pi$.
 
-        The System is solved immediately after the phase change.
-        This last step ensures that all eigenvalues and wavefunctions are correct.
-        You can override this step with `calculate = False`,
+        The potential values are translated over a single period,
+        without the repeated endpoint of grids such as the default `UniformGrid`.
+        Shifts by a whole number of grid steps are exact permutations of the values.
+        Other shifts are applied with a Fourier phase factor, which interpolates the values
+        between the grid points, with the same accuracy as the `'fft'` interpolation
+        of `qrotor.potential.interpolate()`.
+        `System.potential_max` and `System.potential_min` are updated from the translated potential values.
+
+        A whole-step shift of a periodic grid, without a repeated endpoint,
+        does not change the eigenvalues of the discretised Hamiltonian.
+        In this case, if the System was already solved with the current potential,
+        the stored eigenvectors are translated in the same way, and `System.E_activation` is updated,
+        instead of solving the System again.
+        Otherwise, the System is solved immediately after the phase change.
+        You can override this last step with `calculate = False`,
         but remember to solve the System later!
         """
-        if not any(self.potential_values) or not any(self.grid):
+        if not any(self.potential_values) or len(self.grid) == 0:
             raise ValueError("System.potential_values and System.grid must be set before applying a phase shift.")
+        if not is_uniform(self.grid):
+            raise ValueError("Phase shifts are only supported for uniform grids.")
+        from .potential import fingerprint
+        solved = self.eigenvalues is not None and len(self.eigenvalues) > 0
+        solved = solved and getattr(self, 'solved_potential_key', None) == fingerprint(self)
         # Normalise the phase between 0 and 2
         if abs(phase) >= 2:
             phase = phase % 2
         while phase < 0:
             phase = phase + 2
+        # Number of points in a single period
+        repeated = len(self.grid) > 2 and np.isclose(self.grid[-1] - self.grid[0], 2 * np.pi)
+        period = len(self.potential_values) - 1 if repeated else len(self.potential_values)
+        phase_points = (phase / 2) * period
+        reuse = solved and not repeated and np.isclose(phase_points, round(phase_points), rtol=0, atol=1e-6)
         # Shift the grid, between -2pi and 2pi
         self.grid = (self.grid + (phase * np.pi))
-        # Apply the phase shift to potential values
-        phase_points = int((phase / 2) * self.gridsize)
-        self.potential_values = np.roll(self.potential_values, phase_points)
+        # Apply the phase shift to potential values and eigenvectors
+        self.potential_values = _translate(self.potential_values, phase_points, repeated)
+        self.potential_max = float(np.max(self.potential_values))
+        self.potential_min = float(np.min(self.potential_values))
+        if reuse and len(self.eigenvectors) > 0:
+            self.eigenvectors = _translate(self.eigenvectors, phase_points)
         # Check that the grid is still within -2pi and 2pi, otherwise normalise it for a final time
         while self.grid[0] <= (-2 * np.pi + 0.1):  # With a small tolerance
             self.grid = self.grid + 2 * np.pi
         while self.grid[-1] >= 2.5 * np.pi:  # It was not a problem until reaching 5/2 pi
             self.grid = self.grid -2 * np.pi
         print(f'Potential shifted by {phase}π')
-        if calculate:
+        if reuse:
+            self.E_activation = self.potential_max - min(self.eigenvalues)
+            self.solved_potential_key = fingerprint(self)
+        elif calculate:
             self.solve()
         return self
 
-    def set_grid(self, gridsize:int=None):
+    def set_grid(self, gridsize:int=None, method:str=None):
         """Sets the `System.grid` to the specified `gridsize` from 0 to $2\\pi$.
 
+        New grids are stored as a `UniformGrid`.
+
         If the system had a previous grid and potential values,
         it will interpolate those values to the new gridsize,
-        using `qrotor.potential.interpolate()`.
+        using `qrotor.potential.interpolate()` with the specified `method`
+        (`'spline'` or `'fft'`), or `System.interpolation` by default.
         """
         if gridsize == self.gridsize:
             return self  # Nothing to do here
         if gridsize:
             self.gridsize = gridsize
         # Should we interpolate?
-        if any(self.potential_values) and any(self.grid) and self.gridsize:
+        if any(self.potential_values) and len(self.grid) > 0 and self.gridsize:
             from .potential import interpolate
-            self = interpolate(self)
+            self = interpolate(self, method)
         # Should we create the values from zero?
         elif self.gridsize:
-                self.grid = np.linspace(0, 2*np.pi, self.gridsize)
+            self.grid = UniformGrid(self.gridsize)
         else:
             raise ValueError('gridsize must be provided if there is no System.gridsize')
         return self
@@ -207,6 +276,7 @@ class System:
         self.eigenvectors = []
         self.potential_values = []
         self.grid = []
+        self.potential_fit = None
         return self
 
     def summary(self):
@@ -218,6 +288,8 @@ class System:
             'searched_E': self.searched_E,
             'correct_potential_offset': self.correct_potential_offset,
             'save_eigenvectors': self.save_eigenvectors,
+            'solver': getattr(self, 'solver', None),
+            'interpolation': getattr(self, 'interpolation', None),
             'B': self.B,
             'gridsize': self.gridsize,
             'potential_name': self.potential_name,
@@ -234,3 +306,250 @@ class System:
             'runtime': self.runtime,
         }
 
+
+class UniformGrid(np.lib.mixins.NDArrayOperatorsMixin):
+    """Uniform grid from `start` to `stop`, both included, with `size` points.
+
+    Equivalent to `np.linspace(start, stop, size)`,
+    but stored as three numbers instead of a full array.
+    It behaves as a NumPy array where needed, e.g. for plotting or saving,
+    and can be converted with `np.asarray(grid)`.
+    Adding or subtracting a number shifts the grid without materialising it,
+    while any other operation, fancy indexing, or array method such as `grid.mean()`,
+    returns a regular NumPy array.
+    """
+    __slots__ = ('start', 'stop', 'size')
+
+    def __init__(
+            self,
+            size:int,
+            start:float=0.0,
+            stop:float=2*np.pi,
+            ):
+        self.size: int = int(size)
+        """Number of points in the grid."""
+        self.start: float = float(start)
+        """First point of the grid."""
+        self.stop: float = float(stop)
+        """Last point of the grid."""
+
+    @property
+    def step(self) -> float:
+        """Spacing between consecutive points."""
+        return (self.stop - self.start) / (self.size - 1)
+
+    @property
+    def shape(self) -> tuple:
+        return (self.size,)
+
+    @property
+    def ndim(self) -> int:
+        return 1
+
+    @property
+    def dtype(self) -> np.dtype:
+        return np.dtype(float)
+
+    def min(self, *args, **kwargs):
+        if args or kwargs or self.size == 0:
+            return np.asarray(self).min(*args, **kwargs)
+        return min(self.start, self.stop)
+
+    def max(self, *args, **kwargs):
+        if args or kwargs or self.size == 0:
+            return np.asarray(self).max(*args, **kwargs)
+        return max(self.start, self.stop)
+
+    def __getattr__(self, name):
+        if name.startswith('_'):  # Avoid delegating copy and pickle protocols
+            raise AttributeError(name)
+        return getattr(np.asarray(self), name)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __array__(self, dtype=None, copy=None):
+        if copy is False:
+            raise ValueError('A UniformGrid can not be converted to an array without a copy.')
+        return np.linspace(self.start, self.stop, self.size, dtype=dtype)
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        inputs = [np.asarray(i) if isinstance(i, UniformGrid) else i for i in inputs]
+        return getattr(ufunc, method)(*inputs, **kwargs)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.start + np.arange(*index.indices(self.size)) * self.step
+        if not isinstance(index, (int, np.integer)):  # Fancy indexing
+            return np.asarray(self)[index]
+        index = int(index)
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError(f'index {index} is out of bounds for a grid of size {self.size}')
+        if index == self.size - 1:
+            return self.stop  # Avoid rounding errors
+        return self.start + index * self.step
+
+    def __iter__(self):
+        return iter(np.asarray(self).tolist())
+
+    def __add__(self, other):
+        if np.isscalar(other):
+            return UniformGrid(self.size, self.start + other, self.stop + other)
+        return np.asarray(self) + other
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        if np.isscalar(other):
+            return UniformGrid(self.size, self.start - other, self.stop - other)
+        return np.asarray(self) - other
+
+    def __reduce__(self):
+        return (UniformGrid, (self.size, self.start, self.stop))
+
+    def __repr__(self) -> str:
+        return f'UniformGrid(size={self.size}, start={self.start}, stop={self.stop})'
+
+
+class SystemResult:
+    """Compact results of a solved quantum system.
+
+    Contains the parameters and the resulting energies of a `System`,
+    without the grid, potential values and eigenvectors.
+    Uses `__slots__` instead of a per-instance dict,
+    and packs the `eigenvalues`, `excitations` and `splittings`
+    in a single bytes buffer, read as NumPy arrays without copying,
+    so that large collections of results take less memory and pickle much faster.
+
+    Energy units are in meV.
+    Solved systems can be converted as `result = qrotor.SystemResult.from_system(system)`,
+    and back to a regular System with `system = result.to_system()`.
+    """
+    scalars = (
+        'version', 'comment', 'tags', 'searched_E', 'correct_potential_offset', 'solver', 'interpolation',
+        'B', 'gridsize', 'potential_name', 'potential_constants',
+        'potential_offset', 'potential_min', 'potential_max',
+        'deg', 'E_activation', 'runtime',
+        )
+    """Names of the scalar attributes."""
+    arrays = ('eigenvalues', 'excitations', 'splittings')
+    """Names of the array attributes."""
+    __slots__ = scalars + ('_buffer', '_lengths')
+
+    def __init__(self, **kwargs):
+        """Attributes are the same as in `System`, and can be set by name.
+        Missing attributes are None, except for the `tags`, which are an empty string."""
+        for name in self.scalars:
+            setattr(self, name, kwargs.get(name))
+        if self.tags is None:
+            self.tags = ''
+        self._pack([kwargs.get(name) for name in self.arrays])
+
+    def _pack(self, arrays:list) -> None:
+        """Stores the `arrays` in a single bytes buffer, with None elements as NaN."""
+        arrays = [[] if a is None else [np.nan if e is None else e for e in a] for a in arrays]
+        self._lengths = tuple(len(a) for a in arrays)
+        self._buffer = np.concatenate([np.asarray(a, dtype=float) for a in arrays]).tobytes()
+
+    def _unpack(self, index:int) -> np.ndarray:
+        """Returns a read-only view of the array `index` from the buffer."""
+        start = sum(self._lengths[:index])
+        return np.frombuffer(self._buffer, dtype=float, count=self._lengths[index], offset=8*start)
+
+    @property
+    def eigenvalues(self) -> np.ndarray:
+        """Calculated eigenvalues of the system. In meV."""
+        return self._unpack(0)
+
+    @property
+    def excitations(self) -> np.ndarray:
+        """Torsional excitations, see `System.excitations`."""
+        return self._unpack(1)
+
+    @property
+    def splittings(self) -> np.ndarray:
+        """Tunnel splitting energies, see `System.splittings`."""
+        return self._unpack(2)
+
+    def __reduce__(self):
+        return (_restore_result, (tuple(getattr(self, name) for name in self.scalars), self._buffer, self._lengths))
+
+    def __repr__(self) -> str:
+        return f'SystemResult(comment={self.comment!r}, B={self.B}, gridsize={self.gridsize})'
+
+    @classmethod
+    def from_system(cls, system:System) -> 'SystemResult':
+        """Returns the compact results of a `system`."""
+        values = vars(system)
+        return cls(**{name: values.get(name) for name in cls.scalars + cls.arrays})
+
+    def to_system(self) -> System:
+        """Returns a new `System` with the results.
+
+        The grid, potential values and eigenvectors are left empty,
+        as in `System.reduce_size()`.
+        """
+        system = System()
+        for name in self.scalars:
+            setattr(system, name, getattr(self, name))
+        system.eigenvalues = self.eigenvalues.copy()
+        system.excitations = self.excitations.tolist()
+        system.splittings = self.splittings.tolist()
+        return system
+
+    def summary(self) -> dict:
+        """Returns a dict with a summary of the results."""
+        summary = {name: getattr(self, name) for name in self.scalars}
+        for name in self.arrays:
+            summary[name] = getattr(self, name).tolist()
+        return summary
+
+
+def _restore_result(
+        scalars:tuple,
+        buffer:bytes,
+        lengths:tuple,
+        ) -> SystemResult:
+    """Rebuilds a pickled `SystemResult`."""
+    result = SystemResult.__new__(SystemResult)
+    for name, value in zip(SystemResult.scalars, scalars):
+        setattr(result, name, value)
+    result._buffer = buffer
+    result._lengths = lengths
+    return result
+
+
+def is_uniform(grid) -> bool:
+    """Returns True if the points of a `grid` are equally spaced, as in a `UniformGrid`."""
+    if isinstance(grid, UniformGrid):
+        return True
+    spacings = np.diff(np.asarray(grid, dtype=float))
+    return len(spacings) == 0 or bool(np.allclose(spacings, spacings[0], rtol=1e-6, atol=0))
+
+
+def _translate(
+        values,
+        points:float,
+        repeated:bool=False,
+        ) -> np.ndarray:
+    """Translates periodic `values` by a number of `points` along the last axis,
+    as `np.roll(values, points)`, but allowing fractions of a point.
+
+    Fractions of a point are applied as a phase factor to the Fourier transform of the values.
+    With `repeated = True`, the last value closes the period repeating the first one,
+    as in `np.linspace(0, 2*np.pi)`, so only the previous values are translated.
+    """
+    values = np.asarray(values, dtype=float)
+    if repeated:
+        translated = _translate(values[..., :-1], points)
+        return np.concatenate([translated, translated[..., :1]], axis=-1)
+    if np.isclose(points, round(points), rtol=0, atol=1e-6):
+        return np.roll(values, int(round(points)), axis=-1)
+    n = values.shape[-1]
+    k = np.arange(n // 2 + 1)
+    factor = np.exp(-2j * np.pi * k * points / n)
+    if n % 2 == 0:  # Nyquist term must remain real
+        factor[-1] = factor[-1].real
+    return np.fft.irfft(np.fft.rfft(values, axis=-1) * factor, n, axis=-1)
@@ -10,14 +10,19 @@ These are commonly used as a list of `System` objects.
 | | |
 | --- | --- |
 | `as_list()`           | Ensures that a list only contains System objects |  
+| `SystemTable`         | Columnar table with the results of many systems |  
+| `as_table()`          | Ensures a SystemTable from a list of systems |  
+| `as_results()`        | Convert a list of systems to compact SystemResult objects |  
 | `save_energies()`     | Save the energy eigenvalues for all systems to a CSV |  
 | `save_splittings()`   | Save the tunnel splitting energies for all systems to a CSV |  
 | `save_summary()`      | Save a summary of some relevant parameters for all systems to a CSV |  
+| `update_excitations()` | Recalculate excitations and splittings from the stored eigenvalues |  
 | `get_energies()`      | Get the eigenvalues from all systems |  
 | `get_gridsizes()`     | Get all gridsizes |  
 | `get_runtimes()`      | Get all runtimes |  
 | `get_tags()`          | Get a list with all system tags |  
 | `filter_tags()`       | Filter the systems with or without specific tags |  
+| `TagIndex`            | Inverted index of tags, to filter large collections of systems |  
 | `calculate_ideal_E()` | Calculate the ideal energy for a specified level |  
 | `sort_by_gridsize()`  | Sort systems by gridsize |  
 | `reduce_size()`       | Discard data that takes too much space |  
@@ -27,8 +32,11 @@ These are commonly used as a list of `System` objects.
 """
 
 
-from .system import System
-from aton import txt
+from .system import System, SystemResult
+import os
+import csv
+import gzip
+import numpy as np
 import pandas as pd
 
 
@@ -50,6 +58,194 @@ def as_list(systems) -> None:
     return systems
 
 
+def _as_results(systems) -> list:
+    """Same as `as_list()`, but also accepting `qrotor.system.SystemResult` objects."""
+    if isinstance(systems, (System, SystemResult)):
+        systems = [systems]
+    if not isinstance(systems, list):
+        raise TypeError(f"Must be a System object or a list of systems, found instead: {type(systems)}")
+    for i in systems:
+        if not isinstance(i, (System, SystemResult)):
+            raise TypeError(f"All items in the list must be System or SystemResult objects, found instead: {type(i)}")
+    return systems
+
+
+def _attributes(result:SystemResult) -> dict:
+    """Returns a dict with the attributes of a `result`."""
+    return {name: getattr(result, name) for name in result.scalars + result.arrays}
+
+
+class SystemTable:
+    """Columnar table with the results of a list of systems.
+
+    Built once from a list of `qrotor.system.System`
+    or `qrotor.system.SystemResult` objects,
+    storing each scalar attribute as a NumPy array,
+    and the `eigenvalues`, `excitations` and `splittings`
+    as 2D arrays padded with NaN, along with their original lengths.
+    The rotational `symmetry` of each potential is stored as an additional column,
+    see `qrotor.potential.symmetry()`.
+    This allows to filter, sort and export the results of
+    very large collections of systems with vectorised operations:
+    ```python
+    table = qr.systems.SystemTable(systems)
+    table['B']                                # Array with the B of all systems
+    table['splittings'][:, 0]                 # First splitting of all systems
+    low = table[table['potential_max'] < 30]  # New table with the selected systems
+    low = low.sort('B')
+    low.summary()                             # Pandas DataFrame
+    ```
+    """
+    scalars = (
+        'comment', 'tags', 'version', 'potential_name',
+        'B', 'gridsize', 'searched_E', 'potential_offset', 'potential_min',
+        'potential_max', 'E_activation', 'deg', 'runtime',
+        )
+    """Names of the scalar columns."""
+    arrays = ('eigenvalues', 'excitations', 'splittings')
+    """Names of the padded array columns."""
+    _text = ('comment', 'tags', 'version', 'potential_name')
+
+    def __init__(self, systems:list=None):
+        """A new table can be created as `table = qrotor.systems.SystemTable(systems)`."""
+        self.columns: dict = {}
+        """Dict with the column arrays, by attribute name."""
+        self.lengths: dict = {}
+        """Dict with the original lengths of each array column, for every system."""
+        systems = _as_results(systems) if systems is not None else []
+        attributes = [vars(s) if isinstance(s, System) else _attributes(s) for s in systems]
+        for name in self.scalars:
+            values = [a.get(name) for a in attributes]
+            self.columns[name] = _column(values, text=(name in self._text))
+        for name in self.arrays:
+            self.columns[name], self.lengths[name] = _padded([a.get(name) for a in attributes])
+        from .potential import symmetry
+        self.columns['symmetry'] = _column([symmetry(s) for s in systems])
+
+    def __len__(self) -> int:
+        return len(self.columns['B'])
+
+    def __getitem__(self, key):
+        """Returns a column if `key` is a string,
+        or a new table with the selected rows otherwise,
+        e.g. from a boolean mask, a slice or a list of indexes."""
+        if isinstance(key, str):
+            return self.columns[key]
+        if isinstance(key, (int, np.integer)):
+            key = [key]
+        table = SystemTable()
+        table.columns = {name: column[key] for name, column in self.columns.items()}
+        table.lengths = {name: length[key] for name, length in self.lengths.items()}
+        return table
+
+    def filter(self, mask) -> 'SystemTable':
+        """Returns a new table with the rows where the boolean `mask` is True."""
+        return self[np.asarray(mask, dtype=bool)]
+
+    def sort(
+            self,
+            by:str,
+            reverse:bool=False,
+            ) -> 'SystemTable':
+        """Returns a new table sorted by the column `by`.
+
+        Array columns are sorted by their first value.
+        Missing values are placed at the end.
+        """
+        column = self.columns[by]
+        if column.ndim > 1:
+            column = column[:, 0] if column.shape[1] else np.zeros(len(self))
+        order = np.argsort(column, kind='stable')
+        if reverse:
+            order = order[::-1]
+        return self[order]
+
+    def first(self, name:str) -> np.ndarray:
+        """Returns the first value of the array column `name` for every system, NaN if missing."""
+        column = self.columns[name]
+        if column.shape[1] == 0:
+            return np.full(len(self), np.nan)
+        return column[:, 0]
+
+    def summary(self) -> pd.DataFrame:
+        """Returns a DataFrame with one row per system, as in `save_summary()`."""
+        return pd.DataFrame({
+            'comment': self.columns['comment'],
+            'ZPE': self.first('eigenvalues'),
+            'potential_max': self.columns['potential_max'],
+            'E_activation': self.columns['E_activation'],
+            '1st_splitting': self.first('splittings'),
+            '1st_excitation': self.first('excitations'),
+            'B': self.columns['B'],
+            'degeneracy': self.columns['deg'],
+            'gridsize': self.columns['gridsize'],
+            'tags': self.columns['tags'],
+        })
+
+    def wide(self, name:str) -> pd.DataFrame:
+        """Returns a DataFrame with the array column `name`
+        (e.g. `'eigenvalues'`), with one column per system comment,
+        as in `save_energies()` and `save_splittings()`."""
+        return pd.DataFrame(dict(zip(self.columns['comment'], self.columns[name])))
+
+
+def _column(
+        values:list,
+        text:bool=False,
+        ) -> np.ndarray:
+    """Converts a list of scalar `values` to an array.
+
+    Integer lists are kept as integers,
+    other numeric lists are converted to floats with NaN for None values.
+    """
+    if text:
+        return np.array(values, dtype=object)
+    column = np.array(values)
+    if column.dtype.kind in 'iuf':
+        return column
+    try:
+        return np.array([np.nan if v is None else v for v in values], dtype=float)
+    except (TypeError, ValueError):
+        return np.array(values, dtype=object)
+
+
+def _padded(values:list) -> tuple:
+    """Converts a list of 1D arrays of different `values` to a 2D array padded with NaN.
+
+    None values are considered empty, and None elements are replaced by NaN.
+    Returns a tuple with the padded array and the original lengths.
+    """
+    lengths = np.array([0 if v is None else len(v) for v in values], dtype=np.int64)
+    padded = np.full((len(values), lengths.max() if len(values) else 0), np.nan)
+    # Fill all rows with the same length at once
+    for length in np.unique(lengths):
+        if length == 0:
+            continue
+        rows = np.flatnonzero(lengths == length)
+        try:
+            padded[rows, :length] = np.array([values[i] for i in rows], dtype=float)
+        except (TypeError, ValueError):  # Some None values
+            padded[rows, :length] = [[np.nan if e is None else e for e in values[i]] for i in rows]
+    return padded, lengths
+
+
+def as_table(systems) -> SystemTable:
+    """Returns a `SystemTable` from `systems`, which can be a System, a list of systems, or a table."""
+    if isinstance(systems, SystemTable):
+        return systems
+    return SystemTable(systems)
+
+
+def as_results(systems) -> list:
+    """Returns a list of compact `qrotor.system.SystemResult` objects from `systems`.
+
+    Results take much less memory and pickle faster than System objects,
+    but do not contain the grids, potential values and eigenvectors.
+    """
+    systems = _as_results(systems)
+    return [s if isinstance(s, SystemResult) else SystemResult.from_system(s) for s in systems]
+
+
 def save_energies(
         systems:list,
         comment:str='',
@@ -57,37 +253,28 @@ def save_energies(
         ) -> pd.DataFrame:
     """Save the energy eigenvalues for all `systems` to a qrotor_eigenvalues.csv file.
 
+    The `systems` can be a list of System objects or a `SystemTable`.
+
     Returns a Pandas Dataset with `System.comment` columns and `System.eigenvalues` values.
 
     The output file can be changed with `filepath`,
     or set to null to avoid saving the dataset.
+    The file is compressed if `filepath` ends with `.gz`,
+    or saved in Parquet format if it ends with `.parquet`.
     A `comment` can be included at the top of the file.
     Note that `System.comment` must not include commas (`,`).
     """
-    systems = as_list(systems)
-    version = systems[0].version
-    E = {}
-    # Find max length of eigenvalues
-    max_len = max((len(s.eigenvalues) if s.eigenvalues is not None else 0) for s in systems)
-    for s in systems:
-        if s.eigenvalues is not None:
-            # Filter out None values and replace with NaN
-            valid_eigenvalues = [float('nan') if e is None else e for e in s.eigenvalues]
-            padded_eigenvalues = valid_eigenvalues + [float('nan')] * (max_len - len(s.eigenvalues))
-        else:
-            padded_eigenvalues = [float('nan')] * max_len
-        E[s.comment] = padded_eigenvalues
-    df = pd.DataFrame(E)
+    table = as_table(systems)
+    version = table['version'][0]
+    df = table.wide('eigenvalues')
     if not filepath:
         return df
-    # Else save to file
-    df.to_csv(filepath, sep=',', index=False)
-    # Include a comment at the top of the file
+    # Else save to file, with a comment at the top
     file_comment = f'## {comment}\n' if comment else f''
     file_comment += f'# Energy eigenvalues\n'
     file_comment += f'# Calculated with QRotor {version}\n'
     file_comment += f'# https://pablogila.github.io/qrotor\n#'
-    txt.edit.insert_at(filepath, file_comment, 0)
+    _write(df, filepath, file_comment)
     print(f'Energy eigenvalues saved to {filepath}')
     return df
 
@@ -99,33 +286,29 @@ def save_splittings(
     ) -> pd.DataFrame:
     """Save the tunnel splitting energies for all `systems` to a qrotor_splittings.csv file.
 
+    The `systems` can be a list of System objects or a `SystemTable`.
+
     Returns a Pandas Dataset with `System.comment` columns and `System.splittings` values.
 
     The output file can be changed with `filepath`,
     or set to null to avoid saving the dataset.
+    The file is compressed if `filepath` ends with `.gz`,
+    or saved in Parquet format if it ends with `.parquet`.
     A `comment` can be included at the top of the file.
     Note that `System.comment` must not include commas (`,`).
     Different splitting lengths across systems are allowed - missing values will be NaN.
     """
-    systems = as_list(systems)
-    version = systems[0].version
-    tunnelling_E = {}
-    # Find max length of splittings
-    max_len = max(len(s.splittings) for s in systems)
-    for s in systems:  # Pad shorter splittings with NaN
-        padded_splittings = s.splittings + [float('nan')] * (max_len - len(s.splittings))
-        tunnelling_E[s.comment] = padded_splittings
-    df = pd.DataFrame(tunnelling_E)
+    table = as_table(systems)
+    version = table['version'][0]
+    df = table.wide('splittings')
     if not filepath:
         return df
-    # Else save to file
-    df.to_csv(filepath, sep=',', index=False)
-    # Include a comment at the top of the file 
+    # Else save to file, with a comment at the top
     file_comment = f'## {comment}\n' if comment else f''
     file_comment += f'# Tunnel splitting energies\n'
     file_comment += f'# Calculated with QRotor {version}\n'
     file_comment += f'# https://pablogila.github.io/qrotor\n#'
-    txt.edit.insert_at(filepath, file_comment, 0)
+    _write(df, filepath, file_comment)
     print(f'Tunnel splitting energies saved to {filepath}')
     return df
 
@@ -134,128 +317,193 @@ def save_summary(
     systems:list,
     comment:str='',
     filepath:str='qrotor_summary.csv',
+    append:bool=False,
     ) -> pd.DataFrame:
     """Save a summary for all `systems` to a qrotor_summary.csv file.
 
     Produces one row per System with the columns:
     `comment`, `ZPE`, `E_activation`, `potential_max`, `1st_splitting`,
-    `1st_excitation`, `B`, `degeneracy`, `gridsize`.
+    `1st_excitation`, `B`, `degeneracy`, `gridsize`, `tags`.
+    The `systems` can be a list of System objects or a `SystemTable`.
 
     Set `filepath` to null to just return the DataFrame.
+    The file is compressed if `filepath` ends with `.gz`,
+    or saved in Parquet format if it ends with `.parquet`.
+    With `append = True`, the new rows are added at the end of
+    a previous CSV file without rewriting it.
     """
-    systems = as_list(systems)
-    version = systems[0].version
-    rows = []
-    for s in systems:
-        eigenvalues = getattr(s, 'eigenvalues', None)
-        if eigenvalues is not None and len(eigenvalues) > 0:
-            first_val = eigenvalues[0]
-            zpe = float('nan') if first_val is None else first_val
-        else:
-            zpe = float('nan')
-        splittings = getattr(s, 'splittings', None)
-        if splittings is not None and len(splittings) > 0:
-            first_splitting = float('nan') if splittings[0] is None else splittings[0]
-        else:
-            first_splitting = float('nan')
-        excitations = getattr(s, 'excitations', None)
-        if excitations is not None and len(excitations) > 0:
-            first_excitation = float('nan') if excitations[0] is None else excitations[0]
-        else:
-            first_excitation = float('nan')
-        system_comment = getattr(s, 'comment', None)
-        E_activation = getattr(s, 'E_activation', None)
-        B = getattr(s, 'B', None)
-        tags = getattr(s, 'tags', None)
-        deg = getattr(s, 'deg', None)
-        gridsize = getattr(s, 'gridsize', None)
-        potential_max = getattr(s, 'potential_max', None)
-        # Each row contains the following:
-        rows.append({
-            'comment': system_comment,
-            'ZPE': zpe,
-            'potential_max': potential_max,
-            'E_activation': E_activation,
-            '1st_splitting': first_splitting,
-            '1st_excitation': first_excitation,
-            'B': B,
-            'degeneracy': deg,
-            'gridsize': gridsize,
-            'tags': tags,
-        })
+    table = as_table(systems)
+    version = table['version'][0]
     # Save to file or just return df
-    df = pd.DataFrame(rows)
+    df = table.summary()
     if not filepath:
         return df
-    df.to_csv(filepath, sep=',', index=False)
-    # Include a comment at the top of the file
+    # Save to file, with a comment at the top
     file_comment = f'## {comment}\n' if comment else ''
     file_comment += '# Summary of systems\n'
     file_comment += f'# Calculated with QRotor {version}\n'
     file_comment += '# https://pablogila.github.io/qrotor\n#'
-    txt.edit.insert_at(filepath, file_comment, 0)
+    _write(df, filepath, file_comment, append)
     print(f'Summary saved to {filepath}')
     return df
 
 
-def get_energies(systems:list) -> list:
-    """Get a list with all lists of eigenvalues from all systems.
+def _write(
+        df:pd.DataFrame,
+        filepath:str,
+        header:str,
+        append:bool=False,
+        ) -> None:
+    """Writes a `df` DataFrame to a CSV `filepath`, below a commented `header`, in a single pass.
 
+    Compresses the file with gzip if `filepath` ends with `.gz`.
+    If `filepath` ends with `.parquet`, the DataFrame is saved in Parquet format instead,
+    with the `header` stored in its metadata.
+    If `append = True` and the file already exists, only the new rows are written,
+    which must have the same columns as the previous file.
+    """
+    if filepath.endswith('.parquet'):
+        if append:
+            raise ValueError('Parquet files can not be appended, save them to CSV instead')
+        df.attrs['header'] = header
+        df.to_parquet(filepath, index=False)
+        return None
+    opener = gzip.open if filepath.endswith('.gz') else open
+    if append and os.path.isfile(filepath) and os.path.getsize(filepath) > 0:
+        with opener(filepath, 'rt', newline='') as f:
+            columns = next((line for line in f if not line.startswith('#')), '').strip()
+        if columns != ','.join(str(column) for column in df.columns):
+            raise ValueError(f'Columns of {filepath} do not match, can not append: {columns}')
+        with opener(filepath, 'at', newline='') as f:
+            df.to_csv(f, sep=',', index=False, header=False)
+        return None
+    with opener(filepath, 'wt', newline='') as f:
+        f.write(header + '\n')
+        df.to_csv(f, sep=',', index=False)
+    return None
+
+
+def _summary_rows(filepath:str) -> list:
+    """Returns the `(comment, B)` of the complete data rows of a summary CSV `filepath`,
+    as written by `save_summary()`. Returns an empty list if the file does not exist.
+
+    A truncated last line, e.g. from an interrupted write, is removed from the file,
+    so that new rows can be appended after the complete ones.
+    """
+    if not os.path.isfile(filepath):
+        return []
+    opener = gzip.open if filepath.endswith('.gz') else open
+    lines = []
+    try:
+        with opener(filepath, 'rt', newline='') as f:
+            for line in f:
+                lines.append(line)
+    except EOFError:  # Truncated gzip stream
+        lines.append('')
+    if lines and not lines[-1].endswith('\n'):
+        lines.pop()
+        with opener(filepath, 'wt', newline='') as f:
+            f.writelines(lines)
+    data = list(csv.reader(line for line in lines if not line.startswith('#')))
+    if not data:
+        return []
+    columns = data[0]
+    comment, B = columns.index('comment'), columns.index('B')
+    return [(row[comment], float(row[B]) if row[B] else np.nan) for row in data[1:]]
+
+
+def update_excitations(systems):
+    """Recalculates the degeneracy, excitations and tunnel splittings of `systems`
+    from their stored eigenvalues, without solving them again.
+
+    The `systems` can be a list of `System` or `SystemResult` objects, or a `SystemTable`,
+    which are updated in place and returned.
+    All spectra are analysed at once with `qrotor.solve.E_levels_many()`.
+    Systems with less than three eigenvalues are left unchanged.
+    """
+    from .solve import E_levels_many, _split_levels
+    from .potential import symmetry
+    if isinstance(systems, SystemTable):
+        eigenvalues, lengths = systems['eigenvalues'], systems.lengths['eigenvalues']
+        potential_max, symmetries = systems['potential_max'], systems.columns.get('symmetry')
+    else:
+        systems = _as_results(systems)
+        eigenvalues, lengths = _padded([s.eigenvalues for s in systems])
+        potential_max = _column([s.potential_max for s in systems])
+        symmetries = _column([symmetry(s) for s in systems])
+    labels, degeneracy, excitations, splittings = E_levels_many(eigenvalues, potential_max, symmetries)
+    n_levels = np.max(labels, axis=1, initial=-1) + 1
+    solved = lengths >= 3
+    if isinstance(systems, SystemTable):
+        n_levels = np.where(solved, n_levels, 0)
+        width = n_levels.max(initial=0)
+        systems.columns['deg'] = np.where(solved, degeneracy, systems['deg'])
+        systems.columns['excitations'] = np.where(solved[:, None], excitations, np.nan)[:, :max(width - 1, 0)]
+        systems.columns['splittings'] = np.where(solved[:, None], splittings, np.nan)[:, :width]
+        systems.lengths['excitations'] = np.maximum(n_levels - 1, 0)
+        systems.lengths['splittings'] = n_levels
+        return systems
+    for i, system in enumerate(systems):
+        if not solved[i]:
+            continue
+        n = n_levels[i]
+        system.deg = int(degeneracy[i])
+        if isinstance(system, SystemResult):
+            system._pack([system.eigenvalues, excitations[i, :n-1], splittings[i, :n]])
+            continue
+        system.E_levels = _split_levels(eigenvalues[i], labels[i])
+        system.excitations = excitations[i, :n-1].tolist()
+        system.splittings = splittings[i, :n].tolist()
+    return systems
+
+
+def get_energies(systems) -> list:
+    """Get a list with all arrays of eigenvalues from all systems.
+
+    The `systems` can be a list of System or `qrotor.system.SystemResult` objects, or a `SystemTable`.
     If no eigenvalues are present for a particular system, appends None.
     """
-    systems = as_list(systems)
-    energies = []
-    for i in systems:
-        if all(i.eigenvalues):
-            energies.append(i.eigenvalues)
-        else:
-            energies.append(None)
-    return energies
+    table = as_table(systems)
+    eigenvalues, lengths = table['eigenvalues'], table.lengths['eigenvalues']
+    return [row[:n] if n else None for row, n in zip(eigenvalues, lengths)]
 
 
-def get_gridsizes(systems:list) -> list:
+def get_gridsizes(systems) -> list:
     """Get a list with all gridsize values.
 
-    If no gridsize value is present for a particular system, appends None.
+    The `systems` can be a list of System or `qrotor.system.SystemResult` objects, or a `SystemTable`.
+    If no gridsize value is present for a particular system,
+    appends the number of its potential values, or None.
     """
-    systems = as_list(systems)
-    gridsizes = []
-    for i in systems:
-        if i.gridsize:
-            gridsizes.append(i.gridsize)
-        elif any(i.potential_values):
-            gridsizes.append(len(i.potential_values))
-        else:
-            gridsizes.append(None)
+    if not isinstance(systems, SystemTable):
+        systems = _as_results(systems)
+    column = np.asarray(as_table(systems)['gridsize'], dtype=float)
+    missing = ~(column > 0)
+    gridsizes = np.where(missing, 0, column).astype(int).tolist()
+    for i in np.flatnonzero(missing):
+        values = getattr(systems[i], 'potential_values', None) if isinstance(systems, list) else None
+        gridsizes[i] = len(values) if values is not None and len(values) > 0 else None
     return gridsizes
 
 
-def get_runtimes(systems:list) -> list:
+def get_runtimes(systems) -> list:
     """Returns a list with all runtime values.
-    
+
+    The `systems` can be a list of System or `qrotor.system.SystemResult` objects, or a `SystemTable`.
     If no runtime value is present for a particular system, appends None.
     """
-    systems = as_list(systems)
-    runtimes = []
-    for i in systems:
-        if i.runtime:
-            runtimes.append(i.runtime)
-        else:
-            runtimes.append(None)
-    return runtimes
+    column = np.asarray(as_table(systems)['runtime'], dtype=float)
+    return np.where(column > 0, column, None).tolist()
 
 
 def get_tags(systems:list) -> list:
     """Returns a list with all system tags."""
     systems = as_list(systems)
-    tags = []
+    tags = {}
     for i in systems:
         # i.tags is guaranteed to exist and be a string (may be empty)
-        system_tags = i.tags.split()
-        for tag in system_tags:
-            if tag not in tags:
-                tags.append(tag)
-    return tags
+        tags.update(dict.fromkeys(i.tags.split()))
+    return list(tags)
 
 
 def filter_tags(
@@ -269,25 +517,118 @@ def filter_tags(
     You can `include` or `exclude` any number of tags, separated by blank spaces.
     By default, the filters are triggered if any tag is found, i.e. *tag1 OR tag2*.
     Set `strict=True` to require all tags to match, i.e. *tag1 AND tag2*.
+
+    To filter the same collection several times, build a `TagIndex` once instead.
     """
-    systems = as_list(systems)
-    included_tags = include.split()
-    excluded_tags = exclude.split()
-    filtered_systems = []
-    for i in systems:
-        tags_found = get_tags(i)
+    return TagIndex(systems).filter(include, exclude, strict)
+
+
+class TagIndex:
+    """Inverted index of the tags of a list of systems.
+
+    Maps each tag to the positions of the systems containing it,
+    so that filtering a large collection of systems only
+    requires boolean operations over the selected tags:
+    ```python
+    index = qr.systems.TagIndex(systems)
+    index.filter(include='CH3 NH3', exclude='deuterated')
+    mask = index['CH3'] & ~index['deuterated']  # Boolean arrays
+    index.select(mask)                          # List of systems
+    index.append(new_system)                    # The index stays updated
+    ```
+    The boolean masks can also be used with a `SystemTable` of the same systems.
+    The indexed systems can also be `qrotor.system.SystemResult` objects.
+    """
+    def __init__(self, systems:list=None):
+        """A new index can be created as `index = qrotor.systems.TagIndex(systems)`."""
+        self.systems: list = []
+        """Indexed systems."""
+        self._positions: dict = {}
+        self._masks: dict = {}
+        self._empty = np.zeros(0, dtype=bool)
+        if systems is not None:
+            self.extend(systems)
+
+    def __len__(self) -> int:
+        return len(self.systems)
+
+    def append(self, system:System) -> None:
+        """Adds a new `system` to the index."""
+        self.extend([system])
+
+    def extend(self, systems:list) -> None:
+        """Adds a list of `systems` to the index."""
+        systems = _as_results(systems)
+        start = len(self.systems)
+        self.systems.extend(systems)
+        for position, system in enumerate(systems, start):
+            for tag in dict.fromkeys((system.tags or '').split()):
+                self._positions.setdefault(tag, []).append(position)
+                self._masks.pop(tag, None)
+
+    @property
+    def tags(self) -> list:
+        """List of all indexed tags."""
+        return list(self._positions)
+
+    def __getitem__(self, tag:str) -> np.ndarray:
+        """Returns a read-only boolean array, True for the systems containing the `tag`.
+
+        The array is shared with the index, so combine it with new arrays,
+        e.g. `index['a'] & index['b']`, instead of modifying it in place.
+        Unknown tags return a shared array of False values, without being cached.
+        """
+        if tag not in self._positions:
+            if len(self._empty) != len(self.systems):
+                self._empty = np.zeros(len(self.systems), dtype=bool)
+                self._empty.flags.writeable = False
+            return self._empty
+        mask = self._masks.get(tag)
+        if mask is None:
+            mask = np.zeros(len(self.systems), dtype=bool)
+            mask[self._positions.get(tag, [])] = True
+        elif len(mask) < len(self.systems):  # Systems without this tag were appended
+            mask = np.concatenate([mask, np.zeros(len(self.systems) - len(mask), dtype=bool)])
+        else:
+            return mask
+        mask.flags.writeable = False
+        self._masks[tag] = mask
+        return mask
+
+    def mask(
+            self,
+            include:str='',
+            exclude:str='',
+            strict:bool=False,
+            ) -> np.ndarray:
+        """Returns a boolean array with the systems that pass the filters, as in `filter()`."""
+        included_tags = include.split()
+        excluded_tags = exclude.split()
+        combine = np.logical_and if strict else np.logical_or
+        mask = np.ones(len(self.systems), dtype=bool)
         if excluded_tags:
-            if strict and all(tag in tags_found for tag in excluded_tags):
-                continue
-            elif not strict and any(tag in tags_found for tag in excluded_tags):
-                continue
+            mask &= ~combine.reduce([self[tag] for tag in excluded_tags])
         if included_tags:
-            if strict and not all(tag in tags_found for tag in included_tags):
-                continue
-            elif not strict and not any(tag in tags_found for tag in included_tags):
-                continue
-        filtered_systems.append(i)
-    return filtered_systems
+            mask &= combine.reduce([self[tag] for tag in included_tags])
+        return mask
+
+    def select(self, mask) -> list:
+        """Returns a list with the systems where the boolean `mask` is True."""
+        return [self.systems[i] for i in np.flatnonzero(mask)]
+
+    def filter(
+            self,
+            include:str='',
+            exclude:str='',
+            strict:bool=False,
+            ) -> list:
+        """Returns a filtered list of systems with or without specific tags.
+
+        You can `include` or `exclude` any number of tags, separated by blank spaces.
+        By default, the filters are triggered if any tag is found, i.e. *tag1 OR tag2*.
+        Set `strict=True` to require all tags to match, i.e. *tag1 AND tag2*.
+        """
+        return self.select(self.mask(include, exclude, strict))
 
 
 def calculate_ideal_E(E_level:int) -> int:
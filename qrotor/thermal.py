@@ -0,0 +1,184 @@
+"""
+# Description
+
+This module calculates temperature-dependent properties of solved systems,
+such as Boltzmann populations, thermally averaged tunnel splittings
+and effective activation energies.
+
+All functions take a System, a list of systems, a `qrotor.systems.SystemTable`,
+or directly an array of eigenvalues with one spectrum per row,
+and an array of temperatures `T` in kelvin.
+Whole temperature-by-parameter grids are calculated at once with broadcasted operations,
+returning arrays with shape `(systems, T, ...)`.
+Axes of single systems and of scalar temperatures are removed.
+```python
+import qrotor as qr
+import numpy as np
+systems = []
+for V in np.linspace(10, 50, 100):
+    system = qr.System(B=qr.B_CH3, potential_name='cos', potential_constants=[0, V, 3, 0])
+    systems.append(system.solve(5000))
+T = np.linspace(5, 150, 30)
+splittings = qr.thermal.splittings(systems, T)  # Shape (100, 30)
+activation = qr.thermal.activation(systems, T)
+```
+
+Energy levels are grouped as in `qrotor.solve.E_levels_many()`,
+so that degenerate states are counted once per state but share their level.
+
+
+# Index
+
+| | |
+| --- | --- |
+| `populations()`       | Boltzmann populations of each eigenstate |
+| `level_populations()` | Boltzmann populations of each energy level |
+| `energy()`            | Thermally averaged energy |
+| `splittings()`        | Thermally averaged tunnel splitting |
+| `activation()`        | Effective activation energy of the tunnelling |
+| `arrhenius()`         | Arrhenius fit of rates as a function of temperature |
+
+---
+"""
+
+
+from .system import System, SystemResult
+from . import constants
+from . import systems as _systems
+from .solve import E_levels_many
+import numpy as np
+
+
+def populations(data, T) -> np.ndarray:
+    """Returns the Boltzmann populations of the eigenstates of `data` at temperatures `T`,
+    with shape `(systems, T, states)`."""
+    eigenvalues, _, _, single = _spectra(data)
+    return _squeeze(_boltzmann(eigenvalues, _temperatures(T)), T, single)
+
+
+def level_populations(data, T) -> np.ndarray:
+    """Returns the Boltzmann populations of the energy levels of `data` at temperatures `T`,
+    with shape `(systems, T, levels)`, summing the populations of their degenerate states.
+    Levels are padded with NaN up to the maximum number of levels."""
+    eigenvalues, vmax, symmetry, single = _spectra(data)
+    levels = _levels(eigenvalues, vmax, symmetry)
+    p = _boltzmann(eigenvalues, _temperatures(T))
+    return _squeeze(_per_level(p, levels), T, single)
+
+
+def energy(data, T) -> np.ndarray:
+    """Returns the thermally averaged energy $\\langle E \\rangle$ of `data` at temperatures `T`,
+    in meV, with shape `(systems, T)`."""
+    eigenvalues, _, _, single = _spectra(data)
+    p = _boltzmann(eigenvalues, _temperatures(T))
+    return _squeeze(np.einsum('stn,sn->st', p, np.nan_to_num(eigenvalues)), T, single)
+
+
+def splittings(data, T) -> np.ndarray:
+    """Returns the thermally averaged tunnel splitting of `data` at temperatures `T`,
+    in meV, with shape `(systems, T)`.
+
+    Calculated as $\\sum_l p_l \\Delta_l$, with the splittings $\\Delta_l$
+    and populations $p_l$ of the energy levels $l$ with a known splitting.
+    At low temperatures, it tends to the splitting of the ground level.
+    Levels above the calculated eigenvalues are not considered,
+    so the `searched_E` of the systems must be high enough for the given temperatures.
+    """
+    eigenvalues, vmax, symmetry, single = _spectra(data)
+    levels = _levels(eigenvalues, vmax, symmetry)
+    p = _per_level(_boltzmann(eigenvalues, _temperatures(T)), levels)
+    splitting = np.nansum(p * np.abs(levels['splittings'])[:, None, :], axis=-1)
+    return _squeeze(splitting, T, single)
+
+
+def activation(data, T) -> np.ndarray:
+    """Returns the effective activation energy of the tunnelling of `data` at temperatures `T`,
+    in meV, with shape `(systems, T)`.
+
+    Following Tolman's interpretation, it is the mean energy of the tunnelling states
+    minus the mean energy of all states, $E_a = \\langle E \\rangle_\\Delta - \\langle E \\rangle$,
+    where $\\langle E \\rangle_\\Delta$ weights each level by its population and splitting.
+    Up to the small splittings within each level, this equals
+    $k_B T^2 \\, d \\ln\\langle\\Delta\\rangle / dT$ for the averaged splittings of `splittings()`,
+    i.e. the local slope of an Arrhenius plot at each temperature.
+    """
+    eigenvalues, vmax, symmetry, single = _spectra(data)
+    temperatures = _temperatures(T)
+    levels = _levels(eigenvalues, vmax, symmetry)
+    p_states = _boltzmann(eigenvalues, temperatures)
+    p = _per_level(p_states, levels)
+    rates = np.abs(levels['splittings'])[:, None, :] * p
+    known = np.isfinite(rates)
+    rates = np.where(known, rates, 0)
+    means = np.nan_to_num(levels['energies'])[:, None, :]
+    with np.errstate(invalid='ignore'):
+        tunnelling = (rates * means).sum(axis=-1) / rates.sum(axis=-1)
+    mean = np.einsum('stn,sn->st', p_states, np.nan_to_num(eigenvalues))
+    return _squeeze(tunnelling - mean, T, single)
+
+
+def arrhenius(T, rates) -> tuple:
+    """Fits the `rates` at temperatures `T` to the Arrhenius law $k = A \\exp(-E_a / k_B T)$.
+
+    The `rates` can have several rows, e.g. the `splittings()` of many systems,
+    with temperatures along the last axis; all rows are fitted at once.
+    Returns a tuple with the activation energies `E_a` in meV and the prefactors `A`.
+    """
+    x = -1 / (constants.k_B * np.asarray(T, dtype=float))
+    y = np.log(np.asarray(rates, dtype=float))
+    x_mean = x.mean()
+    slopes = np.sum((x - x_mean) * (y - y.mean(axis=-1, keepdims=True)), axis=-1) / np.sum((x - x_mean)**2)
+    prefactors = np.exp(y.mean(axis=-1) - slopes * x_mean)
+    return slopes, prefactors
+
+
+def _spectra(data) -> tuple:
+    """Returns the `(eigenvalues, vmax, symmetry, single)` of `data`, with one spectrum per row."""
+    if isinstance(data, (np.ndarray, list)) and not any(isinstance(d, (System, SystemResult)) for d in data):
+        eigenvalues = np.array(data, dtype=float, ndmin=2)
+        return eigenvalues, None, None, np.ndim(data) == 1
+    single = isinstance(data, (System, SystemResult))
+    table = _systems.as_table(data)
+    return table['eigenvalues'], table['potential_max'], table.columns.get('symmetry'), single
+
+
+def _temperatures(T) -> np.ndarray:
+    return np.atleast_1d(np.asarray(T, dtype=float))
+
+
+def _squeeze(values:np.ndarray, T, single:bool) -> np.ndarray:
+    """Removes the axes of single systems and scalar temperatures."""
+    if np.ndim(T) == 0:
+        values = values[:, 0]
+    return values[0] if single else values
+
+
+def _boltzmann(eigenvalues:np.ndarray, T:np.ndarray) -> np.ndarray:
+    """Boltzmann populations of the states with `eigenvalues` (systems, states)
+    at temperatures `T`, with shape (systems, T, states). NaN energies are not populated."""
+    relative = eigenvalues - np.nanmin(eigenvalues, axis=-1, keepdims=True)
+    kT = constants.k_B * np.maximum(T, 1e-12)  # Only the ground level at T = 0
+    factors = np.exp(-relative[:, None, :] / kT[None, :, None])
+    factors = np.nan_to_num(factors, nan=0.0)
+    return factors / factors.sum(axis=-1, keepdims=True)
+
+
+def _levels(eigenvalues:np.ndarray, vmax, symmetry=None) -> dict:
+    """Energy levels of each spectrum, as a dict with the level `labels` of each eigenvalue,
+    and the mean `energies` and `splittings` of each level."""
+    labels, _, excitations, splittings = E_levels_many(eigenvalues, vmax, symmetry)
+    labels, excitations, splittings = np.atleast_2d(labels), np.atleast_2d(excitations), np.atleast_2d(splittings)
+    in_ground = labels == 0
+    with np.errstate(invalid='ignore'):
+        ground = np.where(in_ground, eigenvalues, 0).sum(axis=1) / in_ground.sum(axis=1)
+    energies = np.concatenate([ground[:, None], ground[:, None] + excitations], axis=1)
+    return {'labels': labels, 'energies': energies, 'splittings': splittings}
+
+
+def _per_level(p:np.ndarray, levels:dict) -> np.ndarray:
+    """Sums the populations `p` (systems, T, states) of the states of each level."""
+    n_levels = levels['splittings'].shape[-1]
+    members = levels['labels'][:, :, None] == np.arange(n_levels)  # (systems, states, levels)
+    summed = np.einsum('stn,snl->stl', p, members)
+    empty = ~members.any(axis=1)[:, None, :]
+    return np.where(empty, np.nan, summed)
@@ -16,8 +16,9 @@ setup(
     long_description = LONG_DESCRIPTION,
     long_description_content_type = 'text/markdown',
     packages = find_packages(),
+    package_data = {'qrotor': ['data/*.npz']},
     install_requires = ['scipy', 'pandas', 'numpy', 'matplotlib', 'aton', 'periodictable'],
-    extras_requires = {'dev': ['pytest', 'twine', 'build']},
+    extras_require = {'dev': ['pytest', 'twine', 'build'], 'threads': ['threadpoolctl']},
     python_requires = '>=3',
     license = 'AGPL-3.0',
     keywords = ['QRotor', 'Molecular rotations', 'Quantum rotations', 'Quantum', 'Molecular', 'Rotations', 'Neutrons', 'Research', 'Ab-initio', 'DFT', 'Density Functional Theory', 'Quantum ESPRESSO', 'Phonons', 'Electronic structure'],
@@ -0,0 +1,33 @@
+import qrotor as qr
+
+
+def test_cache(tmp_path):
+    default_folder = qr.cache.folder
+    default_max_size = qr.cache.max_size
+    qr.cache.folder = str(tmp_path)
+    qr.cache.clear()
+    try:
+        system = qr.System(potential_name='cos', potential_constants=[0, 30, 3, 0], gridsize=2000)
+        qr.solve.energies(system, use_cache=True)
+        assert qr.cache.stats()['misses'] == 1
+        assert qr.cache.stats()['entries'] == 1
+        cached = qr.System(potential_name='cos', potential_constants=[0, 30, 3, 0], gridsize=2000, comment='cached', tags='new')
+        qr.solve.energies(cached, use_cache=True)
+        assert qr.cache.stats()['hits'] == 1
+        assert cached.comment == 'cached' and cached.tags == 'new'
+        assert len(cached.eigenvalues) == len(system.eigenvalues)
+        assert round(cached.eigenvalues[0], 8) == round(system.eigenvalues[0], 8)
+        assert cached.splittings == system.splittings
+        # A different input should not be found
+        other = qr.System(potential_name='cos', potential_constants=[0, 31, 3, 0], gridsize=2000)
+        assert qr.cache.load(other) is None
+        solver = qr.System(potential_name='cos', potential_constants=[0, 30, 3, 0], gridsize=2000, solver='sparse')
+        assert qr.cache.key(solver) != qr.cache.key(cached)
+        # Least recently used systems are removed above max_size
+        qr.cache.max_size = 0
+        qr.solve.energies(other, use_cache=True)
+        assert qr.cache.stats()['entries'] == 0
+    finally:
+        qr.cache.clear()
+        qr.cache.folder = default_folder
+        qr.cache.max_size = default_max_size
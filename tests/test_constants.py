@@ -11,3 +11,4 @@ def test_constants():
     assert round(qr.eV_to_Ry, 5)  == 0.07350
     assert round(qr.meV_to_Ry, 10) == .0000734986
 
+    assert round(qr.k_B, 7) == 0.0861733
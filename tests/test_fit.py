@@ -0,0 +1,49 @@
+import qrotor as qr
+import numpy as np
+import pytest
+
+
+def test_surrogate():
+    system = qr.System(B=qr.B_CH3, potential_name='cos', potential_constants=[0, 30, 3, 0], searched_E=9)
+    system.solve(50000)
+    eigenvalues, jacobian = qr.fit.surrogate(system, gradients=True)
+    assert np.allclose(eigenvalues, system.eigenvalues, atol=1e-3)
+    assert jacobian.shape == (9, 5)
+    # Hellmann–Feynman derivatives against finite differences
+    h = 1e-4
+    upper = qr.System(B=qr.B_CH3 + h, potential_name='cos', potential_constants=[0, 30 + h, 3, 0], searched_E=9)
+    B_only = qr.System(B=qr.B_CH3 + h, potential_name='cos', potential_constants=[0, 30, 3, 0], searched_E=9)
+    dE_dB = (qr.fit.surrogate(B_only) - eigenvalues) / h
+    dE_dC1 = (qr.fit.surrogate(upper) - qr.fit.surrogate(B_only)) / h
+    assert np.allclose(jacobian[:, 0], dE_dB, atol=1e-3)
+    assert np.allclose(jacobian[:, 2], dE_dC1, atol=1e-3)
+
+
+def test_fit_potential():
+    reference = qr.System(B=qr.B_CH3, potential_name='cos', potential_constants=[0, 30, 3, 0], searched_E=12)
+    reference.solve(50000)
+    guess = qr.System(B=qr.B_CH3, potential_name='cos', potential_constants=[0, 20, 3, 0], searched_E=12)
+    fitted = qr.fit.potential(guess, splittings=reference.splittings[:2], excitations=reference.excitations[:1], vary=[1])
+    assert abs(fitted.potential_constants[1] - 30) < 0.01
+    assert guess.potential_constants == [0, 20, 3, 0]
+    # Only the amplitude is fitted by default, and the result is not solved
+    guess.solve(5000)
+    fitted = qr.fit.potential(guess, splittings=reference.splittings[:1], excitations=reference.excitations[:1])
+    assert fitted.potential_constants[0] == 0 and fitted.potential_constants[2:] == [3, 0]
+    assert abs(fitted.potential_constants[1] - 30) < 0.01
+    assert len(fitted.eigenvalues) == 0 and len(fitted.splittings) == 0
+    with pytest.raises(ValueError):
+        qr.fit.potential(guess, splittings=reference.splittings[:1], vary=[1, 2])
+    fitted = qr.fit.potential(guess, splittings=reference.splittings[:2], excitations=reference.excitations[:2],
+                              vary=[1], fit_B=True, starts=6, workers=2, seed=0)
+    assert abs(fitted.B - qr.B_CH3) < 1e-3
+
+
+def test_potential_derivatives():
+    system = qr.System(potential_name='titov2023')
+    system.solve_potential(1000)
+    gradient = qr.potential.derivatives(system)
+    assert gradient.shape == (5, 1000)
+    x = np.asarray(system.grid)
+    assert np.allclose(gradient[2] - gradient[2].min(), np.cos(3*x) - np.cos(3*x).min(), atol=1e-6)
+    assert qr.potential.constants_of(qr.System(potential_name='cos', potential_constants=[0, 30])) == [0, 30, 3, 0]
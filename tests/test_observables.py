@@ -0,0 +1,59 @@
+import qrotor as qr
+import numpy as np
+
+
+def test_expectation():
+    system = qr.System(potential_name='cos', potential_constants=[0, 30, 3, 0], searched_E=6)
+    system.solve(3000)
+    cos3 = qr.observables.expectation(system, lambda x: np.cos(3*x))
+    assert len(cos3) == 6
+    values = np.cos(3*np.asarray(system.grid))
+    assert np.allclose(qr.observables.expectation(system, list(values)), cos3)
+    assert qr.observables.expectation(system, [np.cos, values]).shape == (2, 6)
+    matrix = qr.observables.matrix_elements(system, np.cos(3*np.asarray(system.grid)))
+    assert np.allclose(matrix, matrix.T)
+    assert np.allclose(np.diag(matrix), cos3)
+    assert np.allclose(qr.observables.overlap(system, system), np.eye(6), atol=1e-8)
+    localisation = qr.observables.localisation(system)
+    assert np.all(localisation >= np.abs(cos3) - 1e-12)
+    x, densities = qr.observables.density(system, levels=[0, 1])
+    assert densities.shape == (2, 3000)
+    assert np.allclose(np.sum(densities * qr.solve.grid_weights(system.grid), axis=1), 1.0)
+    # Free rotor is not localised
+    free = qr.System(potential_name='zero', searched_E=3)
+    free.solve(3000)
+    assert qr.observables.localisation(free, levels=0)[0] < 1e-3
+
+
+def test_compressed_eigenvectors():
+    system = qr.System(potential_name='cos', potential_constants=[0, 30, 3, 0], searched_E=6)
+    system.solve(6000)
+    observable = lambda x: np.cos(3*x)
+    reference = qr.observables.expectation(system, observable)
+    single = qr.observables.expectation(system.eigenvectors.astype(np.float32), observable, grid=system.grid)
+    assert np.allclose(single, reference, atol=1e-5)
+    downsampled = qr.observables.expectation(system.eigenvectors[:, ::10], observable, grid=system.grid)
+    assert np.allclose(downsampled, reference, atol=1e-3)
+    compressed = qr.observables.compress(system, modes=48)
+    assert compressed.shape == (6, 48)
+    system.eigenvectors = compressed
+    assert np.allclose(qr.observables.expectation(system, observable), reference, atol=1e-5)
+    assert qr.observables.decompress(compressed, 600).shape == (6, 600)
+
+
+def test_sensitivities():
+    def solved(B=qr.B_CH3, V=30):
+        system = qr.System(B=B, potential_name='cos', potential_constants=[0, V, 3, 0], searched_E=9)
+        return system.solve(20000)
+    system = solved()
+    result = qr.observables.sensitivities(system)
+    assert result['parameters'] == ['B', 'scale', 'C0', 'C1', 'C2', 'C3']
+    assert result['eigenvalues'].shape == (9, 6)
+    assert result['splittings'].shape == (len(system.splittings), 6)
+    h = 1e-3
+    upper, lower = solved(B=qr.B_CH3 + h), solved(B=qr.B_CH3 - h)
+    assert np.allclose((np.array(upper.eigenvalues) - lower.eigenvalues) / (2*h), result['eigenvalues'][:, 0], atol=1e-4)
+    assert np.allclose((np.array(upper.excitations) - lower.excitations) / (2*h), result['excitations'][:, 0], atol=1e-4)
+    upper, lower = solved(V=30 + h), solved(V=30 - h)
+    assert np.allclose((np.array(upper.splittings) - lower.splittings) / (2*h), result['splittings'][:, 3], atol=1e-5)
+    assert np.allclose(result['eigenvalues'][:, 2], 0.0, atol=1e-6)  # The offset is corrected
@@ -0,0 +1,47 @@
+import qrotor as qr
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+
+
+def test_decimated():
+    x = np.linspace(0, 2*np.pi, 100001)
+    y = np.sin(3*x)
+    y[12345] = 5.0  # Narrow peak
+    xd, yd = qr.plot.decimated(x, y, 500)
+    assert len(xd) <= 2 * 500 + 2
+    assert xd[0] == x[0] and xd[-1] == x[-1]
+    assert np.all(np.diff(xd) > 0)
+    assert yd.max() == 5.0
+    assert yd.min() == y.min()
+    # Short lines are not modified
+    xd, yd = qr.plot.decimated(x[:1000], y[:1000], 500)
+    assert len(xd) == 1000
+
+
+def test_plot_potential():
+    system = qr.System(potential_name='cos', potential_constants=[0, 30, 3, 0])
+    system.solve_potential(100000)
+    values = system.potential_values
+    qr.plot.potential(system, normalize=True)
+    assert system.potential_values is values
+    line = matplotlib.pyplot.gcf().axes[0].lines[0]
+    assert len(line.get_xdata()) < 10000
+    matplotlib.pyplot.close('all')
+
+
+def test_render_many(tmp_path):
+    systems = []
+    for V in [10, 30, 50]:
+        system = qr.System(potential_name='cos', potential_constants=[0, V, 3, 0], save_eigenvectors=True)
+        systems.append(system.solve(1000))
+    fig = qr.plot.wavefunction(systems[0], show=False)
+    assert isinstance(fig, matplotlib.figure.Figure)
+    matplotlib.pyplot.close('all')
+    paths = qr.plot.render_many(systems, kind='wavefunction', outdir=tmp_path, levels=[0, 1])
+    assert [p.split('/')[-1] for p in paths] == ['wavefunction_0.png', 'wavefunction_1.png', 'wavefunction_2.png']
+    assert all((tmp_path / f'wavefunction_{i}.png').stat().st_size > 0 for i in range(3))
+    assert not matplotlib.pyplot.get_fignums()
+    paths = qr.plot.render_many(systems, kind='potential', outdir=tmp_path, workers=2, fmt='svg')
+    assert len(paths) == 3
+    assert (tmp_path / 'potential_2.svg').exists()
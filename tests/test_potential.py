@@ -35,3 +35,65 @@ def test_save_and_load():
     assert system_new.comment == 'samples'
     aton.file.remove(potential_file)
 
+
+
+def test_interpolate_reuses_fit():
+    import numpy as np
+    system = qr.System(searched_E=6)
+    degrees = np.arange(0, 360, 10)
+    system.grid = np.radians(degrees)
+    system.gridsize = len(degrees)
+    system.potential_values = (1 - np.cos(3 * system.grid)) * 20
+    system.solve(500)
+    spline = system.potential_fit['spline']
+    system.solve(1000)
+    assert system.potential_fit['spline'] is spline
+    assert round(system.potential_values[0], 5) == round(float(spline(0.0)), 5)
+    # The fit is not pickled with the system
+    import pickle
+    assert pickle.loads(pickle.dumps(system)).potential_fit is None
+    assert system.potential_fit['spline'] is spline
+    # Modifying the potential invalidates the fit
+    system.potential_values = system.potential_values * 2
+    system.solve(2000)
+    assert system.potential_fit['spline'] is not spline
+    # Grids with an endpoint at 2 pi can be interpolated too
+    linspace = qr.System(gridsize=100)
+    linspace.grid = np.linspace(0, 2*np.pi, 100)
+    linspace.potential_values = np.cos(3 * linspace.grid)
+    linspace.solve_potential(1000)
+    assert len(linspace.potential_values) == 1000
+    assert round(max(linspace.potential_values), 3) == 2.0
+
+
+def test_interpolate_fft():
+    import numpy as np
+    def V(x):
+        return 10 * np.cos(3*x) + 2 * np.sin(6*x + 0.3)
+    for degrees in [np.arange(0, 360, 10), np.delete(np.arange(0, 360, 10), [5, 17])]:
+        system = qr.System()
+        system.grid = np.radians(degrees)
+        system.gridsize = 1000
+        system.potential_values = V(system.grid)
+        qr.potential.interpolate(system, method='fft')
+        assert len(system.potential_values) == 1000
+        assert np.allclose(system.potential_values, V(system.grid))
+    # Selected from the System when solving
+    system = qr.System(interpolation='fft', gridsize=1000)
+    system.grid = np.radians(np.arange(0, 360, 10))
+    system.potential_values = V(system.grid)
+    system.solve_potential()
+    assert np.allclose(system.potential_values, V(system.grid) - V(system.grid).min(), atol=1e-6)
+
+
+def test_symmetry():
+    import numpy as np
+    assert qr.potential.symmetry(qr.System(potential_name='cos', potential_constants=[0, 10, 2, 0])) == 2
+    assert qr.potential.symmetry(qr.System(potential_name='titov2023')) == 3
+    assert qr.potential.symmetry(qr.SystemResult(potential_name='sin')) == 3
+    assert qr.potential.symmetry(qr.System(potential_name='zero')) == 1
+    # Custom potential, with a small 6-fold component and some noise
+    system = qr.System(gridsize=360)
+    system.grid = np.linspace(0, 2*np.pi, 360, endpoint=False)
+    system.potential_values = 10*np.cos(3*system.grid) + np.sin(6*system.grid) + 1e-3*np.cos(system.grid)
+    assert qr.potential.symmetry(system) == 3
@@ -0,0 +1,25 @@
+import qrotor as qr
+import numpy as np
+
+
+def test_reduced():
+    system = qr.System(B=qr.B_CH3, potential_name='cos', potential_constants=[0, 30, 3, 0], searched_E=15)
+    system.solve()
+    assert np.allclose(qr.reduced.splittings(30)[:3], system.splittings[:3], rtol=1e-3)
+    assert np.allclose(qr.reduced.excitations(30, qr.B_CH3)[:2], system.excitations[:2], rtol=1e-4)
+    assert np.allclose(qr.reduced.eigenvalues(30)[:15], system.eigenvalues[:15], rtol=1e-4)
+    # Broadcasted barriers and B values
+    splittings = qr.reduced.splittings(np.linspace(10, 80, 50)[:, None], [qr.B_CH3, qr.B_CD3])
+    assert splittings.shape == (50, 2, 5)
+    assert np.all(np.diff(splittings[:, :, 0], axis=0) < 0)
+    assert np.all(splittings[:, 1, 0] < splittings[:, 0, 0])
+    assert np.all(np.isnan(qr.reduced.splittings(1000, 1.0)))
+
+
+def test_reduced_generate(tmp_path):
+    path = qr.reduced.generate(str(tmp_path / 'table.npz'), V_B_max=20, step=1.0, searched_E=6, modes=30)
+    table = qr.reduced.load(path)
+    assert table['eigenvalues'].shape == (21, 6)
+    assert np.isclose(table['splittings'][0, 0], 1.0)  # Free rotor
+    bundled = qr.reduced.load()
+    assert np.allclose(table['splittings'][:, 0], bundled['splittings'][::5][:21, 0], rtol=1e-6)
@@ -0,0 +1,37 @@
+import qrotor as qr
+import numpy as np
+import pickle
+
+
+def test_share(tmp_path):
+    default_folder = qr.shared.folder
+    qr.shared.folder = str(tmp_path)
+    try:
+        sys1 = qr.System(B=qr.B_CH3, potential_name='titov2023', gridsize=1000)
+        sys2 = qr.System(B=qr.B_CD3, potential_name='titov2023', gridsize=1000)
+        for sys in [sys1, sys2]:
+            sys.solve_potential()
+            qr.shared.share_system(sys)
+        assert sys1.potential_values is sys2.potential_values
+        assert not sys1.potential_values.flags.writeable
+        # Shared arrays are pickled with their values, unless sent by reference
+        saved = pickle.dumps(sys1)
+        assert len(saved) > sys1.potential_values.nbytes
+        qr.shared.by_reference = True
+        try:
+            data = pickle.dumps(sys1)
+        finally:
+            qr.shared.by_reference = False
+        assert len(data) < sys1.potential_values.nbytes
+        assert pickle.loads(data).potential_values is sys1.potential_values
+        # Operations return regular arrays
+        assert type(sys1.potential_values * 2) is np.ndarray
+        sys1.solve()
+        assert len(sys1.eigenvalues) > 0
+        # Saved systems can be loaded after removing the shared files
+        values = np.array(sys2.potential_values)
+        qr.shared.clear()
+        assert np.array_equal(pickle.loads(saved).potential_values, values)
+    finally:
+        qr.shared.clear()
+        qr.shared.folder = default_folder
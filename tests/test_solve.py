@@ -1,4 +1,7 @@
 import qrotor as qr
+import numpy as np
+import os
+import pytest
 
 
 def test_solve_zero():
@@ -42,3 +45,154 @@ def test_degeneracy_fail_point():
     system.solve(500)
     assert round(system.eigenvalues[0], 0) == 16
 
+
+
+def test_E_levels_many():
+    # Baseline values from the original E_levels() implementation
+    baseline = {
+        20: ([8.9924534, 15.892134], [0.03627137, 0.67684851, 2.37017454]),
+        100: ([22.5397628, 43.34675997, 62.09327303, 78.11355607], [1.366e-05, 0.00076285, 0.01852652, 0.25074154, 1.64282745]),
+        1000: ([74.71961493, 147.91860373, 219.54593373, 289.54442305], [0.0, 0.0, 0.0, 0.0, 0.0]),
+    }
+    spectra = []
+    for V in baseline:
+        system = qr.System(potential_name='cos', potential_constants=[0, V, 3, 0], gridsize=5000, searched_E=15)
+        system.solve()
+        spectra.append(system)
+    eigenvalues = np.array([system.eigenvalues for system in spectra])
+    eigenvalues[0, -3:] = np.nan  # Spectra of different lengths
+    vmax = [system.potential_max for system in spectra]
+    labels, deg, excitations, splittings = qr.solve.E_levels_many(eigenvalues, vmax)
+    assert list(deg) == [3, 3, 3]
+    for i, (expected_excitations, expected_splittings) in enumerate(baseline.values()):
+        n = len(expected_splittings)
+        assert np.allclose(excitations[i, :n-1], expected_excitations, atol=1e-6)
+        assert np.allclose(splittings[i, :n], expected_splittings, atol=1e-6)
+        assert np.all(np.isnan(splittings[i, n:]))
+    # Non-degenerate spectrum
+    levels, deg = qr.solve.E_levels(np.array([1.0, 2.1, 2.9, 4.2, 5.0]))
+    assert deg == 1 and len(levels) == 5
+    # Shallow 2-fold potential, with mixed levels above the barrier
+    system = qr.System(B=0.6, potential_name='cos', potential_constants=[0, 5, 2, 0], gridsize=5000, searched_E=15)
+    system.solve()
+    assert system.deg == 2
+    assert [len(level) for level in system.E_levels] == [2, 2, 2]
+    assert np.isclose(system.splittings[0], 0.0681194, atol=1e-6)
+    # Regular levels up to the maximum of a 2-fold potential, as in the baseline grouping
+    system = qr.System(potential_name='cos', potential_constants=[0, 30, 2, 0], gridsize=4000, searched_E=15)
+    system.solve()
+    assert [len(level) for level in system.E_levels] == [2, 2, 2, 2, 2]
+    # Shallow 3-fold potentials, where the splittings are as large as the excitations
+    for B, V in [(1.0, 3.0), (qr.B_CD3, 1.0), (qr.B_CH3, 0.5), (qr.B_CH3, 1.0)]:
+        system = qr.System(B=B, potential_name='cos', potential_constants=[0, V, 3, 0], gridsize=4000, searched_E=15)
+        system.solve()
+        assert system.deg == 3
+        assert np.isclose(system.splittings[0], qr.reduced.splittings(V, B)[0], rtol=2e-3)
+    levels, deg = qr.solve.E_levels(system.eigenvalues, system.potential_max)
+    assert deg == 1
+    levels, deg = qr.solve.E_levels(system.eigenvalues, system.potential_max, symmetry=3)
+    assert deg == 3 and [len(level) for level in levels] == [3]
+
+
+def test_solver_tridiagonal():
+    sparse = qr.System(potential_name='titov2023', gridsize=5000, solver='sparse')
+    sparse.solve()
+    tridiagonal = qr.System(potential_name='titov2023', gridsize=5000, solver='tridiagonal')
+    tridiagonal.solve()
+    for E_sparse, E_tridiagonal in zip(sparse.eigenvalues, tridiagonal.eigenvalues):
+        assert round(E_sparse, 6) == round(E_tridiagonal, 6)
+    assert round(sparse.splittings[0], 6) == round(tridiagonal.splittings[0], 6)
+
+
+def test_solver_lobpcg():
+    tridiagonal = qr.System(potential_name='titov2023', gridsize=5000)
+    tridiagonal.solve()
+    lobpcg = qr.System(potential_name='titov2023', gridsize=5000, solver='lobpcg')
+    lobpcg.solve()
+    for E_tridiagonal, E_lobpcg in zip(tridiagonal.eigenvalues, lobpcg.eigenvalues):
+        assert round(E_tridiagonal, 6) == round(E_lobpcg, 6)
+    H = qr.solve.hamiltonian_operator(lobpcg)
+    psi = lobpcg.eigenvectors[0]
+    assert np.allclose(H @ psi, qr.solve.hamiltonian_matrix(lobpcg) @ psi)
+
+
+def test_scan(tmp_path):
+    import pandas as pd
+    filepath = str(tmp_path / 'scan.csv')
+    def inputs():
+        for V in [0, 10, 20]:
+            yield qr.System(comment=f'V{V}', potential_name='cos', potential_constants=[0, V, 3, 0], gridsize=500, searched_E=5)
+    # Interrupt the scan after the first two systems
+    for i, system in enumerate(qr.solve.scan(inputs(), filepath, folder=str(tmp_path))):
+        assert len(system.eigenvalues) == 5
+        assert len(system.eigenvectors) == 0  # Reduced size
+        if i == 1:
+            break
+    # Resume, after a truncated write
+    with open(filepath, 'a') as f:
+        f.write('V20,0.1')
+    resumed = [system.comment for system in qr.solve.scan(inputs(), filepath, folder=str(tmp_path), resume=True)]
+    assert resumed == ['V20']
+    df = pd.read_csv(filepath, comment='#')
+    assert list(df['comment']) == ['V0', 'V10', 'V20']
+    assert (tmp_path / '2.npz').exists()
+    # Systems of another scan are not skipped
+    other = [qr.System(comment='other', potential_name='zero', gridsize=500, searched_E=5)]
+    with pytest.raises(ValueError):
+        list(qr.solve.scan(other, filepath, resume=True))
+    assert [system.comment for system in qr.solve.scan(other, filepath)] == ['other']
+    assert list(pd.read_csv(filepath, comment='#')['comment']) == ['other']
+
+
+def test_scan_parallel(tmp_path):
+    systems = [qr.System(comment=f'V{V}', potential_name='cos', potential_constants=[0, V, 3, 0], gridsize=500, searched_E=5) for V in [0, 10, 20, 30]]
+    serial = list(qr.solve.scan(systems, str(tmp_path / 'serial.csv')))
+    parallel = list(qr.solve.scan(systems, str(tmp_path / 'parallel.csv'), workers=2, threads_per_worker=1))
+    assert [system.comment for system in parallel] == ['V0', 'V10', 'V20', 'V30']
+    for a, b in zip(serial, parallel):
+        assert np.allclose(a.eigenvalues, b.eigenvalues)
+    # A single system is solved in the current process with all threads
+    assert qr.solve._thread_budget(length=1) == (1, None)
+    with qr.solve.threads(1):
+        systems[0].solve()
+    assert 1 <= qr.solve.cpu_count() <= os.cpu_count()
+    # Module settings are applied in the workers, even if spawned
+    import pickle
+    settings = pickle.loads(pickle.dumps(qr.solve._settings()))
+    settings['qrotor.solve']['lobpcg_tol'] = 1e-6
+    default_tol = qr.solve.lobpcg_tol
+    try:
+        qr.solve._init_worker(None, settings)
+        assert qr.solve.lobpcg_tol == 1e-6
+    finally:
+        qr.solve.lobpcg_tol = default_tol
+
+
+def test_adaptive_grid():
+    def solve(gridsize, adaptive=False, solver='tridiagonal'):
+        sys = qr.System(potential_name='cos', potential_constants=[0, 2000, 3, 0], gridsize=gridsize, searched_E=6, solver=solver)
+        sys.solve_potential()
+        if adaptive:
+            qr.potential.adaptive(sys)
+        return sys.solve()
+    reference = solve(100000)
+    uniform = solve(2000)
+    adaptive = solve(2000, adaptive=True)
+    assert np.max(np.abs(adaptive.eigenvalues - reference.eigenvalues)) < 0.2 * np.max(np.abs(uniform.eigenvalues - reference.eigenvalues))
+    assert np.allclose(solve(2000, adaptive=True, solver='sparse').eigenvalues, adaptive.eigenvalues)
+    # Eigenvectors are normalised as in uniform grids
+    weights = qr.solve.grid_weights(adaptive.grid)
+    assert np.isclose(np.sum(weights * adaptive.eigenvectors[0]**2), 2*np.pi / 2000)
+
+
+def test_threads_warning(monkeypatch, capsys):
+    import sys
+    monkeypatch.setitem(sys.modules, 'threadpoolctl', None)  # Not installed
+    qr.solve._threadpool_limits.cache_clear()
+    try:
+        for _ in range(3):
+            with qr.solve.threads(1):
+                pass
+        assert capsys.readouterr().out.count('threadpoolctl is not installed') == 1
+    finally:
+        qr.solve._threadpool_limits.cache_clear()
@@ -0,0 +1,41 @@
+import qrotor as qr
+import numpy as np
+
+
+def test_transitions():
+    system = qr.System(B=qr.B_CH3, potential_name='cos', potential_constants=[0, 30, 3, 0], searched_E=6)
+    system.solve(5000)
+    energies, intensities = qr.spectrum.transitions(system, Q=[1e-4, 2.0])
+    assert energies.shape == (6, 6)
+    assert intensities.shape == (2, 6, 6)
+    assert np.allclose(intensities[0], np.eye(6), atol=1e-6)  # Only elastic at Q = 0
+    assert np.allclose(intensities[1], intensities[1].T)
+    assert intensities[1, 0, 1] > 0.1  # Tunnelling transition
+    assert np.isclose(energies[0, 1], system.splittings[0], rtol=0.01)
+    # Many systems at once, with a different number of states
+    other = qr.System(B=qr.B_CH3, potential_name='cos', potential_constants=[0, 40, 3, 0], searched_E=4)
+    other.solve(5000)
+    energies, intensities = qr.spectrum.transitions([system, other], Q=2.0, batch=1)
+    assert intensities.shape == (2, 6, 6)
+    assert np.isnan(energies[1, 0, 5])
+    assert intensities[1, 0, 5] == 0.0
+
+
+def test_simulate():
+    system = qr.System(B=qr.B_CH3, potential_name='cos', potential_constants=[0, 30, 3, 0], searched_E=6)
+    system.solve(5000)
+    E = np.linspace(-0.05, 0.05, 1001)
+    S = qr.spectrum.simulate(system, E, T=[0.02, 5], Q=1.5, fwhm=0.002)
+    assert S.shape == (2, 1001)
+    splitting = system.splittings[0]
+    loss, gain = np.argmin(abs(E - splitting)), np.argmin(abs(E + splitting))
+    assert S[0, gain] < 0.1 * S[0, loss]  # Few excited states at low temperature
+    assert np.isclose(S[1, gain] / S[1, loss], np.exp(-splitting / (qr.k_B * 5)), atol=0.01)  # Detailed balance
+
+
+def test_broaden():
+    E = np.linspace(-1, 1, 401)
+    lines = qr.spectrum.broaden([[0.0, 0.5, 5.0]], [[1.0, 2.0, 1.0]], E, fwhm=0.05)
+    assert lines.shape == (1, 401)
+    assert np.isclose(lines.sum() * (E[1] - E[0]), 3.0, atol=1e-3)  # Line outside the grid is ignored
+    assert np.argmax(lines[0]) == np.argmin(abs(E - 0.5))
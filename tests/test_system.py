@@ -22,3 +22,75 @@ def test_phase():
     # Were eigenvalues calculated?
     assert len(sys.eigenvalues) > 0
 
+
+
+def test_phase_translation():
+    sys = qr.System(B=1.0, potential_name='cos', gridsize=1000, searched_E=5)
+    sys.grid = np.linspace(0, 2*np.pi, 1000, endpoint=False)  # Periodic grid
+    sys.solve()
+    eigenvalues = sys.eigenvalues.copy()
+    ground_state = sys.eigenvectors[0].copy()
+    sys.change_phase(0.5)
+    # Whole grid steps do not modify the eigenvalues, and eigenvectors are translated
+    assert np.array_equal(sys.eigenvalues, eigenvalues)
+    assert np.allclose(sys.eigenvectors[0], np.roll(ground_state, 250))
+    assert np.isclose(sys.E_activation, sys.potential_max - sys.eigenvalues[0])
+    # Other translations are solved again
+    sys.potential_name = ''
+    sys.change_phase(0.123)
+    H = qr.solve.hamiltonian_matrix(sys)
+    assert np.allclose(H @ sys.eigenvectors[0], sys.eigenvalues[0] * sys.eigenvectors[0], atol=1e-6)
+    assert sys.potential_max == np.max(sys.potential_values)
+    # Potentials edited after solving are solved again
+    sys.potential_values = sys.potential_values * 2
+    sys.change_phase(0.5)
+    H = qr.solve.hamiltonian_matrix(sys)
+    assert sys.eigenvalues[0] > 1.5 * eigenvalues[0]
+    assert np.allclose(H @ sys.eigenvectors[0], sys.eigenvalues[0] * sys.eigenvectors[0], atol=1e-6)
+    # Grids repeating the endpoint are translated over a single period
+    sys = qr.System(B=1.0, potential_name='cos', gridsize=1001)
+    sys.solve_potential()
+    values = sys.potential_values.copy()
+    sys.change_phase(0.5, calculate=False)
+    assert np.allclose(sys.potential_values[:-1], np.roll(values[:-1], 250))
+    assert sys.potential_values[-1] == sys.potential_values[0]
+    assert not qr.system.is_uniform([0, 1, 3])
+
+
+def test_result():
+    import pickle
+    sys = qr.System(comment='sys', tags='a b', B=1.0, potential_name='cos', potential_constants=[0, 20, 3, 0], gridsize=1000, searched_E=9)
+    sys.solve()
+    result = qr.SystemResult.from_system(sys)
+    assert not hasattr(result, '__dict__')
+    assert np.array_equal(result.eigenvalues, sys.eigenvalues)
+    assert np.array_equal(result.splittings, sys.splittings)
+    result = pickle.loads(pickle.dumps(result))
+    assert result.comment == 'sys'
+    assert np.array_equal(result.excitations, sys.excitations)
+    back = result.to_system()
+    assert back.splittings == sys.splittings
+    assert back.deg == sys.deg
+    df = qr.systems.save_summary(qr.systems.as_results([sys, sys]), filepath=None)
+    assert df.equals(qr.systems.save_summary([sys, sys], filepath=None))
+
+
+def test_uniform_grid():
+    import pickle
+    import copy
+    grid = qr.UniformGrid(1000)
+    assert len(grid) == 1000
+    assert np.array_equal(np.asarray(grid), np.linspace(0, 2*np.pi, 1000))
+    assert np.allclose(grid[1:3], np.linspace(0, 2*np.pi, 1000)[1:3])
+    assert grid[-1] == 2*np.pi
+    assert isinstance(grid + np.pi, qr.UniformGrid)
+    assert isinstance(np.sin(3*grid), np.ndarray)
+    assert len(pickle.dumps(grid)) < 100
+    assert grid.ndim == 1 and grid.dtype == np.float64
+    assert grid.min() == 0 and grid.max() == 2*np.pi
+    assert np.allclose(grid[np.array([1, 2])], grid[1:3])
+    assert np.isclose(grid.mean(), np.pi)
+    assert copy.deepcopy(grid).size == 1000
+    sys = qr.System(potential_name='cos', gridsize=1000)
+    sys.solve_potential()
+    assert isinstance(sys.grid, qr.UniformGrid)
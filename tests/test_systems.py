@@ -1,4 +1,5 @@
 import qrotor as qr
+import pytest
 
 
 def test_tags():
@@ -28,3 +29,104 @@ def test_tags():
     test9 = qr.systems.filter_tags([sys1, sys2, sys3], include='', exclude='tag1 tag2', strict=False)
     assert test9[0].comment == 'sys3'
 
+
+
+def test_table():
+    import numpy as np
+    sys1 = qr.System(comment='sys1', B=1.0, potential_name='zero', searched_E=5)
+    sys2 = qr.System(comment='sys2', B=2.0, potential_name='zero', searched_E=7)
+    sys3 = qr.System(comment='sys3', B=3.0)
+    sys1.solve(1000)
+    sys2.solve(1000)
+    table = qr.systems.SystemTable([sys1, sys2, sys3])
+    assert len(table) == 3
+    assert table['eigenvalues'].shape == (3, 7)
+    assert list(table.lengths['eigenvalues']) == [5, 7, 0]
+    assert np.isnan(table['eigenvalues'][0, 5])
+    assert table['gridsize'].dtype == np.int64
+    # Filter and sort
+    solved = table[table.lengths['eigenvalues'] > 0].sort('B', reverse=True)
+    assert list(solved['comment']) == ['sys2', 'sys1']
+    # Export, the same as the list of systems
+    df = qr.systems.save_summary(solved, filepath=None)
+    assert list(df['comment']) == ['sys2', 'sys1']
+    assert round(df['ZPE'][1], 5) == 0.0
+    assert qr.systems.save_energies(table, filepath=None).equals(qr.systems.save_energies([sys1, sys2, sys3], filepath=None))
+    # Getters from the table columns
+    energies = qr.systems.get_energies(table)
+    assert np.array_equal(energies[1], sys2.eigenvalues) and energies[2] is None
+    assert qr.systems.get_gridsizes([sys1, sys2, sys3]) == [1000, 1000, 200000]
+    runtimes = qr.systems.get_runtimes(table)
+    assert runtimes[0] == sys1.runtime and runtimes[2] is None
+
+
+def test_tag_index():
+    sys1 = qr.System(tags='tag1 tag2 tag3', comment='sys1')
+    sys2 = qr.System(tags='tag2 tag3 tag4', comment='sys2')
+    sys3 = qr.System(tags='tag4 tag5 tag6', comment='sys3')
+    index = qr.systems.TagIndex([sys1, sys2])
+    assert index.tags == ['tag1', 'tag2', 'tag3', 'tag4']
+    assert list(index['tag4']) == [False, True]
+    # The index stays consistent when appending new systems
+    index.append(sys3)
+    assert list(index['tag4']) == [False, True, True]
+    assert list(index['tag1']) == [True, False, False]
+    assert list(index['missing']) == [False, False, False]
+    assert 'missing' not in index._masks and index['other'] is index['missing']
+    test1 = index.filter(include='tag3 tag4', exclude='tag6')
+    assert [s.comment for s in test1] == ['sys1', 'sys2']
+    test2 = index.select(index['tag4'] & ~index['tag5'])
+    assert [s.comment for s in test2] == ['sys2']
+    # Cached masks can not be modified in place
+    mask = index['tag4']
+    with pytest.raises(ValueError):
+        mask &= index['tag1']
+    assert list(index['tag4']) == [False, True, True]
+    # Systems and results without tags
+    untagged = qr.SystemResult.from_system(qr.System(tags=None))
+    assert untagged.tags == ''
+    index.extend([untagged, qr.System(tags=None)])
+    assert list(index['tag1']) == [True, False, False, False, False]
+
+
+def test_save_summary_append(tmp_path):
+    import pandas as pd
+    sys1 = qr.System(comment='sys1', potential_name='zero', searched_E=5)
+    sys2 = qr.System(comment='sys2', potential_name='zero', searched_E=5)
+    sys1.solve(500)
+    sys2.solve(500)
+    for filename in ['summary.csv', 'summary.csv.gz']:
+        filepath = str(tmp_path / filename)
+        qr.systems.save_summary(sys1, comment='hi', filepath=filepath)
+        qr.systems.save_summary(sys2, filepath=filepath, append=True)
+        df = pd.read_csv(filepath, comment='#')
+        assert list(df['comment']) == ['sys1', 'sys2']
+    with open(str(tmp_path / 'summary.csv')) as f:
+        assert f.readline() == '## hi\n'
+
+
+def test_update_excitations():
+    import numpy as np
+    sys1 = qr.System(B=qr.B_CH3, potential_name='cos', potential_constants=[0, 30, 3, 0], searched_E=12)
+    sys2 = qr.System(B=qr.B_CD3, potential_name='cos', potential_constants=[0, 30, 3, 0], searched_E=12)
+    sys1.solve(1000)
+    sys2.solve(1000)
+    excitations, splittings = sys1.excitations, sys1.splittings
+    # Vectorised over both spectra at once
+    table = qr.systems.SystemTable([sys1, sys2])
+    exc, spl = qr.solve.excitations_many(table['eigenvalues'], table['potential_max'])
+    assert np.allclose(exc[0, :len(excitations)], excitations)
+    assert np.allclose(spl[1, :len(sys2.splittings)], sys2.splittings)
+    # Recalculate from the stored eigenvalues
+    sys1.excitations, sys1.splittings, sys1.deg = [], [], None
+    qr.systems.update_excitations([sys1])
+    assert sys1.deg == 3
+    assert np.allclose(sys1.excitations, excitations)
+    assert np.allclose(sys1.splittings, splittings)
+    table.columns['splittings'][:] = 0.0
+    qr.systems.update_excitations(table)
+    assert list(table.lengths['splittings']) == [len(splittings), len(sys2.splittings)]
+    assert np.allclose(table['splittings'][0, :len(splittings)], splittings)
+    results = qr.systems.as_results([sys2])
+    qr.systems.update_excitations(results)
+    assert np.allclose(results[0].splittings, sys2.splittings)
@@ -0,0 +1,40 @@
+import qrotor as qr
+import numpy as np
+
+
+def test_thermal():
+    system = qr.System(B=qr.B_CH3, potential_name='cos', potential_constants=[0, 30, 3, 0], searched_E=30)
+    system.solve(5000)
+    T = np.array([1.0, 20.0, 50.0, 100.0])
+    populations = qr.thermal.populations(system, T)
+    assert populations.shape == (4, 30)
+    assert np.allclose(populations.sum(axis=-1), 1.0)
+    levels = qr.thermal.level_populations(system, T)
+    assert np.isclose(levels[0, 0], 1.0)
+    assert np.all(np.diff(levels[:, 0]) < 0)  # Ground level empties with temperature
+    splittings = qr.thermal.splittings(system, T)
+    assert np.isclose(splittings[0], system.splittings[0])
+    assert np.all(np.diff(splittings) > 0)
+    # Activation energy is the slope of the Arrhenius plot
+    activation = qr.thermal.activation(system, 50.0)
+    dT = 0.01
+    slope = qr.k_B * 50**2 * np.diff(np.log(qr.thermal.splittings(system, [50 - dT, 50 + dT])))[0] / (2 * dT)
+    assert np.isclose(activation, slope, rtol=0.02)
+    assert np.isclose(qr.thermal.energy(system, 0.0), system.eigenvalues[0])
+
+
+def test_thermal_many():
+    systems = []
+    for V in [20, 30, 40]:
+        system = qr.System(B=qr.B_CH3, potential_name='cos', potential_constants=[0, V, 3, 0], searched_E=20)
+        systems.append(system.solve(3000))
+    T = np.linspace(10, 100, 7)
+    splittings = qr.thermal.splittings(systems, T)
+    assert splittings.shape == (3, 7)
+    assert np.allclose(splittings[1], qr.thermal.splittings(systems[1], T))
+    table = qr.systems.SystemTable(systems)
+    assert np.allclose(qr.thermal.activation(table, T), qr.thermal.activation(systems, T), equal_nan=True)
+    assert qr.thermal.populations(table['eigenvalues'], 10.0).shape == (3, 20)
+    E_a, A = qr.thermal.arrhenius(T, 2.0 * np.exp(-np.array([[10.0], [20.0]]) / (qr.k_B * T)))
+    assert np.allclose(E_a, [10.0, 20.0])
+    assert np.allclose(A, 2.0)